@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -46,9 +47,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ocr_app.middleware.RequestMetricsMiddleware',  # 요청 ID 부여, 요청 처리 시간 기록 (가장 바깥에서 측정)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # ETag 없는 응답에 내용 기반 ETag를 붙이고 304 처리
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -79,12 +82,40 @@ WSGI_APPLICATION = 'naverOCR_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# - sqlite (기본): 개발용. WAL 모드로 열어 워커가 쓰는 동안에도 웹 요청이 읽을 수 있음
+# - postgresql: 운영용 (psycopg2 또는 psycopg 필요). JSONField가 jsonb로 저장되고 파싱된 테이블에 GIN 인덱스를 만듦
+OCR_DB_ENGINE = os.getenv('OCR_DB_ENGINE', 'sqlite')
+
+if OCR_DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('OCR_DB_NAME', 'naver_ocr'),
+            'USER': os.getenv('OCR_DB_USER', ''),
+            'PASSWORD': os.getenv('OCR_DB_PASSWORD', ''),
+            'HOST': os.getenv('OCR_DB_HOST', ''),
+            'PORT': os.getenv('OCR_DB_PORT', ''),
+            # 요청/작업마다 새로 접속하지 않고 연결을 재사용 (초, 0이면 매번 새 연결)
+            'CONN_MAX_AGE': int(os.getenv('OCR_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            # pgbouncer 트랜잭션 풀링을 쓰면 True (서버 측 커서를 쓰지 않음)
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('OCR_DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('OCR_DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('OCR_DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                'timeout': float(os.getenv('OCR_SQLITE_TIMEOUT', '20')),  # 쓰기 잠금 대기(초)
+            },
+        }
+    }
+OCR_SQLITE_WAL = os.getenv('OCR_SQLITE_WAL', 'True') == 'True'
 
 
 # Password validation
@@ -127,17 +158,177 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 이 크기를 넘는 업로드는 메모리 대신 임시 파일로 받음 (요청당 메모리 사용량 상한)
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(1024 * 1024)))
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
+
 # AWS S3 Settings
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID', 'your-access-key-id')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY', 'your-secret-access-key')
 AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME', 'your-bucket-name')
 AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', 'ap-northeast-2')
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', '20'))
+AWS_S3_CONNECT_TIMEOUT = float(os.getenv('AWS_S3_CONNECT_TIMEOUT', '5'))
+AWS_S3_READ_TIMEOUT = float(os.getenv('AWS_S3_READ_TIMEOUT', '60'))
+AWS_S3_MAX_ATTEMPTS = int(os.getenv('AWS_S3_MAX_ATTEMPTS', '3'))
+# 멀티파트 업로드 설정 (임계값보다 큰 파일은 청크 단위로 나눠 병렬 전송)
+AWS_S3_MULTIPART_THRESHOLD = int(os.getenv('AWS_S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+AWS_S3_MULTIPART_CHUNKSIZE = int(os.getenv('AWS_S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+AWS_S3_MAX_CONCURRENCY = int(os.getenv('AWS_S3_MAX_CONCURRENCY', '4'))
 
 # Naver OCR API Settings
 NAVER_OCR_API_URL = os.getenv('NAVER_OCR_API_URL', 'https://gxx9jkyalr.apigw.ntruss.com/custom/v1/45084/126322645cd06458ae58d8755741bc835005c36d93b372a18efc73b9c3f5d48f/general')
 NAVER_OCR_SECRET = os.getenv('NAVER_OCR_SECRET', 'ZGFvS1hCVUxrU0ZEaktXU2RvSFRIdWtET2prTXRBT2s=')
+NAVER_OCR_MAX_IMAGES_PER_REQUEST = int(os.getenv('NAVER_OCR_MAX_IMAGES_PER_REQUEST', '1'))  # API 요청당 이미지 수 한도
+NAVER_OCR_CONNECT_TIMEOUT = float(os.getenv('NAVER_OCR_CONNECT_TIMEOUT', '5'))
+NAVER_OCR_READ_TIMEOUT = float(os.getenv('NAVER_OCR_READ_TIMEOUT', '60'))
+NAVER_OCR_MAX_RETRIES = int(os.getenv('NAVER_OCR_MAX_RETRIES', '3'))
+NAVER_OCR_RETRY_BACKOFF = float(os.getenv('NAVER_OCR_RETRY_BACKOFF', '0.5'))  # 지수 백오프 기본 간격(초)
+NAVER_OCR_RETRY_MAX_BACKOFF = float(os.getenv('NAVER_OCR_RETRY_MAX_BACKOFF', '30'))  # 재시도 간격 상한(초)
+
+# OCR 엔진 백엔드 선택 - clova(기본), fixture(녹화된 응답 재생), fake(로컬 합성 응답) 또는 클래스 경로
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'clova')
+OCR_FIXTURE_DIR = os.getenv('OCR_FIXTURE_DIR', str(BASE_DIR / 'ocr_fixtures'))
+# 가짜 엔진/가짜 OCR 서버 설정 (부하 테스트용)
+OCR_FAKE_LATENCY = float(os.getenv('OCR_FAKE_LATENCY', '0.5'))  # 이미지당 평균 지연(초)
+OCR_FAKE_ERROR_RATE = float(os.getenv('OCR_FAKE_ERROR_RATE', '0'))  # 429/5xx 오류 확률
+OCR_FAKE_TABLE_SIZE = os.getenv('OCR_FAKE_TABLE_SIZE', '20x6')  # 테이블 최대 크기 (행x열)
+OCR_FAKE_TABLES = int(os.getenv('OCR_FAKE_TABLES', '1'))  # 이미지당 테이블 수
+
+# OCR API 속도 제한 (모든 워커 프로세스가 공유하는 토큰 버킷, 계약한 호출 한도에 맞춰 설정)
+NAVER_OCR_RATE_LIMIT = float(os.getenv('NAVER_OCR_RATE_LIMIT', '5'))  # 초당 요청 수, 0이면 제한 없음
+NAVER_OCR_RATE_BURST = float(os.getenv('NAVER_OCR_RATE_BURST', '5'))  # 순간적으로 허용하는 요청 수
+NAVER_OCR_RATE_LIMIT_MAX_WAIT = float(os.getenv('NAVER_OCR_RATE_LIMIT_MAX_WAIT', '60'))  # 토큰 대기 상한(초)
+OCR_REDIS_URL = os.getenv('OCR_REDIS_URL', '')  # 설정하면 Redis로 버킷 공유 (여러 서버)
+OCR_RATE_LIMIT_DB = os.getenv('OCR_RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'naver_ocr_ratelimit.sqlite3'))
+
+# 결과 화면 캐시 (렌더링한 테이블 조각, 바운딩 박스 배열) - OCR_REDIS_URL이 있으면 Redis를 공유, 아니면 프로세스 메모리
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': OCR_REDIS_URL,
+    } if OCR_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+}
+OCR_RESULT_CACHE_TIMEOUT = int(os.getenv('OCR_RESULT_CACHE_TIMEOUT', '86400'))  # 결과 화면 캐시 유지 시간(초)
+
+# OCR API 서킷 브레이커 (연속 실패 시 일정 시간 요청 중단)
+NAVER_OCR_CIRCUIT_FAILURES = int(os.getenv('NAVER_OCR_CIRCUIT_FAILURES', '5'))
+NAVER_OCR_CIRCUIT_RESET_TIMEOUT = float(os.getenv('NAVER_OCR_CIRCUIT_RESET_TIMEOUT', '30'))  # 복구 시험까지 대기(초)
+
+# 인라인 이미지 모드 - 작은 이미지는 S3 URL 대신 base64로 요청 본문에 담아 보냄 (공개 버킷 불필요)
+NAVER_OCR_INLINE_IMAGES = os.getenv('NAVER_OCR_INLINE_IMAGES', 'False') == 'True'
+NAVER_OCR_INLINE_MAX_BYTES = int(os.getenv('NAVER_OCR_INLINE_MAX_BYTES', str(5 * 1024 * 1024)))
+OCR_ARCHIVE_TO_S3 = os.getenv('OCR_ARCHIVE_TO_S3', 'True') == 'True'  # 인라인 처리한 이미지도 OCR 이후 S3에 보관
+
+# HTTP 연결 풀 설정 (스레드별 세션마다 적용)
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+
+# 비동기 OCR 호출 설정 (ASGI의 /api/ocr/) - httpx가 설치되어 있으면 이벤트 루프 하나가 여러 OCR 요청을 동시에 기다림
+OCR_ASYNC_HTTP = os.getenv('OCR_ASYNC_HTTP', 'True') == 'True'  # False면 스레드에서 requests로 호출
+OCR_ASYNC_MAX_CONNECTIONS = int(os.getenv('OCR_ASYNC_MAX_CONNECTIONS', '200'))  # 이벤트 루프당 동시 연결 수 상한
+
+# OCR 작업 워커 설정
+OCR_WORKER_PROCESSES = int(os.getenv('OCR_WORKER_PROCESSES', '2'))
+OCR_WORKER_POLL_INTERVAL = float(os.getenv('OCR_WORKER_POLL_INTERVAL', '1.0'))
+OCR_JOB_STALE_TIMEOUT = int(os.getenv('OCR_JOB_STALE_TIMEOUT', '300'))  # 처리 중 상태로 멈춘 작업 회수 기준(초)
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv('OCR_JOB_MAX_ATTEMPTS', '10'))  # 대기열로 되돌리는 최대 시도 횟수, 넘으면 실패 처리
+OCR_WORKER_BATCH_SIZE = int(os.getenv('OCR_WORKER_BATCH_SIZE', '16'))  # 워커가 한 번에 선점하는 작업 수
+OCR_UPLOAD_CONCURRENCY = int(os.getenv('OCR_UPLOAD_CONCURRENCY', '8'))  # 워커 내 동시 S3 업로드 수
+OCR_REQUEST_CONCURRENCY = int(os.getenv('OCR_REQUEST_CONCURRENCY', '4'))  # 워커 내 동시 OCR API 요청 수
+
+# OCR 전 이미지 전처리 설정 (EXIF 방향 보정, 긴 변 기준 축소, 흑백 변환, 재압축)
+OCR_PREPROCESS_ENABLED = os.getenv('OCR_PREPROCESS_ENABLED', 'True') == 'True'
+OCR_PREPROCESS_PROCESSES = int(os.getenv('OCR_PREPROCESS_PROCESSES', '2'))  # 워커 프로세스당 전처리 프로세스 수
+OCR_PREPROCESS_MAX_LONG_EDGE = int(os.getenv('OCR_PREPROCESS_MAX_LONG_EDGE', '2480'))  # A4 300dpi 긴 변 기준
+OCR_PREPROCESS_GRAYSCALE = os.getenv('OCR_PREPROCESS_GRAYSCALE', 'False') == 'True'
+OCR_PREPROCESS_JPEG_QUALITY = int(os.getenv('OCR_PREPROCESS_JPEG_QUALITY', '85'))
+
+# 일괄 업로드 설정
+OCR_BATCH_MAX_FILES = int(os.getenv('OCR_BATCH_MAX_FILES', '200'))
+DATA_UPLOAD_MAX_NUMBER_FILES = OCR_BATCH_MAX_FILES
+# ZIP 일괄 업로드 한도 - 압축 폭탄 방지용으로 풀기 전에 ZIP 크기, 항목 수, 풀었을 때 전체 크기를 확인
+OCR_BATCH_MAX_ARCHIVE_SIZE = int(os.getenv('OCR_BATCH_MAX_ARCHIVE_SIZE', str(200 * 1024 * 1024)))
+OCR_BATCH_MAX_ARCHIVE_MEMBERS = int(os.getenv('OCR_BATCH_MAX_ARCHIVE_MEMBERS', '1000'))  # 폴더/건너뛰는 항목 포함
+OCR_BATCH_MAX_UNCOMPRESSED_SIZE = int(os.getenv('OCR_BATCH_MAX_UNCOMPRESSED_SIZE', str(500 * 1024 * 1024)))
+
+# 브라우저 → S3 직접 업로드 (presigned POST) 설정 - 버킷에 CORS(POST) 허용이 필요
+OCR_DIRECT_UPLOAD = os.getenv('OCR_DIRECT_UPLOAD', 'False') == 'True'
+OCR_DIRECT_UPLOAD_EXPIRES = int(os.getenv('OCR_DIRECT_UPLOAD_EXPIRES', '600'))  # presigned POST 유효 시간(초)
+
+# 중복 업로드 재사용 설정 (같은 내용의 파일은 S3 업로드/OCR 호출 없이 기존 결과 반환)
+OCR_DEDUP_ENABLED = os.getenv('OCR_DEDUP_ENABLED', 'True') == 'True'
+OCR_DEDUP_TTL = int(os.getenv('OCR_DEDUP_TTL', '0'))  # 기존 결과 유효 기간(초), 0이면 만료 없음
+
+# 원본 OCR 응답 저장소 설정
+# - local: OCR_RAW_STORAGE_DIR 아래에 압축 저장 / s3: AWS_STORAGE_BUCKET_NAME 버킷에 압축 저장 / db: 기존처럼 DB 행에 저장
+OCR_RAW_STORAGE = os.getenv('OCR_RAW_STORAGE', 'local')
+OCR_RAW_STORAGE_DIR = os.getenv('OCR_RAW_STORAGE_DIR', str(BASE_DIR / 'ocr_raw'))
+OCR_RAW_S3_PREFIX = os.getenv('OCR_RAW_S3_PREFIX', 'ocr-raw/')
+OCR_RAW_COMPRESSION = os.getenv('OCR_RAW_COMPRESSION', 'zstd')  # zstd(zstandard 설치 시) 또는 gzip
+
+# 내보내기 파일 캐시 - 결과별로 한 번 만든 엑셀/CSV/JSONL/Parquet 파일을 다시 내려줌
+# - local: OCR_EXPORT_CACHE_DIR 아래에 저장 / s3: 버킷에 저장하고 presigned URL로 리다이렉트 / off: 매번 생성
+OCR_EXPORT_CACHE = os.getenv('OCR_EXPORT_CACHE', 'local')
+OCR_EXPORT_CACHE_DIR = os.getenv('OCR_EXPORT_CACHE_DIR', str(BASE_DIR / 'ocr_exports'))
+OCR_EXPORT_CACHE_S3_PREFIX = os.getenv('OCR_EXPORT_CACHE_S3_PREFIX', 'ocr-exports/')
+OCR_EXPORT_CACHE_URL_EXPIRES = int(os.getenv('OCR_EXPORT_CACHE_URL_EXPIRES', '300'))  # presigned URL 유효 시간(초)
+
+# 디버그용 OCR 응답 덤프 - 디렉토리를 지정하면 결과마다 gzip 파일을 백그라운드로 저장 (기본: 저장하지 않음)
+OCR_DEBUG_DUMP_DIR = os.getenv('OCR_DEBUG_DUMP_DIR', '')
+OCR_DEBUG_DUMP_MAX_PENDING = int(os.getenv('OCR_DEBUG_DUMP_MAX_PENDING', '32'))  # 밀린 덤프가 이보다 많으면 버림
+
+# 작업 상태 푸시 (SSE /api/events/, 롱폴링 /api/events/poll/) - 워커와 웹 프로세스가 같은 이벤트 로그 파일을 공유
+# 비워 두면 파일 없이 같은 프로세스 안에서만 전달 (워커가 다른 서버에 있으면 공유 디렉토리 경로를 지정)
+OCR_EVENTS_LOG = os.getenv('OCR_EVENTS_LOG', os.path.join(tempfile.gettempdir(), 'naver_ocr_events.log'))
+OCR_EVENTS_LOG_MAX_BYTES = int(os.getenv('OCR_EVENTS_LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # 넘으면 .1로 교체
+OCR_EVENTS_POLL_INTERVAL = float(os.getenv('OCR_EVENTS_POLL_INTERVAL', '0.2'))  # 이벤트 로그 확인 간격(초)
+OCR_EVENTS_BUFFER = int(os.getenv('OCR_EVENTS_BUFFER', '1000'))  # 재연결한 구독자에게 다시 보낼 최근 이벤트 수
+OCR_EVENTS_HEARTBEAT = float(os.getenv('OCR_EVENTS_HEARTBEAT', '15'))  # SSE 연결 유지용 빈 메시지 간격(초)
+OCR_EVENTS_STREAM_MAX_AGE = float(os.getenv('OCR_EVENTS_STREAM_MAX_AGE', '300'))  # SSE 연결 최대 유지 시간(초), 이후 재연결
+OCR_EVENTS_LONGPOLL_TIMEOUT = float(os.getenv('OCR_EVENTS_LONGPOLL_TIMEOUT', '25'))  # 롱폴링 최대 대기(초)
+# WSGI에서는 SSE를 열지 않고 화면이 이 간격(초)으로 /api/events/poll/?timeout=0을 호출
+OCR_EVENTS_CLIENT_POLL_INTERVAL = float(os.getenv('OCR_EVENTS_CLIENT_POLL_INTERVAL', '3'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 지표 설정 - 각 프로세스가 OCR_METRICS_DIR에 스냅샷을 남기고 /metrics가 합쳐서 노출
+OCR_METRICS_DIR = os.getenv('OCR_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'naver_ocr_metrics'))
+OCR_METRICS_FLUSH_INTERVAL = float(os.getenv('OCR_METRICS_FLUSH_INTERVAL', '5'))  # 스냅샷 저장 간격(초)
+OCR_METRICS_TOKEN = os.getenv('OCR_METRICS_TOKEN', '')  # 설정하면 /metrics에 Bearer 토큰 필요
+
+# 로그 설정 - 모든 로그에 요청 ID를 붙이고, OCR_LOG_FORMAT=json이면 한 줄에 JSON 하나씩 출력
+OCR_LOG_LEVEL = os.getenv('OCR_LOG_LEVEL', 'INFO')
+OCR_LOG_FORMAT = os.getenv('OCR_LOG_FORMAT', 'text')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'ocr_app.logutils.RequestIDFilter'},
+    },
+    'formatters': {
+        'text': {'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'},
+        'json': {'()': 'ocr_app.logutils.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['request_id'],
+            'formatter': OCR_LOG_FORMAT,
+        },
+    },
+    'loggers': {
+        'ocr_app': {
+            'handlers': ['console'],
+            'level': OCR_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
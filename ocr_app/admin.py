@@ -1,14 +1,29 @@
 from django.contrib import admin
-from .models import OCRResult
+from .models import OCRResult, OCRBatch
 
-@admin.register(OCRResult)
-class OCRResultAdmin(admin.ModelAdmin):
-    list_display = ['id', 'created_at', 's3_url', 'has_ocr_result']
+
+@admin.register(OCRBatch)
+class OCRBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'total_count']
     list_filter = ['created_at']
-    search_fields = ['s3_url']
     readonly_fields = ['created_at']
+
+
+@admin.register(OCRResult)
+class OCRResultAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'status', 's3_url', 'has_ocr_result', 'table_count', 'cell_count']
+    list_filter = ['status', 'created_at']
+    search_fields = ['s3_url', 'content_hash']
+    readonly_fields = [
+        'created_at', 'started_at', 'finished_at', 'attempts', 'content_hash',
+        'raw_result_key', 'raw_result_bytes', 'has_result', 'table_count', 'cell_count',
+    ]
     
+    def get_queryset(self, request):
+        # 목록에서는 큰 JSON 컬럼을 읽지 않음 (상세 화면에서 필요할 때 지연 로딩)
+        return super().get_queryset(request).defer(*OCRResult.LARGE_FIELDS)
+
     def has_ocr_result(self, obj):
-        return bool(obj.ocr_result)
+        return obj.has_result
     has_ocr_result.boolean = True
     has_ocr_result.short_description = 'OCR 결과 있음'
@@ -0,0 +1,175 @@
+"""OCR 엔진 백엔드
+
+워커는 get_ocr_backend().recognize(images)로만 OCR을 호출하므로 OCR_BACKEND 설정만 바꿔
+Clova, 녹화된 응답 재생, 네트워크 없는 가짜 엔진 사이를 전환할 수 있다.
+images 항목 형식은 utils.call_naver_ocr_api_batch와 같고, 반환값은 이미지별 응답 목록(인식 실패는 None)이다.
+이벤트 루프에서는 await arecognize(images)를 쓰며, 비동기 구현이 없는 백엔드는 스레드에서 recognize를 실행한다.
+"""
+import asyncio
+import copy
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .fakeocr import fake_ocr_reply, parse_table_size
+from .metrics import timed
+from .resilience import OCRAPIError, acall_with_resilience, call_with_resilience
+from .utils import (
+    acall_naver_ocr_api_batch, call_naver_ocr_api_batch, is_async_http_available, ocr_image_payload,
+    split_ocr_response,
+)
+
+
+class OCRBackend:
+    """OCR 백엔드 기본 클래스"""
+
+    def recognize(self, images):
+        raise NotImplementedError
+
+    async def arecognize(self, images):
+        """recognize의 비동기 버전 (기본 구현은 기본 스레드 풀에서 recognize 실행)"""
+        return await asyncio.to_thread(self.recognize, images)
+
+
+class ClovaBackend(OCRBackend):
+    """네이버 Clova OCR API (NAVER_OCR_API_URL을 로컬 가짜 OCR 서버로 바꿔 HTTP 경로까지 시험할 수 있음)"""
+
+    def recognize(self, images):
+        return call_naver_ocr_api_batch(images)
+
+    async def arecognize(self, images):
+        # httpx가 있으면 응답을 기다리는 동안 스레드를 점유하지 않음 (OCR_ASYNC_HTTP=False면 스레드에서 requests로 호출)
+        if settings.OCR_ASYNC_HTTP and is_async_http_available():
+            return await acall_naver_ocr_api_batch(images)
+        return await super().arecognize(images)
+
+
+class FixtureBackend(OCRBackend):
+    """녹화해 둔 Clova 응답(.json / .json.gz)을 재생
+
+    이미지 내용(또는 URL) 해시로 파일을 고르므로 같은 이미지는 항상 같은 응답을 받음
+    """
+
+    def __init__(self, fixture_dir=None):
+        fixture_dir = fixture_dir or settings.OCR_FIXTURE_DIR
+        self.paths = sorted(
+            glob.glob(os.path.join(fixture_dir, '*.json')) + glob.glob(os.path.join(fixture_dir, '*.json.gz'))
+        )
+        if not self.paths:
+            raise ImproperlyConfigured(
+                f'OCR 응답 fixture가 없습니다: {fixture_dir} (record_ocr_fixtures 명령으로 만들 수 있습니다)'
+            )
+        self._cache = {}
+
+    def _load(self, path):
+        if path not in self._cache:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                self._cache[path] = json.load(f)
+        return self._cache[path]
+
+    def _pick(self, image):
+        if isinstance(image, str):
+            key = image.encode('utf-8')
+        elif image.get('data') is not None:
+            key = image['data']
+        else:
+            key = (image.get('url') or image.get('name') or '').encode('utf-8')
+        index = int(hashlib.sha1(key).hexdigest()[:8], 16) % len(self.paths)
+        return self.paths[index]
+
+    def recognize(self, images):
+        # 호출한 쪽이 응답을 수정하므로(페이지 번호, 좌표 보정) 캐시된 원본 대신 복사본을 돌려줌
+        return [copy.deepcopy(self._load(self._pick(image))) for image in images]
+
+
+class FakeBackend(OCRBackend):
+    """네트워크 없이 Clova V2 형식의 합성 테이블 응답을 만드는 가짜 엔진
+
+    지연(OCR_FAKE_LATENCY)과 오류율(OCR_FAKE_ERROR_RATE)을 흉내 내고, 응답을 requests.Response로 감싸
+    call_with_resilience를 거치게 하므로 속도 제한/재시도/서킷 브레이커까지 함께 부하 테스트됨
+    """
+
+    def _send(self, payload, latency):
+        rows, cols = parse_table_size(settings.OCR_FAKE_TABLE_SIZE)
+        status, body = fake_ocr_reply(
+            payload,
+            latency=latency,
+            error_rate=settings.OCR_FAKE_ERROR_RATE,
+            rows=rows,
+            cols=cols,
+            tables=settings.OCR_FAKE_TABLES,
+        )
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def _payload(self, images):
+        return {
+            "version": "V2",
+            "images": [_fake_image_payload(image, i) for i, image in enumerate(images)],
+        }
+
+    def recognize(self, images):
+        payload = self._payload(images)
+        response = call_with_resilience(lambda: self._send(payload, settings.OCR_FAKE_LATENCY))
+        return self._parse(response, len(images))
+
+    async def arecognize(self, images):
+        payload = self._payload(images)
+
+        async def send():
+            # 지연은 이벤트 루프를 막지 않도록 asyncio.sleep으로 흉내 냄 (fake_ocr_reply와 같은 분포)
+            latency = settings.OCR_FAKE_LATENCY * max(1, len(images)) * random.uniform(0.5, 1.5)
+            await asyncio.sleep(latency)
+            return self._send(payload, 0)
+
+        response = await acall_with_resilience(send, connection_errors=())
+        return self._parse(response, len(images))
+
+    def _parse(self, response, count):
+        with timed('ocr_json_parse'):
+            try:
+                return split_ocr_response(response.json(), count)
+            except ValueError:
+                raise OCRAPIError('OCR API 응답을 해석할 수 없습니다.')
+
+
+def _fake_image_payload(image, index):
+    # 큰 이미지를 base64로 바꾸는 비용은 실제 요청에만 필요하므로 가짜 엔진은 해시만 넘김
+    if isinstance(image, dict) and image.get('data') is not None:
+        digest = hashlib.sha1(image['data']).hexdigest()
+        image = {**image, 'data': digest.encode('ascii')}
+    return ocr_image_payload(image, index)
+
+
+OCR_BACKENDS = {
+    'clova': ClovaBackend,
+    'fixture': FixtureBackend,
+    'fake': FakeBackend,
+}
+
+_backend = None
+_backend_name = None
+
+
+def get_ocr_backend():
+    """OCR_BACKEND 설정에 맞는 프로세스 공용 백엔드 (등록된 이름 또는 클래스 경로)"""
+    global _backend, _backend_name
+
+    name = settings.OCR_BACKEND
+    if _backend is None or _backend_name != name:
+        backend_class = OCR_BACKENDS.get(name) or import_string(name)
+        _backend = backend_class()
+        _backend_name = name
+    return _backend
@@ -0,0 +1,118 @@
+"""원본 OCR 응답 JSON 저장소
+
+Clova 응답 원문은 크기가 커서 DB 행 대신 압축해 로컬 디렉토리나 S3에 저장하고,
+행에는 "<backend>:<경로>" 형태의 포인터만 남긴다. 압축 방식은 파일 확장자로 구분한다.
+"""
+import gzip
+import json
+import os
+
+from django.conf import settings
+
+from .utils import get_s3_client
+
+try:
+    import zstandard
+except ImportError:  # zstd는 선택 사항 - 없으면 gzip 사용
+    zstandard = None
+
+
+def _compression():
+    if settings.OCR_RAW_COMPRESSION == 'zstd' and zstandard is not None:
+        return 'zst'
+    return 'gz'
+
+
+def _compress(data, codec):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    return gzip.compress(payload, compresslevel=6)
+
+
+def _decompress(blob, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError('zstd로 압축된 OCR 결과를 읽으려면 zstandard 패키지가 필요합니다.')
+        payload = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        payload = gzip.decompress(blob)
+    return json.loads(payload)
+
+
+def _relative_path(name, codec):
+    # 한 디렉토리에 파일이 너무 많아지지 않도록 1000개 단위로 나눔
+    try:
+        shard = f"{int(name.split('-', 1)[0]) // 1000:06d}"
+    except ValueError:
+        shard = 'misc'
+    return f'{shard}/{name}.json.{codec}'
+
+
+def _local_path(relative_path):
+    return os.path.join(settings.OCR_RAW_STORAGE_DIR, relative_path)
+
+
+def _s3_key(relative_path):
+    return f'{settings.OCR_RAW_S3_PREFIX}{relative_path}'
+
+
+def save_raw_result(name, data):
+    """원본 OCR 응답을 압축 저장하고 (포인터, 압축 후 바이트 수) 반환"""
+    backend = settings.OCR_RAW_STORAGE
+    codec = _compression()
+    blob = _compress(data, codec)
+    relative_path = _relative_path(name, codec)
+
+    if backend == 's3':
+        get_s3_client().put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=_s3_key(relative_path),
+            Body=blob,
+            ContentType='application/json',
+            ContentEncoding='zstd' if codec == 'zst' else 'gzip',
+        )
+    else:
+        path = _local_path(relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 쓰다가 중단돼도 깨진 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        backend = 'local'
+
+    return f'{backend}:{relative_path}', len(blob)
+
+
+def load_raw_result(pointer):
+    """포인터가 가리키는 원본 OCR 응답을 읽어 dict로 반환"""
+    backend, relative_path = pointer.split(':', 1)
+    codec = relative_path.rsplit('.', 1)[-1]
+
+    if backend == 's3':
+        response = get_s3_client().get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=_s3_key(relative_path),
+        )
+        blob = response['Body'].read()
+    else:
+        with open(_local_path(relative_path), 'rb') as f:
+            blob = f.read()
+
+    return _decompress(blob, codec)
+
+
+def delete_raw_result(pointer):
+    """저장된 원본 OCR 응답 삭제 (이미 없으면 무시)"""
+    backend, relative_path = pointer.split(':', 1)
+    if backend == 's3':
+        get_s3_client().delete_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=_s3_key(relative_path),
+        )
+    else:
+        try:
+            os.remove(_local_path(relative_path))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,16 @@
+"""데이터베이스 연결 설정
+
+SQLite는 기본 롤백 저널 모드에서 쓰기 중에는 읽기도 막히므로, 연결할 때마다 WAL 모드로 바꿔
+워커가 결과를 저장하는 동안에도 웹 요청이 읽을 수 있게 한다 (쓰기는 여전히 한 번에 하나).
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created 수신자 - SQLite 연결에 WAL 모드와 동기화 수준 설정"""
+    if connection.vendor != 'sqlite' or not settings.OCR_SQLITE_WAL:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # WAL에서는 NORMAL이어도 손상되지 않음 (전원 차단 시 마지막 커밋 일부만 유실될 수 있음)
+        cursor.execute('PRAGMA synchronous=NORMAL')
@@ -0,0 +1,264 @@
+"""OCR 작업 상태 변경 푸시 (SSE / 롱폴링)
+
+작업 상태가 바뀌면(대기/처리 중/완료/실패) 워커와 웹 프로세스가 OCR_EVENTS_LOG 파일에 JSON 한 줄씩 덧붙이고,
+각 웹 프로세스의 중계 스레드가 그 파일을 따라 읽어 프로세스 안의 브로커로 전달한다.
+브라우저는 /api/events/(SSE, ASGI 전용)나 /api/events/poll/(롱폴링)로 브로커를 구독하므로 상태 확인에 DB를 조회하지 않는다.
+OCR_EVENTS_LOG가 비어 있으면 파일 없이 같은 프로세스 안에서만 전달한다 (워커를 따로 띄우지 않는 개발 환경용).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from .metrics import inc
+
+logger = logging.getLogger(__name__)
+
+
+def _event_payload(ocr_result):
+    return {
+        'result_id': ocr_result.pk,
+        'batch_id': ocr_result.batch_id,
+        'status': ocr_result.status,
+        'error': ocr_result.error_message,
+        'has_result': ocr_result.status == ocr_result.STATUS_DONE and ocr_result.has_result,
+        'created_at': ocr_result.created_at.strftime('%Y-%m-%d %H:%M:%S') if ocr_result.created_at else None,
+        'image_url': ocr_result.image_file.url if ocr_result.image_file else ocr_result.s3_url,
+        'result_url': reverse('ocr_result', kwargs={'pk': ocr_result.pk}),
+        'time': time.time(),
+    }
+
+
+def publish_status(ocr_result):
+    """작업의 현재 상태를 구독자에게 알림 (트랜잭션 안이면 커밋된 뒤에 전달)"""
+    payload = _event_payload(ocr_result)
+    transaction.on_commit(lambda: _emit(payload))
+
+
+def _emit(payload):
+    inc('ocr_events_total', status=payload['status'])
+    path = settings.OCR_EVENTS_LOG
+    if not path:
+        get_broker().publish(payload)
+        return
+    try:
+        _append_to_log(path, payload)
+    except OSError as e:
+        # 이벤트를 못 남겨도 작업 처리에는 영향 없음 (구독자는 재연결 시 목록을 다시 읽음)
+        logger.warning('작업 이벤트 기록 오류: %s', e)
+
+
+def _append_to_log(path, payload):
+    line = (json.dumps(payload, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # O_APPEND로 한 번에 쓰면 여러 프로세스가 동시에 써도 줄이 섞이지 않음
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+    if size > settings.OCR_EVENTS_LOG_MAX_BYTES:
+        # 중계 스레드는 열어 둔 이전 파일을 끝까지 읽은 뒤 새 파일로 넘어감
+        os.replace(path, f'{path}.1')
+
+
+class EventBroker:
+    """프로세스 안의 이벤트 버퍼 - 이벤트 루프에서 기다리는 구독자(SSE/롱폴링)를 깨움
+
+    이벤트 ID는 이 프로세스에서 증가하는 정수이며, 재연결한 구독자에게는 마지막으로 받은 ID 이후의 이벤트를
+    버퍼에서 다시 보낸다. 버퍼에서 밀려났거나 다른 프로세스의 ID면 reset을 알려 목록을 새로 읽게 한다.
+    """
+
+    def __init__(self, buffer_size):
+        self._events = deque(maxlen=max(1, buffer_size))
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self._evicted_id = 0
+        self.last_id = 0
+
+    def publish(self, payload, event_id=None):
+        with self._lock:
+            event_id = event_id if event_id is not None else self.last_id + 1
+            if len(self._events) == self._events.maxlen:
+                self._evicted_id = self._events[0]['id']
+            self._events.append({**payload, 'id': event_id})
+            self.last_id = event_id
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                pass  # 이미 닫힌 이벤트 루프
+
+    def _since(self, after):
+        """(after 이후 이벤트 목록, 이어 받을 수 없어 목록을 새로 읽어야 하는지 여부)"""
+        if after > self.last_id or after < self._evicted_id:
+            return [], True
+        return [event for event in self._events if event['id'] > after], False
+
+    async def await_events(self, after, timeout):
+        """after 이후 이벤트가 생길 때까지 최대 timeout초 대기 (이벤트 루프용 - 스레드를 점유하지 않음)"""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self.last_id != after:
+                return self._since(after)
+            self._waiters.add(entry)
+        try:
+            await asyncio.wait_for(entry[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+        with self._lock:
+            return self._since(after)
+
+
+class EventLogRelay(threading.Thread):
+    """OCR_EVENTS_LOG를 따라 읽어 브로커로 전달하는 스레드 (파일이 교체되면 이전 파일을 끝까지 읽고 넘어감)"""
+
+    daemon = True
+
+    def __init__(self, path, broker, interval):
+        super().__init__(name='ocr-event-relay')
+        self.path = path
+        self.broker = broker
+        self.interval = interval
+        self._file = None
+        self._inode = None
+        self._partial = b''
+        self._base = 0  # 이전 파일들에서 읽은 바이트 수 (이벤트 ID가 계속 증가하도록)
+        self._start_at_end = True  # 처음 연 파일은 기존 이벤트를 건너뜀
+
+    def run(self):
+        while True:
+            try:
+                self._poll()
+            except OSError as e:
+                logger.warning('작업 이벤트 로그 읽기 오류: %s', e)
+                self._close()
+            time.sleep(self.interval)
+
+    def _poll(self):
+        if self._file is None:
+            try:
+                self._file = open(self.path, 'rb')
+            except FileNotFoundError:
+                self._start_at_end = False  # 이후 생기는 파일은 처음부터 읽음
+                return
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            if self._start_at_end:
+                self._file.seek(0, os.SEEK_END)
+            self._start_at_end = False
+
+        self._read()
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._file.tell():
+            self._read()
+            self._base += self._file.tell()
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._partial = b''
+
+    def _read(self):
+        position = self._file.tell() - len(self._partial)
+        data = self._file.read()
+        if not data:
+            return
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()  # 아직 다 쓰이지 않은 마지막 줄
+        for line in lines:
+            position += len(line) + 1
+            if not line:
+                continue
+            try:
+                payload = json.loads(line)
+            except ValueError:
+                logger.warning('작업 이벤트 로그에 잘못된 줄이 있습니다: %r', line[:200])
+                continue
+            self.broker.publish(payload, event_id=self._base + position)
+
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """이 프로세스의 이벤트 브로커 (OCR_EVENTS_LOG가 있으면 처음 구독할 때 중계 스레드 시작)"""
+    global _broker, _broker_pid
+    pid = os.getpid()
+    if _broker is None or _broker_pid != pid:
+        with _broker_lock:
+            if _broker is None or _broker_pid != pid:
+                broker = EventBroker(settings.OCR_EVENTS_BUFFER)
+                if settings.OCR_EVENTS_LOG:
+                    EventLogRelay(settings.OCR_EVENTS_LOG, broker, settings.OCR_EVENTS_POLL_INTERVAL).start()
+                _broker = broker
+                _broker_pid = pid
+    return _broker
+
+
+def parse_event_id(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def matches(event, result_id=None, batch_id=None):
+    """구독 조건(?result=, ?batch=)에 맞는 이벤트인지 여부"""
+    if result_id is not None and event.get('result_id') != result_id:
+        return False
+    if batch_id is not None and event.get('batch_id') != batch_id:
+        return False
+    return True
+
+
+def format_sse(event):
+    data = json.dumps({k: v for k, v in event.items() if k != 'id'}, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: status\ndata: {data}\n\n"
+
+
+def _stream_chunk(events, reset, filters):
+    if reset:
+        return 'event: reset\ndata: {}\n\n'
+    chunk = ''.join(format_sse(event) for event in events if matches(event, **filters))
+    # 보낼 이벤트가 없으면 주석 한 줄로 연결 유지 (프록시 유휴 종료 방지)
+    return chunk or ': keepalive\n\n'
+
+
+def _stream_start():
+    # 브라우저 EventSource의 재연결 간격 지정
+    return f'retry: {int(settings.OCR_EVENTS_POLL_INTERVAL * 1000) + 1000}\n\n'
+
+
+async def aiter_sse(broker, after, filters):
+    """SSE 본문 - 대기 중에는 스레드를 점유하지 않으며 OCR_EVENTS_STREAM_MAX_AGE가 지나면 끝내 브라우저가 재연결하게 함"""
+    deadline = time.monotonic() + settings.OCR_EVENTS_STREAM_MAX_AGE
+    yield _stream_start()
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, reset = await broker.await_events(after, min(settings.OCR_EVENTS_HEARTBEAT, remaining))
+        yield _stream_chunk(events, reset, filters)
+        after = events[-1]['id'] if events else (broker.last_id if reset else after)
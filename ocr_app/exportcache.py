@@ -0,0 +1,148 @@
+"""생성한 내보내기 파일(엑셀/CSV/JSONL/Parquet) 캐시
+
+OCR 결과는 처리 후 바뀌지 않으므로 결과별로 한 번 만든 파일을 로컬 디렉토리나 S3에 두고 다시 내려준다.
+파일 이름에 결과 id, 형식, 파싱 스키마 버전, 내용 토큰을 넣어 결과가 다시 처리되면 새 파일을 만들고,
+새 파일을 저장할 때 이전 내용으로 만든 같은 결과의 파일은 지운다.
+"""
+import logging
+import os
+import shutil
+import tempfile
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+
+from .utils import get_s3_client
+
+# 내보내기 파일 형식(엑셀 스타일, 컬럼 등)을 바꾸면 올려서 이전 캐시 파일을 쓰지 않게 함
+EXPORT_CACHE_VERSION = 3
+TMP_SUFFIX = '.tmp'
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return settings.OCR_EXPORT_CACHE in ('local', 's3')
+
+
+def _relative_dir(pk):
+    # 한 디렉토리에 파일이 너무 많아지지 않도록 1000개 단위로 나눔
+    return f'{pk // 1000:06d}/{pk}'
+
+
+def _version_marker(ocr_result):
+    return f's{ocr_result.PARSED_SCHEMA_VERSION}-e{EXPORT_CACHE_VERSION}-{ocr_result.version_token}'
+
+
+def _relative_path(ocr_result, fmt):
+    return f'{_relative_dir(ocr_result.pk)}/{fmt}-{_version_marker(ocr_result)}.{fmt}'
+
+
+def _local_path(relative_path):
+    return os.path.join(settings.OCR_EXPORT_CACHE_DIR, relative_path)
+
+
+def _s3_key(relative_path):
+    return f'{settings.OCR_EXPORT_CACHE_S3_PREFIX}{relative_path}'
+
+
+def get_cached_export(ocr_result, fmt):
+    """캐시된 내보내기 파일 위치 ('local', 경로) 또는 ('s3', 키) - 없으면 None"""
+    relative_path = _relative_path(ocr_result, fmt)
+    if settings.OCR_EXPORT_CACHE == 's3':
+        key = _s3_key(relative_path)
+        try:
+            get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        except ClientError:
+            return None
+        return 's3', key
+
+    path = _local_path(relative_path)
+    return ('local', path) if os.path.exists(path) else None
+
+
+def store_export(ocr_result, fmt, chunks, content_type):
+    """chunks(bytes 또는 str 조각)를 캐시에 저장하고 get_cached_export와 같은 형태의 위치를 반환"""
+    relative_path = _relative_path(ocr_result, fmt)
+
+    if settings.OCR_EXPORT_CACHE == 's3':
+        with tempfile.TemporaryFile() as f:
+            _write_chunks(f, chunks)
+            f.seek(0)
+            key = _s3_key(relative_path)
+            get_s3_client().upload_fileobj(
+                f, settings.AWS_STORAGE_BUCKET_NAME, key,
+                ExtraArgs={'ContentType': content_type},
+            )
+        _delete_stale_exports(ocr_result)
+        return 's3', key
+
+    path = _local_path(relative_path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # 쓰다가 중단돼도 깨진 파일을 내려주지 않도록 임시 파일에 쓴 뒤 교체
+    # (같은 프로세스의 여러 스레드가 같은 파일을 만들어도 겹치지 않는 임시 파일 이름 사용)
+    f = tempfile.NamedTemporaryFile(dir=directory, prefix=f'{os.path.basename(path)}.', suffix=TMP_SUFFIX, delete=False)
+    try:
+        with f:
+            _write_chunks(f, chunks)
+        os.replace(f.name, path)
+    except Exception:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+    _delete_stale_exports(ocr_result)
+    return 'local', path
+
+
+def _write_chunks(f, chunks):
+    for chunk in chunks:
+        f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+
+def presigned_export_url(key, filename, content_type):
+    """S3에 캐시된 내보내기 파일의 다운로드용 presigned URL"""
+    return get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+            'Key': key,
+            'ResponseContentDisposition': f'attachment; filename="{filename}"',
+            'ResponseContentType': content_type,
+        },
+        ExpiresIn=settings.OCR_EXPORT_CACHE_URL_EXPIRES,
+    )
+
+
+def _delete_stale_exports(ocr_result):
+    """결과가 다시 처리되기 전 내용(이전 토큰/버전)으로 만든 내보내기 파일 삭제"""
+    marker = f'-{_version_marker(ocr_result)}.'
+    try:
+        if settings.OCR_EXPORT_CACHE == 's3':
+            client = get_s3_client()
+            prefix = _s3_key(_relative_dir(ocr_result.pk)) + '/'
+            listing = client.list_objects_v2(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix)
+            objects = [{'Key': item['Key']} for item in listing.get('Contents', []) if marker not in item['Key']]
+            if objects:
+                client.delete_objects(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Delete={'Objects': objects})
+        else:
+            directory = _local_path(_relative_dir(ocr_result.pk))
+            for name in os.listdir(directory):
+                # 다른 요청이 아직 쓰고 있는 임시 파일은 건드리지 않음
+                if marker not in name and not name.endswith(TMP_SUFFIX):
+                    os.remove(os.path.join(directory, name))
+    except (OSError, ClientError) as e:
+        logger.warning("이전 내보내기 파일 삭제 오류 (id=%s): %s", ocr_result.pk, e)
+
+
+def delete_cached_exports(pk):
+    """결과의 캐시된 내보내기 파일을 모두 삭제"""
+    if settings.OCR_EXPORT_CACHE == 's3':
+        client = get_s3_client()
+        prefix = _s3_key(_relative_dir(pk)) + '/'
+        listing = client.list_objects_v2(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix)
+        objects = [{'Key': item['Key']} for item in listing.get('Contents', [])]
+        if objects:
+            client.delete_objects(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Delete={'Objects': objects})
+    elif settings.OCR_EXPORT_CACHE == 'local':
+        shutil.rmtree(_local_path(_relative_dir(pk)), ignore_errors=True)
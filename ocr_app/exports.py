@@ -0,0 +1,219 @@
+import csv
+import json
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# 스트리밍 내보내기 형식별 Content-Type
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+MAX_COLUMN_WIDTH = 50
+
+
+def _register_styles(wb):
+    """모든 시트가 공유하는 이름 있는 스타일 등록 (셀마다 스타일 객체를 만들지 않음)"""
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    center_alignment = Alignment(horizontal='center', vertical='center')
+
+    header_style = NamedStyle(name='ocr_header', font=Font(bold=True), border=border, alignment=center_alignment)
+    cell_style = NamedStyle(name='ocr_cell', border=border, alignment=center_alignment)
+    wb.add_named_style(header_style)
+    wb.add_named_style(cell_style)
+    return header_style.name, cell_style.name
+
+
+def _column_widths(table):
+    """열 너비 계산 - write-only 시트는 행보다 열 정보를 먼저 써야 하므로 메모리의 테이블에서 바로 계산"""
+    widths = []
+    for row in table:
+        for col_idx, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            if col_idx >= len(widths):
+                widths.append(length)
+            elif length > widths[col_idx]:
+                widths[col_idx] = length
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def write_excel(tables, output, pages=None):
+    """테이블 목록을 시트별로 write-only 워크북에 기록 (행 단위로 디스크에 흘려 써서 메모리 사용량이 일정함)
+
+    pages(테이블별 페이지 번호)를 주면 시트 이름에 페이지를 함께 표시
+    """
+    wb = Workbook(write_only=True)
+    header_style, cell_style = _register_styles(wb)
+
+    # 각 테이블을 별도 시트로 생성
+    for i, table in enumerate(tables):
+        title = f'P{pages[i]}_Table_{i+1}' if pages else f'Table_{i+1}'
+        ws = wb.create_sheet(title=title)
+
+        for col_idx, width in enumerate(_column_widths(table), 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        # 첫 번째 행은 헤더로 처리
+        for row_idx, row in enumerate(table):
+            style = header_style if row_idx == 0 else cell_style
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.style = style
+                cells.append(cell)
+            ws.append(cells)
+
+    wb.save(output)
+    return output
+
+
+def build_excel_file(tables, pages=None):
+    """엑셀 파일을 임시 파일에 생성해 처음 위치로 되돌린 파일 객체를 반환 (FileResponse로 스트리밍)"""
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_excel(tables, output, pages)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def iter_table_rows(ocr_results):
+    """여러 OCR 결과의 테이블을 (결과 id, 페이지 번호, 테이블 번호, 행 번호, 셀 목록) 단위로 순회"""
+    for ocr_result in ocr_results:
+        for table_index, (page, table) in enumerate(ocr_result.get_table_data(with_pages=True), 1):
+            for row_index, row in enumerate(table, 1):
+                yield ocr_result.pk, page, table_index, row_index, row
+
+
+class _Echo:
+    """csv.writer가 쓴 한 줄을 버퍼에 쌓지 않고 그대로 반환하는 파일 흉내 객체"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """테이블 행을 CSV 줄 단위로 스트리밍 (셀마다 열 하나)
+
+    테이블마다 그 테이블 열 수에 맞춘 헤더 줄(result_id, page, table_index, row_index, col_1..col_N)로
+    구역을 시작하고, 구역 사이에는 빈 줄을 둔다. 파싱된 테이블은 모든 행의 열 수가 같으므로
+    첫 행으로 열 수를 정할 수 있어 전체를 미리 읽지 않고 흘려 보낼 수 있다.
+    """
+    writer = csv.writer(_Echo())
+    current = None
+    for result_id, page, table_index, row_index, row in rows:
+        if (result_id, table_index) != current:
+            if current is not None:
+                yield writer.writerow([])
+            current = (result_id, table_index)
+            yield writer.writerow(
+                ['result_id', 'page', 'table_index', 'row_index']
+                + [f'col_{i}' for i in range(1, len(row) + 1)]
+            )
+        yield writer.writerow([result_id, page, table_index, row_index, *row])
+
+
+def iter_jsonl(rows):
+    """테이블 행을 JSON Lines로 스트리밍"""
+    for result_id, page, table_index, row_index, row in rows:
+        yield json.dumps({
+            'result_id': result_id,
+            'page': page,
+            'table_index': table_index,
+            'row_index': row_index,
+            'cells': row,
+        }, ensure_ascii=False) + '\n'
+
+
+class _ChunkSink:
+    """ParquetWriter가 쓴 바이트를 모아두었다가 제너레이터가 꺼내 가도록 하는 쓰기 전용 파일 객체"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def iter_parquet(rows, batch_size=1000):
+    """테이블 행을 Parquet row group 단위로 스트리밍 (pyarrow 필요)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('result_id', pa.int64()),
+        ('page', pa.int32()),
+        ('table_index', pa.int32()),
+        ('row_index', pa.int32()),
+        ('cells', pa.list_(pa.string())),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def flush_batch(batch):
+        columns = list(zip(*batch))
+        arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush_batch(batch)
+            batch = []
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    if batch:
+        flush_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def is_parquet_available():
+    """Parquet 내보내기에 필요한 pyarrow 설치 여부"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'parquet': iter_parquet,
+}
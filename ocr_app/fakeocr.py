@@ -0,0 +1,150 @@
+"""Clova OCR V2 응답을 흉내 내는 합성 데이터
+
+유료 호출 없이 파서 벤치마크, 가짜 OCR 백엔드, 로컬 가짜 OCR 서버가 같은 응답 형식을 쓰도록 한 곳에 모았다.
+"""
+import hashlib
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_ERROR_STATUSES = (429, 500, 503)
+
+
+def make_synthetic_table(rows, cols, seed=0):
+    """Clova V2 테이블 셀 구조를 흉내 낸 합성 테이블 생성"""
+    rng = random.Random(seed)
+    cells = []
+    for r in range(rows):
+        for c in range(cols):
+            x, y = c * 80, r * 24
+            confidence = round(rng.uniform(0.9, 1.0), 4)
+            cells.append({
+                "rowIndex": r,
+                "columnIndex": c,
+                "rowSpan": 1,
+                "columnSpan": 1,
+                "inferConfidence": confidence,
+                "boundingPoly": {"vertices": [
+                    {"x": x, "y": y}, {"x": x + 80, "y": y},
+                    {"x": x + 80, "y": y + 24}, {"x": x, "y": y + 24},
+                ]},
+                "cellTextLines": [{
+                    "inferConfidence": confidence,
+                    "cellWords": [
+                        {"inferText": f"r{r}c{c}", "inferConfidence": confidence},
+                        {"inferText": str(rng.randint(0, 99999)), "inferConfidence": confidence},
+                    ],
+                }],
+            })
+    return {"cells": cells}
+
+
+def image_seed(image):
+    """요청의 images 항목으로 고정 시드 계산 (같은 이미지는 항상 같은 합성 결과)"""
+    key = image.get('data') or image.get('url') or image.get('name') or ''
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def make_synthetic_image(image, rows, cols, tables=1):
+    """요청 이미지 하나에 대한 V2 응답 images 항목 생성 (행 수는 시드에 따라 절반~최대 사이)"""
+    seed = image_seed(image)
+    rng = random.Random(seed)
+    table_list = []
+    for index in range(tables):
+        table_rows = rng.randint(max(1, rows // 2), max(1, rows))
+        table = make_synthetic_table(table_rows, cols, seed + index)
+        # 테이블이 여러 개면 세로로 이어 붙인 것처럼 좌표를 내림
+        offset = index * (rows + 2) * 24
+        if offset:
+            for cell in table["cells"]:
+                for vertex in cell["boundingPoly"]["vertices"]:
+                    vertex["y"] += offset
+        table_list.append(table)
+
+    return {
+        "uid": uuid.uuid4().hex,
+        "name": image.get('name', ''),
+        "inferResult": "SUCCESS",
+        "message": "SUCCESS",
+        "validationResult": {"result": "NO_REQUESTED"},
+        "convertedImageInfo": {
+            "width": cols * 80,
+            "height": tables * (rows + 2) * 24,
+            "pageIndex": 0,
+            "longImage": False,
+        },
+        "tables": table_list,
+        "fields": [],
+    }
+
+
+def fake_ocr_reply(payload, latency=0.0, error_rate=0.0, rows=20, cols=6, tables=1):
+    """OCR 요청 본문(payload)에 대한 (상태 코드, 응답 본문) 생성
+
+    latency는 이미지당 평균 지연(초, ±50%), error_rate 확률로 429/5xx 오류를 돌려줌
+    """
+    images = payload.get("images") or []
+    if latency:
+        time.sleep(latency * max(1, len(images)) * random.uniform(0.5, 1.5))
+
+    if error_rate and random.random() < error_rate:
+        status = random.choice(FAKE_ERROR_STATUSES)
+        return status, {"code": str(status), "message": "fake OCR error"}
+
+    return 200, {
+        "version": payload.get("version", "V2"),
+        "requestId": payload.get("requestId", ""),
+        "timestamp": int(time.time() * 1000),
+        "images": [make_synthetic_image(image, rows, cols, tables) for image in images],
+    }
+
+
+def parse_table_size(value):
+    """'20x6' 형식의 테이블 크기를 (행, 열)로 변환"""
+    rows, cols = (int(v) for v in value.lower().split('x'))
+    return rows, cols
+
+
+class FakeOCRServer(ThreadingHTTPServer):
+    """요청마다 스레드를 쓰는 가짜 OCR 서버 (동시 접속이 몰려도 연결을 거절하지 않도록 대기열을 늘림)"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_fake_ocr_handler(latency=0.0, error_rate=0.0, rows=20, cols=6, tables=1, verbose=False):
+    """Clova General OCR처럼 POST 본문을 받아 합성 V2 응답을 돌려주는 요청 핸들러 클래스 생성"""
+
+    class FakeOCRHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive 연결 풀까지 실제와 같게 시험
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._reply(400, {'code': '0001', 'message': 'invalid JSON'})
+                return
+
+            status, body = fake_ocr_reply(
+                payload, latency=latency, error_rate=error_rate, rows=rows, cols=cols, tables=tables,
+            )
+            self._reply(status, body)
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    return FakeOCRHandler
@@ -1,6 +1,38 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
 from django import forms
+from django.conf import settings
+from django.core.files import File
 from .models import OCRResult
 
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.pdf', '.tif', '.tiff']
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+
+def validate_image_file(image_file):
+    """업로드 이미지의 크기/확장자 검증 (단건/일괄 업로드 공용)"""
+    # 파일 크기 체크 (10MB 제한)
+    if image_file.size > MAX_UPLOAD_SIZE:
+        raise forms.ValidationError("파일 크기는 10MB를 초과할 수 없습니다.")
+
+    # 파일 확장자 체크
+    file_extension = image_file.name.lower().split('.')[-1]
+    if f'.{file_extension}' not in ALLOWED_EXTENSIONS:
+        raise forms.ValidationError("JPG, JPEG, PNG, PDF, TIFF 파일만 업로드 가능합니다.")
+
+
+def _extract_to_spooled_file(zf, info, name):
+    """ZIP 항목을 작은 파일은 메모리, 큰 파일은 임시 파일로 풀어냄 (요청당 메모리 사용량 상한)"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    with zf.open(info) as src:
+        shutil.copyfileobj(src, spooled, 64 * 1024)
+    spooled.seek(0)
+    return File(spooled, name=name)
+
+
 class ImageUploadForm(forms.ModelForm):
     class Meta:
         model = OCRResult
@@ -8,22 +40,122 @@ class ImageUploadForm(forms.ModelForm):
         widgets = {
             'image_file': forms.FileInput(attrs={
                 'class': 'form-control',
-                'accept': '.jpg,.jpeg,.png',
+                'accept': '.jpg,.jpeg,.png,.pdf,.tif,.tiff',
                 'id': 'imageFile'
             })
         }
-    
+
     def clean_image_file(self):
         image_file = self.cleaned_data.get('image_file')
         if image_file:
-            # 파일 크기 체크 (10MB 제한)
-            if image_file.size > 10 * 1024 * 1024:
-                raise forms.ValidationError("파일 크기는 10MB를 초과할 수 없습니다.")
-            
-            # 파일 확장자 체크
-            allowed_extensions = ['.jpg', '.jpeg', '.png']
-            file_extension = image_file.name.lower().split('.')[-1]
-            if f'.{file_extension}' not in allowed_extensions:
-                raise forms.ValidationError("JPG, JPEG, PNG 파일만 업로드 가능합니다.")
-        
+            validate_image_file(image_file)
+
         return image_file
+
+
+class DirectUploadForm(forms.Form):
+    """브라우저 → S3 직접 업로드 presign 요청 검증"""
+    filename = forms.CharField(max_length=255)
+    size = forms.IntegerField(min_value=1)
+
+    def clean_filename(self):
+        filename = os.path.basename(self.cleaned_data['filename'])
+        if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+            raise forms.ValidationError("JPG, JPEG, PNG, PDF, TIFF 파일만 업로드 가능합니다.")
+        return filename
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if size > MAX_UPLOAD_SIZE:
+            raise forms.ValidationError("파일 크기는 10MB를 초과할 수 없습니다.")
+        return size
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """여러 파일을 한 필드로 받는 FileField"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data if d]
+        return [single_file_clean(data, initial)] if data else []
+
+
+def too_many_files_message():
+    return f"한 번에 최대 {settings.OCR_BATCH_MAX_FILES}장까지 업로드할 수 있습니다."
+
+
+class BatchUploadForm(forms.Form):
+    """여러 장의 이미지 또는 이미지가 담긴 ZIP 파일 일괄 업로드"""
+    images = MultipleFileField(required=False)
+    archive = forms.FileField(required=False)
+
+    def clean_images(self):
+        images = self.cleaned_data.get('images') or []
+        for image_file in images:
+            validate_image_file(image_file)
+        return images
+
+    def clean_archive(self):
+        archive = self.cleaned_data.get('archive')
+        if not archive:
+            return []
+
+        if archive.size > settings.OCR_BATCH_MAX_ARCHIVE_SIZE:
+            raise forms.ValidationError(
+                f"ZIP 파일 크기는 {settings.OCR_BATCH_MAX_ARCHIVE_SIZE // (1024 * 1024)}MB를 초과할 수 없습니다."
+            )
+        if not zipfile.is_zipfile(archive):
+            raise forms.ValidationError("ZIP 파일만 업로드 가능합니다.")
+        archive.seek(0)
+
+        files = []
+        with zipfile.ZipFile(archive) as zf:
+            infos = zf.infolist()
+            # 풀기 전에 목록만으로 항목 수와 전체 크기 확인 (압축 폭탄 방지)
+            # 항목을 읽을 때 zipfile이 헤더의 크기까지만 풀어 주므로 헤더 값으로 상한을 지킬 수 있음
+            if len(infos) > settings.OCR_BATCH_MAX_ARCHIVE_MEMBERS:
+                raise forms.ValidationError(
+                    f"ZIP 파일에는 최대 {settings.OCR_BATCH_MAX_ARCHIVE_MEMBERS}개 항목까지 담을 수 있습니다."
+                )
+            if sum(info.file_size for info in infos) > settings.OCR_BATCH_MAX_UNCOMPRESSED_SIZE:
+                raise forms.ValidationError(
+                    f"ZIP 파일을 푼 전체 크기는 {settings.OCR_BATCH_MAX_UNCOMPRESSED_SIZE // (1024 * 1024)}MB를 "
+                    "초과할 수 없습니다."
+                )
+            for info in infos:
+                if info.is_dir():
+                    continue
+                name = os.path.basename(info.filename)
+                if not name or name.startswith('.'):
+                    continue
+                if os.path.splitext(name)[1].lower() not in ALLOWED_EXTENSIONS:
+                    continue
+                if info.file_size > MAX_UPLOAD_SIZE:
+                    raise forms.ValidationError(f"{name}: 파일 크기는 10MB를 초과할 수 없습니다.")
+                if len(files) >= settings.OCR_BATCH_MAX_FILES:
+                    raise forms.ValidationError(too_many_files_message())
+                try:
+                    files.append(_extract_to_spooled_file(zf, info, name))
+                except (zipfile.BadZipFile, EOFError):
+                    # 헤더와 실제 내용이 다른 항목 (CRC 불일치 등)
+                    raise forms.ValidationError(f"{name}: 손상된 ZIP 항목입니다.")
+        return files
+
+    def clean(self):
+        cleaned_data = super().clean()
+        files = list(cleaned_data.get('images') or []) + list(cleaned_data.get('archive') or [])
+        if not files:
+            raise forms.ValidationError("업로드할 이미지가 없습니다.")
+        if len(files) > settings.OCR_BATCH_MAX_FILES:
+            raise forms.ValidationError(too_many_files_message())
+        cleaned_data['files'] = files
+        return cleaned_data
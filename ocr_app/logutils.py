@@ -0,0 +1,53 @@
+"""요청 ID가 붙는 구조화 로그
+
+RequestMetricsMiddleware가 요청마다 ID를 contextvar에 넣고, 로그 필터가 모든 레코드에 request_id를 붙인다.
+OCR_LOG_FORMAT=json이면 한 줄에 JSON 객체 하나씩 출력해 로그 수집기에서 바로 검색할 수 있다.
+"""
+import contextvars
+import json
+import logging
+
+_request_id = contextvars.ContextVar('ocr_request_id', default='-')
+
+# LogRecord 기본 속성 - 이 외의 속성은 logger 호출 시 extra로 넘긴 값으로 보고 JSON에 포함
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(request_id):
+    """현재 컨텍스트의 요청 ID 설정 (reset_request_id에 넘길 토큰 반환)"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+class RequestIDFilter(logging.Filter):
+    """모든 로그 레코드에 현재 요청 ID를 붙임"""
+
+    def filter(self, record):
+        record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """로그 레코드를 한 줄짜리 JSON으로 변환 (extra로 넘긴 필드 포함)"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', get_request_id()),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
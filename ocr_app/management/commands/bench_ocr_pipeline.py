@@ -0,0 +1,262 @@
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from PIL import Image
+
+from ocr_app.backends import OCRBackend
+from ocr_app.fakeocr import make_synthetic_table
+from ocr_app.models import OCRResult
+from ocr_app.tasks import claim_jobs, process_ocr_jobs
+
+DEFAULT_CASES = '1x2x5,1x10x10,1x40x25,1x100x100,10x10x10,50x10x20'
+
+
+def make_synthetic_response(tables, rows, cols):
+    """테이블 tables개(각 rows x cols)가 담긴 이미지 한 장짜리 Clova V2 응답"""
+    return {
+        'version': 'V2',
+        'requestId': 'bench',
+        'timestamp': 0,
+        'images': [{
+            'inferResult': 'SUCCESS',
+            'message': 'SUCCESS',
+            'tables': [make_synthetic_table(rows, cols, seed) for seed in range(tables)],
+        }],
+    }
+
+
+class SyntheticBackend(OCRBackend):
+    """벤치마크 케이스의 합성 응답을 그대로 돌려주는 백엔드 (네트워크/지연 없음)"""
+
+    response = None
+
+    def recognize(self, images):
+        return [json.loads(json.dumps(self.response)) for _ in images]
+
+
+def _parse_case(value):
+    tables, rows, cols = (int(v) for v in value.lower().split('x'))
+    return tables, rows, cols
+
+
+def _make_upload(index):
+    # 내용이 매번 달라야 중복 업로드 재사용에 걸리지 않음
+    image = Image.new('RGB', (1200, 800), 'white')
+    image.putpixel((index % 1200, index // 1200 % 800), (0, 0, 0))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return SimpleUploadedFile(f'bench_{index}.png', output.getvalue(), content_type='image/png')
+
+
+def _consume(response):
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'repeat': len(timings),
+        'median_ms': round(statistics.median(ordered) * 1000, 3),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = '합성 Clova 응답 크기별로 파싱/결과 화면/내보내기/업로드~OCR 전체 경로의 처리 시간을 측정해 JSON으로 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cases', default=DEFAULT_CASES,
+            help='측정할 응답 크기 목록 (테이블수x행x열, 쉼표 구분)',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='항목별 반복 횟수')
+        parser.add_argument('--output', default='ocr_benchmark.json', help='결과 JSON 파일 경로')
+        parser.add_argument('--compare', help='비교할 이전 결과 JSON 파일 (중앙값 변화율 출력)')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='--compare 기준 중앙값이 이 비율(%%) 이상 느려진 항목이 있으면 실패 처리',
+        )
+
+    def handle(self, *args, **options):
+        cases = [_parse_case(value) for value in options['cases'].split(',') if value]
+        repeat = max(1, options['repeat'])
+        self.upload_count = 0
+
+        # 실제 DB/미디어/원본 저장소를 건드리지 않도록 테스트 DB와 임시 디렉토리에서 실행
+        workdir = tempfile.mkdtemp(prefix='ocr-bench-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                MEDIA_ROOT=os.path.join(workdir, 'media'),
+                OCR_RAW_STORAGE='local',
+                OCR_RAW_STORAGE_DIR=os.path.join(workdir, 'raw'),
+                OCR_EXPORT_CACHE='local',
+                OCR_EXPORT_CACHE_DIR=os.path.join(workdir, 'exports'),
+                OCR_BACKEND=f'{__name__}.SyntheticBackend',
+                NAVER_OCR_INLINE_IMAGES=True,
+                OCR_ARCHIVE_TO_S3=False,
+                OCR_DEDUP_ENABLED=True,
+                OCR_DEBUG_DUMP_DIR='',
+            ):
+                results = []
+                for case in cases:
+                    results.extend(self._run_case(case, repeat))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'raw_compression': settings.OCR_RAW_COMPRESSION,
+                'repeat': repeat,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"결과를 {options['output']}에 저장했습니다."))
+
+        if options['compare']:
+            self._compare(results, options['compare'], options['max_regression'])
+
+    def _run_case(self, case, repeat):
+        tables, rows, cols = case
+        label = f'{tables}x{rows}x{cols}'
+        response = make_synthetic_response(tables, rows, cols)
+        SyntheticBackend.response = response
+        client = Client()
+
+        # 전체 업로드 경로로 결과를 만들고, 마지막 결과를 이후 항목에서 재사용
+        def ingest():
+            self.upload_count += 1
+            upload = _make_upload(self.upload_count)
+            started = time.perf_counter()
+            client.post(reverse('index'), {'image_file': upload})
+            posted = time.perf_counter()
+            process_ocr_jobs(claim_jobs(1))
+            return posted - started, time.perf_counter() - posted
+
+        ingest()  # 프로세스 풀/스레드 풀 준비 시간은 제외
+        ingest_timings = [ingest() for _ in range(repeat)]
+        ocr_result = OCRResult.objects.order_by('-pk').first()
+        if ocr_result.status != OCRResult.STATUS_DONE:
+            raise CommandError(f'{label}: OCR 처리 실패 - {ocr_result.error_message}')
+        pk = ocr_result.pk
+
+        result_url = reverse('ocr_result', kwargs={'pk': pk})
+        boxes_url = reverse('api_result_boxes', kwargs={'pk': pk})
+
+        def fresh():
+            return OCRResult.objects.get(pk=pk)
+
+        def download(url, export_cache):
+            # off면 매번 파일을 새로 만드는 시간, local이면 캐시된 파일을 내려주는 시간
+            def run():
+                with override_settings(OCR_EXPORT_CACHE=export_cache):
+                    _consume(client.get(url))
+            return run
+
+        excel_url = reverse('download_excel', kwargs={'pk': pk})
+        csv_url = reverse('download_export', kwargs={'pk': pk, 'fmt': 'csv'})
+
+        def parse():
+            result = fresh()
+            result.raw_result  # 원본 로드 시간은 제외하고 파싱만 측정
+            started = time.perf_counter()
+            result.refresh_parsed_tables(save=False)
+            return time.perf_counter() - started
+
+        benchmarks = {
+            'index_post': [t[0] for t in ingest_timings],
+            'ocr_process': [t[1] for t in ingest_timings],
+            'index_full': [t[0] + t[1] for t in ingest_timings],
+            'parse_tables': self._time(parse, repeat, timed_inside=True),
+            'get_table_data': self._time(lambda: fresh().get_table_data(), repeat),
+            'get_table_data_with_confidence': self._time(lambda: fresh().get_table_data_with_confidence(), repeat),
+            'get_bounding_boxes': self._time(lambda: fresh().get_bounding_boxes(), repeat),
+            'result_view': self._time(lambda: cache.clear() or client.get(result_url), repeat),
+            'result_view_cached': self._time(lambda: client.get(result_url), repeat),
+            'result_boxes': self._time(lambda: cache.clear() or client.get(boxes_url), repeat),
+            'download_excel': self._time(download(excel_url, 'off'), repeat),
+            'download_excel_cached': self._time(download(excel_url, 'local'), repeat),
+            'download_csv': self._time(download(csv_url, 'off'), repeat),
+            'download_csv_cached': self._time(download(csv_url, 'local'), repeat),
+        }
+
+        cells = tables * rows * cols
+        self.stdout.write(f'[{label}] 테이블 {tables}개, {cells}셀')
+        entries = []
+        for name, timings in benchmarks.items():
+            summary = _summarize(timings)
+            self.stdout.write(f"  {name:<32} 중앙값 {summary['median_ms']:>10.3f}ms  p95 {summary['p95_ms']:>10.3f}ms")
+            entries.append({'case': label, 'tables': tables, 'cells': cells, 'name': name, **summary})
+        return entries
+
+    def _time(self, func, repeat, timed_inside=False):
+        func()  # 워밍업
+        timings = []
+        for _ in range(repeat):
+            if timed_inside:
+                timings.append(func())
+                continue
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def _compare(self, results, path, max_regression):
+        with open(path, encoding='utf-8') as f:
+            baseline = {(r['case'], r['name']): r for r in json.load(f)['results']}
+
+        regressions = []
+        self.stdout.write(f'{path} 대비 중앙값 변화:')
+        for entry in results:
+            previous = baseline.get((entry['case'], entry['name']))
+            if not previous or not previous['median_ms']:
+                continue
+            change = (entry['median_ms'] / previous['median_ms'] - 1) * 100
+            self.stdout.write(f"  [{entry['case']}] {entry['name']:<32} {change:+7.1f}%")
+            if max_regression is not None and change >= max_regression:
+                regressions.append(f"{entry['case']} {entry['name']} ({change:+.1f}%)")
+
+        if regressions:
+            raise CommandError('성능 저하 항목: ' + ', '.join(regressions))
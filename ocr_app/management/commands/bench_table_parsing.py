@@ -0,0 +1,37 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from ocr_app.fakeocr import make_synthetic_table
+from ocr_app.parsing import extract_table
+
+
+class Command(BaseCommand):
+    help = '테이블 파서의 테이블당 처리 시간을 크기별로 측정합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10x10,40x25,100x50,100x100',
+            help='측정할 테이블 크기 목록 (행x열, 쉼표 구분)',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='크기별 반복 횟수')
+
+    def handle(self, *args, **options):
+        for size in options['sizes'].split(','):
+            rows, cols = (int(v) for v in size.lower().split('x'))
+            table = make_synthetic_table(rows, cols)
+            cell_count = rows * cols
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                extract_table(table, [])
+                timings.append(time.perf_counter() - started)
+
+            median = statistics.median(timings)
+            self.stdout.write(
+                f'{rows}x{cols} ({cell_count}셀): '
+                f'중앙값 {median * 1000:.2f}ms, 최소 {min(timings) * 1000:.2f}ms, '
+                f'셀당 {median / cell_count * 1e6:.2f}µs'
+            )
@@ -0,0 +1,199 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from PIL import Image
+
+from ocr_app.fakeocr import FakeOCRServer, make_fake_ocr_handler, parse_table_size
+from ocr_app.utils import get_async_http_client, is_async_http_available, reset_clients
+
+MODES = ('async', 'threads')
+
+
+class _InFlight:
+    """가짜 OCR 서버가 동시에 처리 중인 요청 수와 최대값"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        with self.lock:
+            self.current -= 1
+
+    def reset(self):
+        with self.lock:
+            self.current = 0
+            self.peak = 0
+
+
+def _start_fake_server(options, in_flight):
+    rows, cols = parse_table_size(options['table_size'])
+    base = make_fake_ocr_handler(latency=options['latency'], rows=rows, cols=cols)
+
+    class CountingHandler(base):
+        def do_POST(self):
+            in_flight.enter()
+            try:
+                super().do_POST()
+            finally:
+                in_flight.leave()
+
+    server = FakeOCRServer(('127.0.0.1', 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/general'
+
+
+def _make_upload(index):
+    # 내용이 매번 달라야 중복 업로드 재사용에 걸리지 않음
+    image = Image.new('RGB', (400, 300), 'white')
+    image.putpixel((index % 400, index // 400 % 300), (0, 0, 0))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return SimpleUploadedFile(f'load_{index}.png', output.getvalue(), content_type='image/png')
+
+
+def _percentile(ordered, ratio):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class Command(BaseCommand):
+    help = ('가짜 OCR 서버를 띄우고 /api/ocr/에 동시 요청을 보내 비동기(httpx)와 스레드(requests) 방식의 '
+            '처리량/지연 시간을 비교합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='모드별 전체 요청 수')
+        parser.add_argument('--concurrency', type=int, default=100, help='동시에 보내는 요청 수')
+        parser.add_argument('--latency', type=float, default=0.5, help='가짜 OCR 서버의 이미지당 평균 지연(초)')
+        parser.add_argument('--table-size', default='5x4', help='가짜 응답의 테이블 크기 (행x열)')
+        parser.add_argument('--threads', type=int, default=10, help='threads 모드에서 OCR 호출에 쓰는 스레드 수')
+        parser.add_argument('--modes', default=','.join(MODES), help='측정할 방식 (async, threads 중 쉼표 구분)')
+        parser.add_argument('--output', default='ocr_loadtest.json', help='결과 JSON 파일 경로')
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"알 수 없는 모드: {', '.join(sorted(unknown))}")
+        if 'async' in modes and not is_async_http_available():
+            raise CommandError('async 모드에는 httpx 패키지가 필요합니다.')
+        self.upload_count = 0
+
+        in_flight = _InFlight()
+        server, url = _start_fake_server(options, in_flight)
+
+        # 실제 DB/미디어를 건드리지 않도록 테스트 DB와 임시 디렉토리에서 실행
+        workdir = tempfile.mkdtemp(prefix='ocr-loadtest-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                MEDIA_ROOT=os.path.join(workdir, 'media'),
+                OCR_RAW_STORAGE='local',
+                OCR_RAW_STORAGE_DIR=os.path.join(workdir, 'raw'),
+                OCR_BACKEND='clova',
+                NAVER_OCR_API_URL=url,
+                NAVER_OCR_INLINE_IMAGES=True,
+                NAVER_OCR_RATE_LIMIT=0,
+                OCR_ARCHIVE_TO_S3=False,
+                OCR_PREPROCESS_ENABLED=False,
+                OCR_METRICS_DIR='',
+                OCR_DEBUG_DUMP_DIR='',
+            ):
+                results = []
+                for mode in modes:
+                    in_flight.reset()
+                    result = self._run_mode(mode, options)
+                    result['peak_in_flight'] = in_flight.peak
+                    results.append(result)
+                    self.stdout.write(
+                        f"[{mode}] {result['ok']}/{result['requests']} 성공, "
+                        f"{result['throughput_rps']:.1f} req/s, "
+                        f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+                        f"OCR 동시 처리 최대 {result['peak_in_flight']}"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+            server.shutdown()
+            server.server_close()
+            reset_clients()
+
+        report = {
+            'meta': {
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'latency': options['latency'],
+                'threads': options['threads'],
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"결과를 {options['output']}에 저장했습니다."))
+
+    def _run_mode(self, mode, options):
+        with override_settings(OCR_ASYNC_HTTP=(mode == 'async')):
+            return asyncio.run(self._fire(mode, options))
+
+    async def _fire(self, mode, options):
+        if mode == 'threads':
+            # 동기 백엔드는 기본 스레드 풀에서 실행되므로 풀 크기가 곧 OCR 동시 호출 수
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=options['threads']))
+
+        client = AsyncClient()
+        url = reverse('api_ocr')
+        semaphore = asyncio.Semaphore(max(1, options['concurrency']))
+        latencies = []
+        statuses = {}
+
+        async def one():
+            self.upload_count += 1
+            upload = _make_upload(self.upload_count)
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, {'image_file': upload})
+                latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(one() for _ in range(max(1, options['requests']))))
+        finally:
+            if mode == 'async':
+                await get_async_http_client().aclose()
+        elapsed = time.perf_counter() - started
+
+        ordered = sorted(latencies)
+        return {
+            'mode': mode,
+            'requests': len(ordered),
+            'ok': statuses.get(200, 0),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(ordered) / elapsed, 3),
+            'p50_ms': round(statistics.median(ordered) * 1000, 3),
+            'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+        }
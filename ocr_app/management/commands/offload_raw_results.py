@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ocr_app.models import OCRResult
+
+
+class Command(BaseCommand):
+    help = 'DB 행에 저장된 원본 OCR 응답을 압축해 외부 저장소(OCR_RAW_STORAGE)로 옮깁니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=50,
+            help='한 번에 메모리로 읽어올 행 수',
+        )
+
+    def handle(self, *args, **options):
+        if settings.OCR_RAW_STORAGE == 'db':
+            raise CommandError('OCR_RAW_STORAGE가 db로 설정되어 있어 옮길 저장소가 없습니다.')
+
+        queryset = (
+            OCRResult.objects.filter(raw_result_key='')
+            .exclude(ocr_result={})
+            .only('id', 'ocr_result')
+        )
+
+        count = 0
+        total_bytes = 0
+        for ocr_result in queryset.iterator(chunk_size=options['chunk_size']):
+            ocr_result.set_raw_result(ocr_result.ocr_result)
+            ocr_result.save(update_fields=['ocr_result', 'raw_result_key', 'raw_result_bytes'])
+            count += 1
+            total_bytes += ocr_result.raw_result_bytes
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{count}건의 원본 OCR 결과를 옮겼습니다. (압축 후 {total_bytes / 1024:.1f}KB)'
+        ))
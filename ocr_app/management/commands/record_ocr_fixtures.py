@@ -0,0 +1,41 @@
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ocr_app.models import OCRResult
+
+
+class Command(BaseCommand):
+    help = '처리가 끝난 OCR 결과의 원본 응답을 fixture 재생 백엔드(OCR_BACKEND=fixture)용 파일로 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.OCR_FIXTURE_DIR,
+            help='fixture를 저장할 디렉토리',
+        )
+        parser.add_argument('--limit', type=int, default=100, help='저장할 최대 결과 수 (최근 순)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+
+        queryset = (
+            OCRResult.objects.filter(status=OCRResult.STATUS_DONE, has_result=True)
+            .order_by('-created_at', '-id')
+            .only('id', 'ocr_result', 'raw_result_key')
+        )[:options['limit']]
+
+        count = 0
+        for ocr_result in queryset.iterator(chunk_size=50):
+            raw_result = ocr_result.raw_result
+            if not raw_result:
+                continue
+            path = os.path.join(output, f'{ocr_result.pk}.json.gz')
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump(raw_result, f, ensure_ascii=False)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{count}건의 OCR 응답을 {output}에 저장했습니다.'))
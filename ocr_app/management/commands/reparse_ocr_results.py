@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from ocr_app.models import OCRResult
+
+
+class Command(BaseCommand):
+    help = '파싱 결과가 없거나 스키마 버전이 오래된 OCR 결과를 다시 파싱해 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='스키마 버전과 관계없이 모든 완료된 결과를 다시 파싱',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='한 번에 메모리로 읽어올 행 수',
+        )
+
+    def handle(self, *args, **options):
+        queryset = OCRResult.objects.filter(status=OCRResult.STATUS_DONE)
+        if not options['all']:
+            queryset = queryset.exclude(parsed_version=OCRResult.PARSED_SCHEMA_VERSION)
+
+        count = 0
+        for ocr_result in queryset.iterator(chunk_size=options['chunk_size']):
+            ocr_result.refresh_parsed_tables()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{count}건의 OCR 결과를 다시 파싱했습니다.'))
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ocr_app.fakeocr import FakeOCRServer, make_fake_ocr_handler, parse_table_size
+
+
+class Command(BaseCommand):
+    help = '부하 테스트용으로 Clova OCR V2 형식의 합성 응답을 돌려주는 로컬 가짜 OCR 서버를 실행합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument(
+            '--latency', type=float, default=settings.OCR_FAKE_LATENCY,
+            help='이미지당 평균 응답 지연(초, ±50%%)',
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=settings.OCR_FAKE_ERROR_RATE,
+            help='429/5xx 오류를 돌려줄 확률 (0~1)',
+        )
+        parser.add_argument(
+            '--table-size', default=settings.OCR_FAKE_TABLE_SIZE,
+            help='이미지당 테이블 최대 크기 (행x열)',
+        )
+        parser.add_argument(
+            '--tables', type=int, default=settings.OCR_FAKE_TABLES,
+            help='이미지당 테이블 수',
+        )
+        parser.add_argument('--verbose', action='store_true', help='요청마다 접근 로그 출력')
+
+    def handle(self, *args, **options):
+        rows, cols = parse_table_size(options['table_size'])
+        handler = make_fake_ocr_handler(
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            rows=rows,
+            cols=cols,
+            tables=options['tables'],
+            verbose=options['verbose'],
+        )
+        server = FakeOCRServer((options['host'], options['port']), handler)
+        url = f"http://{options['host']}:{server.server_port}/general"
+        self.stdout.write(f'가짜 OCR 서버 실행 중: {url}')
+        self.stdout.write(f'워커에서 NAVER_OCR_API_URL={url} 로 설정하면 이 서버로 요청합니다.')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('가짜 OCR 서버 종료')
+        finally:
+            server.server_close()
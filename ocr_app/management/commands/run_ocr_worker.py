@@ -0,0 +1,70 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(poll_interval, once):
+    """자식 프로세스 진입점 - 부모의 DB 연결을 공유하지 않도록 새로 연결"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+    from ocr_app.tasks import run_worker
+    try:
+        run_worker(poll_interval=poll_interval, once=once)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'OCR 작업 대기열을 처리하는 워커 프로세스 풀을 실행합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.OCR_WORKER_PROCESSES,
+            help='동시에 실행할 워커 프로세스 수',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.OCR_WORKER_POLL_INTERVAL,
+            help='대기열이 비었을 때 다시 확인하기까지 대기 시간(초)',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='대기열을 한 번 비운 뒤 종료',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        self.stdout.write(f'OCR 워커 시작: 프로세스 {processes}개')
+
+        if processes == 1:
+            _worker_main(poll_interval, once)
+            return
+
+        # fork 전에 연결을 닫아 자식 프로세스가 같은 소켓을 물려받지 않게 함
+        # (워커가 전처리용 프로세스 풀을 만들 수 있도록 daemon 프로세스로 띄우지 않음)
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_main, args=(poll_interval, once))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('OCR 워커 종료 중...')
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
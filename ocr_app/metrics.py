@@ -0,0 +1,253 @@
+"""처리 단계별 소요 시간(히스토그램)과 카운터 수집 - Prometheus 텍스트 형식으로 노출
+
+각 프로세스는 값을 메모리에 모으고, OCR_METRICS_DIR이 설정되어 있으면 주기적으로 <pid>.json 스냅샷을 남긴다.
+/metrics는 자기 프로세스 값과 다른 프로세스의 스냅샷을 합쳐 보여주므로, 웹 프로세스에서 워커의
+S3/OCR 단계 시간까지 한 번에 수집할 수 있다.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_INFO = {
+    'ocr_stage_duration_seconds': ('histogram', '처리 단계별 소요 시간(초)'),
+    'ocr_http_request_duration_seconds': ('histogram', 'HTTP 요청 처리 시간(초)'),
+    'ocr_jobs_total': ('counter', '처리 결과별 OCR 작업 수'),
+    'ocr_api_events_total': ('counter', 'OCR API 호출 이벤트 (요청/재시도/속도 제한/서킷 브레이커)'),
+    'ocr_debug_dumps_total': ('counter', '디버그 OCR 응답 덤프 결과 (저장/버림/오류)'),
+    'ocr_events_total': ('counter', '상태별로 발행한 작업 상태 이벤트 수'),
+}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_state = {'pid': os.getpid(), 'last_flush': 0.0}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _reset_after_fork():
+    # fork된 자식은 부모의 값을 물려받으므로 비우고 시작 (부모 값은 부모 스냅샷에 남아 있음)
+    pid = os.getpid()
+    if _state['pid'] != pid:
+        with _lock:
+            if _state['pid'] != pid:
+                _counters.clear()
+                _histograms.clear()
+                _state['pid'] = pid
+                _state['last_flush'] = 0.0
+
+
+def inc(name, value=1, **labels):
+    """카운터 증가"""
+    _reset_after_fork()
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    """히스토그램에 관측값(초) 기록"""
+    _reset_after_fork()
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0.0, 'count': 0}
+        for index, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                histogram['buckets'][index] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+    _maybe_flush()
+
+
+@contextmanager
+def timed(stage, **labels):
+    """with 블록의 소요 시간을 ocr_stage_duration_seconds{stage=...}에 기록하고 디버그 로그로 남김"""
+    started = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        observe('ocr_stage_duration_seconds', duration, stage=stage, status=status, **labels)
+        logger.debug(
+            '단계 완료: %s (%.1fms)', stage, duration * 1000,
+            extra={'stage': stage, 'duration_ms': round(duration * 1000, 3), 'status': status, **labels},
+        )
+
+
+def counter_values(name, label):
+    """이 프로세스의 카운터 값을 label 값별 dict로 반환"""
+    _reset_after_fork()
+    with _lock:
+        return {
+            dict(labels).get(label): value
+            for (metric, labels), value in _counters.items()
+            if metric == name
+        }
+
+
+def snapshot():
+    """이 프로세스의 현재 값 (JSON 직렬화 가능한 형태)"""
+    _reset_after_fork()
+    with _lock:
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [
+                [name, list(labels), list(h['buckets']), h['sum'], h['count']]
+                for (name, labels), h in _histograms.items()
+            ],
+        }
+
+
+def flush():
+    """OCR_METRICS_DIR에 이 프로세스의 스냅샷 기록 (다른 프로세스의 /metrics가 읽음)"""
+    directory = settings.OCR_METRICS_DIR
+    if not directory:
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot(), f)
+        os.replace(tmp_path, path)
+        _state['last_flush'] = time.monotonic()
+    except OSError as e:
+        logger.warning('지표 스냅샷 저장 오류: %s', e)
+    finally:
+        _flush_lock.release()
+
+
+def _maybe_flush():
+    if settings.OCR_METRICS_DIR and time.monotonic() - _state['last_flush'] >= settings.OCR_METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _merge(total, data):
+    for name, labels, value in data.get('counters', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, buckets, bucket_sum, count in data.get('histograms', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        merged = total['histograms'].get(key)
+        if merged is None:
+            merged = total['histograms'][key] = {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0.0, 'count': 0}
+        for index, value in enumerate(buckets[:len(DEFAULT_BUCKETS)]):
+            merged['buckets'][index] += value
+        merged['sum'] += bucket_sum
+        merged['count'] += count
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        return True  # Windows의 os.kill은 프로세스를 종료시키므로 확인하지 않고 남겨 둠
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # 권한 없음 - 다른 사용자의 살아 있는 프로세스
+    return True
+
+
+def _is_stale_snapshot(path):
+    """이미 끝난 프로세스의 스냅샷인지 여부
+
+    갱신 시각은 보지 않음 - 한가한 프로세스의 스냅샷을 지우면 합산한 카운터가 줄어들어
+    Prometheus rate()가 카운터 초기화로 읽음
+    """
+    try:
+        pid = int(os.path.splitext(os.path.basename(path))[0])
+    except ValueError:
+        return False
+    return not _pid_alive(pid)
+
+
+def collect():
+    """이 프로세스 값과 다른 프로세스 스냅샷을 합친 전체 값"""
+    total = {'counters': {}, 'histograms': {}}
+    _merge(total, snapshot())
+
+    directory = settings.OCR_METRICS_DIR
+    if directory:
+        own_path = os.path.join(directory, f'{os.getpid()}.json')
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            if path == own_path:
+                continue  # 자기 프로세스는 메모리 값을 사용 (중복 집계 방지)
+            if _is_stale_snapshot(path):
+                # 끝난 프로세스의 값이 계속 더해지지 않도록 지움
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    _merge(total, json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning('지표 스냅샷 읽기 오류 (%s): %s', path, e)
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def render_prometheus():
+    """Prometheus 텍스트 노출 형식(0.0.4)으로 변환"""
+    total = collect()
+    lines = []
+    names = sorted({name for name, _ in total['counters']} | {name for name, _ in total['histograms']})
+    for name in names:
+        metric_type, help_text = METRIC_INFO.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        for (metric, labels), value in sorted(total['counters'].items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        for (metric, labels), histogram in sorted(total['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS, histogram['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_bound(bound))])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,77 @@
+import logging
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .logutils import reset_request_id, set_request_id
+from .metrics import observe
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestMetricsMiddleware:
+    """요청마다 요청 ID를 부여하고(X-Request-ID 헤더가 있으면 재사용) 처리 시간을 지표/로그로 남김
+
+    ASGI에서는 비동기로 동작해 비동기 뷰 앞에서 스레드 전환이 생기지 않음
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = self._start(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, time.perf_counter() - started)
+        finally:
+            reset_request_id(token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, time.perf_counter() - started)
+        finally:
+            reset_request_id(token)
+
+    def _start(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        return set_request_id(request_id)
+
+    def _finish(self, request, response, duration):
+        # 경로 대신 URL 이름으로 집계해 지표 라벨 수가 늘어나지 않게 함
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        status_class = f'{response.status_code // 100}xx'
+        observe('ocr_http_request_duration_seconds', duration, view=view, method=request.method, status=status_class)
+
+        response['X-Request-ID'] = request.request_id
+        logger.info(
+            '%s %s %s (%.1fms)', request.method, request.path, response.status_code, duration * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+            },
+        )
+        return response
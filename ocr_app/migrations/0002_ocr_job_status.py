@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+def mark_existing_results_done(apps, schema_editor):
+    """기존 행은 동기 처리 시절에 이미 OCR이 끝난 결과이므로 완료 상태로 표시"""
+    OCRResult = apps.get_model('ocr_app', 'OCRResult')
+    OCRResult.objects.all().update(status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='status',
+            field=models.CharField(choices=[('queued', '대기 중'), ('running', '처리 중'), ('done', '완료'), ('failed', '실패')], db_index=True, default='queued', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='ocrresult',
+            name='image_file',
+            field=models.ImageField(blank=True, null=True, upload_to='uploads/'),
+        ),
+        migrations.AlterField(
+            model_name='ocrresult',
+            name='s3_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(mark_existing_results_done, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0004_ocr_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='parsed_tables',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='parsed_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
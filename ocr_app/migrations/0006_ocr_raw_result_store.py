@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0005_ocr_parsed_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='raw_result_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='raw_result_key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
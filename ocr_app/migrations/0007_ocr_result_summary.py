@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+def fill_has_result(apps, schema_editor):
+    """원본 응답이 있는 완료 행의 has_result 채움 (table_count/cell_count는 reparse_ocr_results로 채움)"""
+    OCRResult = apps.get_model('ocr_app', 'OCRResult')
+    (
+        OCRResult.objects.filter(status='done')
+        .exclude(ocr_result={}, raw_result_key='')
+        .update(has_result=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0006_ocr_raw_result_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='cell_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='has_result',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='table_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='ocrresult',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='ocrresult',
+            index=models.Index(fields=['-created_at', '-id'], name='ocr_result_recent_idx'),
+        ),
+        migrations.RunPython(fill_has_result, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0007_ocr_result_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ocrresult',
+            name='image_file',
+            field=models.FileField(blank=True, null=True, upload_to='uploads/'),
+        ),
+    ]
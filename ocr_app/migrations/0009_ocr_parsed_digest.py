@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0008_ocr_document_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='parsed_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
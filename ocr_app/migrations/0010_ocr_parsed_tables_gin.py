@@ -0,0 +1,33 @@
+from django.db import migrations
+
+INDEX_NAME = 'ocr_result_parsed_gin'
+
+
+def create_parsed_index(apps, schema_editor):
+    # GIN 인덱스는 PostgreSQL(jsonb)에서만 만듦 - SQLite 개발 DB에는 해당 없음
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('ocr_app', 'OCRResult')._meta.db_table
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} '
+        f'ON {schema_editor.quote_name(table)} USING GIN (parsed_tables jsonb_path_ops)'
+    )
+
+
+def drop_parsed_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY는 트랜잭션 안에서 실행할 수 없음 (운영 중인 테이블을 잠그지 않음)
+    atomic = False
+
+    dependencies = [
+        ('ocr_app', '0009_ocr_parsed_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_parsed_index, drop_parsed_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0010_ocr_parsed_tables_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='image_scale',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
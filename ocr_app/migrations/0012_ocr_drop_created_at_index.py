@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0011_ocr_image_scale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ocrresult',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
@@ -1,109 +1,127 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+import hashlib
 import json
+import logging
+import secrets
 
-class OCRResult(models.Model):
-    image_file = models.ImageField(upload_to='uploads/', blank=True, null=True)  # ← 추가
-    s3_url = models.URLField(max_length=500)
-    ocr_result = models.JSONField(default=dict)
+from .blobstore import save_raw_result, load_raw_result, delete_raw_result
+from .exportcache import delete_cached_exports
+from .parsing import extract_tables
+
+logger = logging.getLogger(__name__)
+
+
+class OCRBatch(models.Model):
+    """여러 장을 한 번에 업로드한 일괄 처리 단위 (진행률 추적용)"""
     created_at = models.DateTimeField(auto_now_add=True)
+    total_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"OCR Batch {self.id} - {self.created_at}"
+
+    def get_progress(self):
+        """상태별 작업 수 집계"""
+        counts = {status: 0 for status, _ in OCRResult.STATUS_CHOICES}
+        for row in self.results.values('status').annotate(count=models.Count('id')):
+            counts[row['status']] = row['count']
+        finished = counts[OCRResult.STATUS_DONE] + counts[OCRResult.STATUS_FAILED]
+        return {
+            'total': self.total_count,
+            'counts': counts,
+            'finished': finished,
+            'is_finished': finished >= self.total_count,
+        }
+
+
+class OCRResult(models.Model):
+    # OCR 작업 상태 (업로드 직후 대기 → 워커가 처리 → 완료/실패)
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, '대기 중'),
+        (STATUS_RUNNING, '처리 중'),
+        (STATUS_DONE, '완료'),
+        (STATUS_FAILED, '실패'),
+    ]
+
+    batch = models.ForeignKey(OCRBatch, on_delete=models.SET_NULL, blank=True, null=True, related_name='results')
+    batch_index = models.PositiveIntegerField(blank=True, null=True)  # 일괄 업로드 내 페이지 순서
+    image_file = models.FileField(upload_to='uploads/', blank=True, null=True)  # ← 추가
+    s3_url = models.URLField(max_length=500, blank=True)
+    image_scale = models.FloatField(default=1.0)  # S3에 올린 전처리 이미지의 원본 대비 축소 비율 (재처리 시 좌표 복원)
+    content_hash = models.CharField(max_length=64, unique=True, blank=True, null=True)  # 업로드 파일 SHA-256 (중복 업로드 재사용)
+    ocr_result = models.JSONField(default=dict)  # 외부 저장소를 쓰지 않는 경우(또는 이전 행)의 원본 응답
+    raw_result_key = models.CharField(max_length=255, blank=True)  # 외부 저장소의 원본 응답 포인터
+    raw_result_bytes = models.PositiveIntegerField(default=0)  # 압축된 원본 응답 크기
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    error_message = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)  # 최근순 조회는 ocr_result_recent_idx(-created_at, -id) 사용
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # 인제스트 시 한 번 계산해 두는 파싱 결과 (텍스트/신뢰도 행렬, 병합 정보, 바운딩 박스)
+    parsed_tables = models.JSONField(default=dict, blank=True)
+    parsed_version = models.PositiveSmallIntegerField(default=0)
+    # 목록/관리자 화면용 요약 (큰 JSON 컬럼을 읽지 않고 표시)
+    has_result = models.BooleanField(default=False)
+    table_count = models.PositiveIntegerField(default=0)
+    cell_count = models.PositiveIntegerField(default=0)
+    parsed_digest = models.CharField(max_length=64, blank=True)  # 파싱 결과 SHA-256 (ETag, 내보내기 캐시 키)
+
+    # 파싱 결과 저장 형식이 바뀌면 올려서 기존 행이 다시 파싱되도록 함
+    PARSED_SCHEMA_VERSION = 4
+
+    # 목록 화면에서 읽지 않는 큰 컬럼
+    LARGE_FIELDS = ('ocr_result', 'parsed_tables')
+    # refresh_parsed_tables()가 갱신하는 컬럼
+    PARSED_FIELDS = ['parsed_tables', 'parsed_version', 'has_result', 'table_count', 'cell_count', 'parsed_digest']
+
+    class Meta:
+        indexes = [
+            # 최신순 목록과 커서 페이지네이션 (created_at, id) 용
+            models.Index(fields=['-created_at', '-id'], name='ocr_result_recent_idx'),
+        ]
     
     def __str__(self):
         return f"OCR Result {self.id} - {self.created_at}"
+
+    @property
+    def is_finished(self):
+        """완료 또는 실패로 더 이상 처리할 필요가 없는 작업인지 여부"""
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
     
-    def _safe_cell_text(self, cell: dict) -> str:
-        """셀에서 텍스트를 안전하게 추출 (빈 리스트/누락 key에 견고)"""
-        parts = []
-        for line in (cell.get("cellTextLines") or []):
-            for w in (line.get("cellWords") or []):
-                t = w.get("inferText")
-                if t:
-                    parts.append(str(t))
-        # 일부 엔진은 셀 레벨 inferText만 있을 수 있음
-        if not parts:
-            t = cell.get("inferText")
-            if t:
-                parts.append(str(t))
-        return " ".join(parts).strip()
-
-    def get_table_data(self):
-        """OCR 결과에서 테이블 2차원 배열 목록을 추출"""
-        if not self.ocr_result or not isinstance(self.ocr_result, dict):
-            return []
-
-        tables_out = []
-        images = self.ocr_result.get("images") or []
-
-        for image in images:
-            for table in (image.get("tables") or []):
-                cells = table.get("cells") or []
-
-                # rowSpan/colSpan 감안하여 테이블 크기 산정
-                max_row = 0
-                max_col = 0
-                for cell in cells:
-                    r = int(cell.get("rowIndex", 0) or 0)
-                    c = int(cell.get("columnIndex", 0) or 0)
-                    rspan = int(cell.get("rowSpan", 1) or 1)
-                    cspan = int(cell.get("columnSpan", 1) or 1)
-                    max_row = max(max_row, r + rspan)
-                    max_col = max(max_col, c + cspan)
-
-                if max_row <= 0 or max_col <= 0:
-                    continue
-
-                table_matrix = [[""] * max_col for _ in range(max_row)]
-
-                # 앵커 위치에만 텍스트를 채움(스팬 확장은 필요시 추가로 구현)
-                for cell in cells:
-                    r = int(cell.get("rowIndex", 0) or 0)
-                    c = int(cell.get("columnIndex", 0) or 0)
-                    if r < 0 or c < 0 or r >= max_row or c >= max_col:
-                        continue
-                    text = self._safe_cell_text(cell)
-                    table_matrix[r][c] = text
-
-                # 테이블 구조 정규화
-                normalized_table = self._normalize_table_structure(table_matrix)
-                if normalized_table:
-                    tables_out.append(normalized_table)
-
-        return tables_out
-
-    def _normalize_table_structure(self, table_matrix):
-        """테이블 구조를 정규화하여 DataTable 호환성 향상"""
-        if not table_matrix:
-            return None
-        
-        # 최대 컬럼 수 찾기
-        max_cols = max(len(row) for row in table_matrix) if table_matrix else 0
-        if max_cols == 0:
-            return None
-        
-        # 모든 행을 동일한 컬럼 수로 맞춤
-        normalized_table = []
-        for row in table_matrix:
-            normalized_row = row[:max_cols]  # 초과 컬럼 제거
-            
-            # 부족한 컬럼 채우기
-            while len(normalized_row) < max_cols:
-                normalized_row.append("")
-            
-            normalized_table.append(normalized_row)
-        
-        # 빈 행 제거 (모든 셀이 비어있는 경우)
-        filtered_table = []
-        for row in normalized_table:
-            # 적어도 하나의 셀에 의미있는 내용이 있으면 유지
-            if any(str(cell).strip() for cell in row):
-                filtered_table.append(row)
-        
-        # 테이블이 완전히 비어있지 않으면 반환
-        if filtered_table:
-            return filtered_table
-        
-        # 모든 행이 비어있더라도 원본 구조는 유지 (최소 1행)
-        return normalized_table[:1] if normalized_table else [[""] * max_cols]
-        
+    @property
+    def raw_result(self):
+        """원본 OCR 응답 - 외부 저장소에 있으면 처음 접근할 때 불러와 인스턴스에 캐시"""
+        if '_raw_result' not in self.__dict__:
+            if self.raw_result_key:
+                self.__dict__['_raw_result'] = load_raw_result(self.raw_result_key)
+            else:
+                self.__dict__['_raw_result'] = self.ocr_result
+        return self.__dict__['_raw_result']
+
+    def set_raw_result(self, data):
+        """원본 OCR 응답 저장 - 설정에 따라 압축해 외부 저장소에 두고 행에는 포인터만 남김"""
+        if settings.OCR_RAW_STORAGE == 'db':
+            self.ocr_result = data
+            self.raw_result_key = ''
+            self.raw_result_bytes = 0
+        else:
+            # 쓸 때마다 새 이름 - 트랜잭션이 되돌려져도 커밋된 행이 가리키는 파일을 덮어쓰지 않음
+            name = f'{self.pk}-{secrets.token_hex(4)}'
+            self.raw_result_key, self.raw_result_bytes = save_raw_result(name, data)
+            self.ocr_result = {}
+        self.__dict__['_raw_result'] = data
+
+    @property
+    def has_raw_result(self):
+        return bool(self.raw_result_key or self.ocr_result)
+
     def debug_table_structure(self):
         """테이블 구조 디버깅 정보 반환"""
         table_data = self.get_table_data()
@@ -128,93 +146,115 @@ class OCRResult(models.Model):
             
             debug_info.append(table_info)
         
+    def build_parsed_tables(self):
+        """원본 OCR JSON을 한 번만 순회해 결과 페이지/내보내기에 필요한 형태로 변환"""
+        return {
+            'version': self.PARSED_SCHEMA_VERSION,
+            **extract_tables(self.raw_result),
+        }
+
+    def refresh_parsed_tables(self, save=True):
+        """파싱 결과를 다시 계산해 저장 (OCR 결과가 바뀌었거나 스키마 버전이 올라간 경우)"""
+        self.parsed_tables = self.build_parsed_tables()
+        self.parsed_version = self.PARSED_SCHEMA_VERSION
+        self.__dict__.pop('_parsed', None)
+
+        tables = self.parsed_tables['tables']
+        self.has_result = self.has_raw_result
+        self.table_count = len(tables)
+        self.cell_count = sum(len(t['data']) * (len(t['data'][0]) if t['data'] else 0) for t in tables)
+        self.parsed_digest = hashlib.sha256(
+            json.dumps(self.parsed_tables, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        if save:
+            self.save(update_fields=self.PARSED_FIELDS)
+        return self.parsed_tables
+
+    @property
+    def parsed(self):
+        """저장된 파싱 결과 (없거나 스키마 버전이 다르면 즉석에서 파싱하고 인스턴스에 캐시)"""
+        if '_parsed' not in self.__dict__:
+            if self.parsed_version == self.PARSED_SCHEMA_VERSION and self.parsed_tables:
+                self.__dict__['_parsed'] = self.parsed_tables
+            else:
+                self.__dict__['_parsed'] = self.build_parsed_tables()
+        return self.__dict__['_parsed']
+
+    def get_table_data(self, with_pages=False):
+        """OCR 결과에서 테이블 2차원 배열 목록을 추출 (with_pages면 (페이지 번호, 배열) 목록)"""
+        tables = self.parsed['tables']
+        if with_pages:
+            return [(table.get('page', 1), table['data']) for table in tables]
+        return [table['data'] for table in tables]
+
+    def get_page_count(self):
+        """테이블이 인식된 마지막 페이지 번호 (단일 이미지는 1)"""
+        return max((table.get('page', 1) for table in self.parsed['tables']), default=1)
+
     def get_table_data_with_confidence(self):
         """OCR 결과에서 테이블 2차원 배열과 신뢰도 정보를 함께 추출"""
-        if not self.ocr_result or not isinstance(self.ocr_result, dict):
-            return []
-
-        tables_out = []
-        images = self.ocr_result.get("images") or []
-
-        for image in images:
-            for table in (image.get("tables") or []):
-                cells = table.get("cells") or []
-
-                # rowSpan/colSpan 감안하여 테이블 크기 산정
-                max_row = 0
-                max_col = 0
-                for cell in cells:
-                    r = int(cell.get("rowIndex", 0) or 0)
-                    c = int(cell.get("columnIndex", 0) or 0)
-                    rspan = int(cell.get("rowSpan", 1) or 1)
-                    cspan = int(cell.get("columnSpan", 1) or 1)
-                    max_row = max(max_row, r + rspan)
-                    max_col = max(max_col, c + cspan)
-
-                if max_row <= 0 or max_col <= 0:
-                    continue
-
-                # 텍스트와 신뢰도를 별도로 저장
-                table_matrix = [[""] * max_col for _ in range(max_row)]
-                confidence_matrix = [[1.0] * max_col for _ in range(max_row)]
-
-                # 앵커 위치에 텍스트와 신뢰도 채움
-                for cell in cells:
-                    r = int(cell.get("rowIndex", 0) or 0)
-                    c = int(cell.get("columnIndex", 0) or 0)
-                    if r < 0 or c < 0 or r >= max_row or c >= max_col:
-                        continue
-                    
-                    text = self._safe_cell_text(cell)
-                    table_matrix[r][c] = text
-                    
-                    # 신뢰도 정보 추출
-                    confidence = cell.get("inferConfidence", 1.0)
-                    cell_text_lines = cell.get("cellTextLines") or []
-                    if cell_text_lines:
-                        line_confidence = cell_text_lines[0].get("inferConfidence", confidence)
-                        confidence = min(confidence, line_confidence)
-                    
-                    confidence_matrix[r][c] = confidence
-
-                # 테이블 구조 정규화
-                normalized_table = self._normalize_table_structure(table_matrix)
-                normalized_confidence = self._normalize_table_structure(confidence_matrix)
-                
-                if normalized_table and len(normalized_table) > 0:
-                    tables_out.append({
-                        'data': normalized_table,
-                        'confidence': normalized_confidence
-                    })
-
-        return tables_out
+        return self.parsed['tables']
 
     def get_bounding_boxes(self):
-        """OCR 결과에서 바운딩 박스 정보 추출 (빈 값 안전 처리)"""
-        if not self.ocr_result or not isinstance(self.ocr_result, dict):
-            return []
-
-        boxes = []
-        images = self.ocr_result.get("images") or []
-        for image in images:
-            for table in (image.get("tables") or []):
-                for cell in (table.get("cells") or []):
-                    bp = cell.get("boundingPoly") or {}
-                    vertices = bp.get("vertices") or []
-                    if isinstance(vertices, list) and len(vertices) >= 4:
-                        # 셀의 신뢰도 정보 추출
-                        confidence = cell.get("inferConfidence", 1.0)
-                        
-                        # cellTextLines에서 신뢰도 정보도 확인
-                        cell_text_lines = cell.get("cellTextLines") or []
-                        if cell_text_lines:
-                            # 첫 번째 텍스트 라인의 신뢰도 사용
-                            line_confidence = cell_text_lines[0].get("inferConfidence", confidence)
-                            confidence = min(confidence, line_confidence)
-                        
-                        boxes.append({
-                            "vertices": vertices,
-                            "text": self._safe_cell_text(cell),
-                            "confidence": confidence
-                        })
-        return boxes
\ No newline at end of file
+        """OCR 결과에서 바운딩 박스 정보 추출"""
+        return self.parsed['boxes']
+
+    def get_box_rects(self, page=1):
+        """page의 바운딩 박스를 [x, y, 너비, 높이, 신뢰도(천분율)] 정수 배열 목록으로 반환 (오버레이용)
+
+        텍스트는 같은 순서의 목록으로 get_box_texts()에서 따로 가져옴
+        """
+        rects = []
+        for box in self.parsed['boxes']:
+            if box.get('page', 1) != page:
+                continue
+            xs = [v.get('x', 0) for v in box['vertices']]
+            ys = [v.get('y', 0) for v in box['vertices']]
+            x, y = int(min(xs)), int(min(ys))
+            rects.append([
+                x, y,
+                int(round(max(xs))) - x, int(round(max(ys))) - y,
+                int(round(box.get('confidence', 1.0) * 1000)),
+            ])
+        return rects
+
+    def get_page_size(self, page=1):
+        """page 박스 좌표의 기준 크기 [너비, 높이] (Clova가 변환한 문서 페이지만, 모르면 None)"""
+        return self.parsed.get('pages', {}).get(str(page))
+
+    def get_box_texts(self, page=1):
+        """get_box_rects(page)와 같은 순서의 셀 텍스트 목록"""
+        return [box['text'] for box in self.parsed['boxes'] if box.get('page', 1) == page]
+
+    def cache_key(self, kind):
+        """결과 화면 캐시 키 - 처리 완료 시각/파싱 버전/요약/파싱 결과 다이제스트가 바뀌면 키도 바뀌어 이전 캐시는 쓰이지 않음"""
+        updated = self.finished_at or self.created_at
+        marker = f'{self.parsed_version}.{updated.timestamp() if updated else 0}.{self.table_count}.{self.cell_count}'
+        # 같은 모양과 시각으로 다시 파싱해 셀 내용만 바뀐 경우도 구분
+        return f'ocr_result:{self.pk}:{kind}:{marker}.{self.parsed_digest[:16]}'
+
+    @property
+    def version_token(self):
+        """결과 내용이 바뀌면 함께 바뀌는 짧은 토큰 (ETag와 다운로드 URL의 ?v= 값)"""
+        if self.parsed_digest:
+            return self.parsed_digest[:16]
+        # 다이제스트가 계산되기 전에 저장된 행은 캐시 키의 갱신 표식으로 대신함
+        return hashlib.sha256(self.cache_key('version').encode('utf-8')).hexdigest()[:16]
+
+    def get_etag(self, kind):
+        """kind(응답 종류) 별 ETag 값"""
+        return f'{kind}-{self.version_token}'
+
+
+@receiver(post_delete, sender=OCRResult)
+def delete_external_raw_result(sender, instance, **kwargs):
+    """행이 삭제되면 외부 저장소의 원본 응답과 생성해 둔 내보내기 파일도 함께 삭제"""
+    if instance.raw_result_key:
+        try:
+            delete_raw_result(instance.raw_result_key)
+        except Exception as e:
+            logger.warning("원본 OCR 결과 삭제 오류 (%s): %s", instance.raw_result_key, e)
+    try:
+        delete_cached_exports(instance.pk)
+    except Exception as e:
+        logger.warning("내보내기 캐시 삭제 오류 (id=%s): %s", instance.pk, e)
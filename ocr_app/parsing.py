@@ -0,0 +1,130 @@
+"""네이버 Clova OCR V2 응답 파싱
+
+테이블 셀을 한 번만 순회하면서 텍스트, 신뢰도, 병합(span) 정보, 좌표를 함께 뽑아낸다.
+텍스트 행렬과 신뢰도 행렬은 같은 행 필터를 공유하므로 빈 행을 걸러내도 서로 어긋나지 않는다.
+여러 페이지 문서는 이미지마다 붙은 페이지 번호를 테이블과 바운딩 박스에 그대로 옮겨 둔다.
+"""
+
+
+def cell_text(cell):
+    """셀에서 텍스트를 안전하게 추출 (빈 리스트/누락 key에 견고)"""
+    parts = []
+    for line in (cell.get("cellTextLines") or []):
+        for w in (line.get("cellWords") or []):
+            t = w.get("inferText")
+            if t:
+                parts.append(str(t))
+    # 일부 엔진은 셀 레벨 inferText만 있을 수 있음
+    if not parts:
+        t = cell.get("inferText")
+        if t:
+            parts.append(str(t))
+    return " ".join(parts).strip()
+
+
+def cell_confidence(cell):
+    """셀 신뢰도 - 셀 값과 첫 번째 텍스트 라인 값 중 낮은 쪽"""
+    confidence = cell.get("inferConfidence", 1.0)
+    cell_text_lines = cell.get("cellTextLines") or []
+    if cell_text_lines:
+        line_confidence = cell_text_lines[0].get("inferConfidence", confidence)
+        confidence = min(confidence, line_confidence)
+    return confidence
+
+
+def _to_int(value, default):
+    return int(value or default)
+
+
+def extract_table(table, boxes=None, page=1):
+    """테이블 하나를 셀당 한 번씩만 방문해 텍스트/신뢰도 행렬과 병합 정보를 만듦
+
+    boxes 리스트가 주어지면 같은 순회에서 바운딩 박스도 함께 채움 (page는 테이블이 있는 페이지 번호).
+    유효한 셀이 없으면 None 반환
+    """
+    anchors = []
+    max_row = 0
+    max_col = 0
+
+    for cell in (table.get("cells") or []):
+        r = _to_int(cell.get("rowIndex"), 0)
+        c = _to_int(cell.get("columnIndex"), 0)
+        rspan = _to_int(cell.get("rowSpan"), 1)
+        cspan = _to_int(cell.get("columnSpan"), 1)
+        text = cell_text(cell)
+        confidence = cell_confidence(cell)
+
+        # rowSpan/colSpan 감안하여 테이블 크기 산정
+        if r + rspan > max_row:
+            max_row = r + rspan
+        if c + cspan > max_col:
+            max_col = c + cspan
+        anchors.append((r, c, rspan, cspan, text, confidence))
+
+        if boxes is not None:
+            vertices = (cell.get("boundingPoly") or {}).get("vertices") or []
+            if isinstance(vertices, list) and len(vertices) >= 4:
+                boxes.append({
+                    "vertices": vertices,
+                    "text": text,
+                    "confidence": confidence,
+                    "page": page
+                })
+
+    if max_row <= 0 or max_col <= 0:
+        return None
+
+    # 앵커 위치에만 텍스트와 신뢰도를 채움(스팬 확장은 필요시 추가로 구현)
+    data = [[""] * max_col for _ in range(max_row)]
+    confidence_matrix = [[1.0] * max_col for _ in range(max_row)]
+    spans = []
+    for r, c, rspan, cspan, text, confidence in anchors:
+        if r < 0 or c < 0:
+            continue
+        data[r][c] = text
+        confidence_matrix[r][c] = confidence
+        if rspan > 1 or cspan > 1:
+            spans.append([r, c, rspan, cspan])
+
+    # 빈 행 제거 (텍스트 기준) - 신뢰도 행렬과 병합 정보에도 같은 필터를 적용
+    keep = [i for i, row in enumerate(data) if any(row)]
+    if not keep:
+        # 모든 행이 비어있더라도 원본 구조는 유지 (최소 1행)
+        keep = [0]
+    if len(keep) != max_row:
+        row_map = {old: new for new, old in enumerate(keep)}
+        data = [data[i] for i in keep]
+        confidence_matrix = [confidence_matrix[i] for i in keep]
+        spans = [[row_map[r], c, rspan, cspan] for r, c, rspan, cspan in spans if r in row_map]
+
+    return {
+        'data': data,
+        'confidence': confidence_matrix,
+        'spans': spans,
+        'page': page
+    }
+
+
+def extract_tables(ocr_result):
+    """OCR 응답 전체에서 테이블 목록과 바운딩 박스를 한 번의 순회로 추출
+
+    Clova가 문서를 이미지로 변환해 인식한 페이지는 좌표 기준 크기(convertedImageInfo)를
+    pages[페이지 번호] = [너비, 높이]로 남겨 미리보기 해상도가 달라도 박스를 맞출 수 있게 함
+    """
+    tables = []
+    boxes = []
+    pages = {}
+    if not ocr_result or not isinstance(ocr_result, dict):
+        return {'tables': tables, 'boxes': boxes, 'pages': pages}
+
+    for image in (ocr_result.get("images") or []):
+        page = image.get("page") or 1
+        converted = image.get("convertedImageInfo") or {}
+        if converted.get("width") and converted.get("height"):
+            pages[str(page)] = [converted["width"], converted["height"]]
+        for table in (image.get("tables") or []):
+            parsed = extract_table(table, boxes, page)
+            if parsed is not None:
+                tables.append(parsed)
+
+    return {'tables': tables, 'boxes': boxes, 'pages': pages}
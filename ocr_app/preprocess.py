@@ -0,0 +1,219 @@
+"""OCR 전 이미지 전처리
+
+휴대폰 사진처럼 큰 이미지를 EXIF 방향 보정 → 긴 변 기준 축소 → (선택) 흑백 변환 → 재압축해
+S3/Clova로 보내는 바이트를 줄인다. 축소 비율을 함께 돌려주므로 OCR 결과 좌표를
+원본 이미지 좌표로 되돌릴 수 있다.
+
+PDF/TIFF 같은 여러 페이지 문서는 페이지마다 별도 작업으로 나눠 같은 프로세스 풀에서 병렬로 분할한다.
+결과 화면에서 보여줄 문서 페이지 미리보기(PNG)도 여기서 만든다.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+try:
+    import pypdf
+except ImportError:  # PDF 페이지 분할은 선택 사항 - 없으면 PDF를 통째로 OCR 요청에 보냄
+    pypdf = None
+
+try:
+    import pypdfium2
+except ImportError:  # PDF 페이지 렌더링은 선택 사항 - 없으면 페이지에 들어 있는 스캔 이미지로 미리보기
+    pypdfium2 = None
+
+MULTI_PAGE_EXTENSIONS = ('.pdf', '.tif', '.tiff')
+PREVIEW_PDF_SCALE = 2  # PDF 미리보기 렌더링 배율 (72dpi 기준 → 144dpi)
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+
+
+def get_preprocess_pool():
+    """전처리용 프로세스 풀 (워커 프로세스마다 하나, CPU 작업이라 GIL을 피해 별도 프로세스에서 실행)"""
+    key = os.getpid()
+    pool = _pools.get(key)
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=settings.OCR_PREPROCESS_PROCESSES)
+        _pools[key] = pool
+    return pool
+
+
+def preprocess_image(path, max_long_edge, grayscale=False, jpeg_quality=85, page=None):
+    """이미지 파일을 전처리해 {'data', 'format', 'scale', 'size'} 반환 (이미지가 아니면 None)
+
+    프로세스 풀에서 실행되므로 Django 설정 대신 인자로 옵션을 받음.
+    page를 주면 여러 페이지 TIFF의 해당 페이지(0부터)를 꺼내 항상 JPEG/PNG로 변환함
+    """
+    try:
+        with Image.open(path) as image:
+            source_format = image.format
+            if page is not None:
+                image.seek(page)
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+
+            scale = 1.0
+            long_edge = max(width, height)
+            if max_long_edge and long_edge > max_long_edge:
+                scale = max_long_edge / long_edge
+                image = image.resize(
+                    (max(1, round(width * scale)), max(1, round(height * scale))),
+                    Image.LANCZOS,
+                )
+
+            if grayscale:
+                image = image.convert('L')
+
+            output = io.BytesIO()
+            if source_format == 'PNG' and not grayscale and scale == 1.0:
+                # 축소하지 않은 PNG는 무손실로 최적화만 수행 (스캔 문서의 선이 뭉개지지 않도록)
+                image.save(output, format='PNG', optimize=True)
+                image_format = 'png'
+            else:
+                if image.mode == '1':
+                    # 흑백 스캔(1비트) TIFF는 회색조로 바꿔야 JPEG로 저장됨
+                    image = image.convert('L')
+                elif image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(output, format='JPEG', quality=jpeg_quality, optimize=True)
+                image_format = 'jpg'
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("이미지 전처리 오류 (%s): %s", path, e)
+        return None
+
+    data = output.getvalue()
+    # 전처리 결과가 원본보다 크고 크기 변화도 없으면 의미가 없으므로 원본 사용
+    if page is None and scale == 1.0 and data and len(data) >= os.path.getsize(path):
+        return None
+    return {'data': data, 'format': image_format, 'scale': scale, 'size': len(data)}
+
+
+def submit_preprocess(path):
+    """설정값으로 전처리 작업을 프로세스 풀에 제출"""
+    return get_preprocess_pool().submit(
+        preprocess_image,
+        path,
+        settings.OCR_PREPROCESS_MAX_LONG_EDGE,
+        settings.OCR_PREPROCESS_GRAYSCALE,
+        settings.OCR_PREPROCESS_JPEG_QUALITY,
+    )
+
+
+def is_multi_page_document(name):
+    """PDF/TIFF처럼 여러 페이지일 수 있는 문서인지 (파일명/URL 확장자 기준)"""
+    return os.path.splitext(name.split('?', 1)[0])[1].lower() in MULTI_PAGE_EXTENSIONS
+
+
+def count_pages(path):
+    """문서의 페이지 수 (분할할 수 없으면 None - 원본을 그대로 OCR 요청에 보냄)"""
+    if path.lower().endswith('.pdf'):
+        if pypdf is None:
+            return None
+        try:
+            return len(pypdf.PdfReader(path).pages)
+        except Exception as e:
+            logger.warning("PDF 페이지 수 확인 오류 (%s): %s", path, e)
+            return None
+
+    try:
+        with Image.open(path) as image:
+            return getattr(image, 'n_frames', 1)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("TIFF 페이지 수 확인 오류 (%s): %s", path, e)
+        return None
+
+
+def extract_pdf_page(path, page):
+    """PDF에서 한 페이지만 담은 PDF를 만들어 반환 (페이지 번호는 0부터)"""
+    reader = pypdf.PdfReader(path)
+    writer = pypdf.PdfWriter()
+    writer.add_page(reader.pages[page])
+    output = io.BytesIO()
+    writer.write(output)
+    data = output.getvalue()
+    return {'data': data, 'format': 'pdf', 'scale': 1.0, 'size': len(data)}
+
+
+def submit_pages(path, page_count):
+    """문서의 각 페이지 분할 작업을 프로세스 풀에 제출하고 페이지 순서대로 future 목록 반환"""
+    pool = get_preprocess_pool()
+    if path.lower().endswith('.pdf'):
+        return [pool.submit(extract_pdf_page, path, page) for page in range(page_count)]
+
+    # TIFF 페이지는 이미지로 변환해야 하므로 전처리를 끈 경우에도 재압축은 수행 (축소/흑백 변환만 생략)
+    enabled = settings.OCR_PREPROCESS_ENABLED
+    return [
+        pool.submit(
+            preprocess_image,
+            path,
+            settings.OCR_PREPROCESS_MAX_LONG_EDGE if enabled else None,
+            settings.OCR_PREPROCESS_GRAYSCALE and enabled,
+            settings.OCR_PREPROCESS_JPEG_QUALITY,
+            page,
+        )
+        for page in range(page_count)
+    ]
+
+
+def _pdf_page_image(path, page):
+    """PDF 페이지를 PIL 이미지로 (pypdfium2로 렌더링하거나, 없으면 페이지의 가장 큰 스캔 이미지)"""
+    if pypdfium2 is not None:
+        document = pypdfium2.PdfDocument(path)
+        try:
+            return document[page].render(scale=PREVIEW_PDF_SCALE).to_pil()
+        finally:
+            document.close()
+    if pypdf is None:
+        return None
+    images = [image.image for image in pypdf.PdfReader(path).pages[page].images]
+    return max(images, key=lambda image: image.width * image.height, default=None)
+
+
+def render_page_preview(path, page):
+    """PDF/TIFF 문서 한 페이지(0부터)의 미리보기 PNG 바이트 (만들 수 없으면 None)
+
+    브라우저가 <img>로 보여줄 수 없는 문서를 결과 화면에서 페이지별로 보여주는 데 사용함
+    """
+    try:
+        if path.lower().endswith('.pdf'):
+            image = _pdf_page_image(path, page)
+            if image is None:
+                return None
+        else:
+            with Image.open(path) as source:
+                source.seek(page)
+                image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format='PNG', optimize=True)
+        return output.getvalue()
+    except (IndexError, EOFError):
+        return None
+    except Exception as e:
+        logger.warning("문서 미리보기 오류 (%s, 페이지 %s): %s", path, page + 1, e)
+        return None
+
+
+def rescale_vertices(node, factor):
+    """OCR 응답 안의 모든 boundingPoly 꼭짓점 좌표에 factor를 곱함 (제자리 수정)"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'vertices' and isinstance(value, list):
+                for vertex in value:
+                    if isinstance(vertex, dict):
+                        if 'x' in vertex:
+                            vertex['x'] = round(vertex['x'] * factor, 1)
+                        if 'y' in vertex:
+                            vertex['y'] = round(vertex['y'] * factor, 1)
+            else:
+                rescale_vertices(value, factor)
+    elif isinstance(node, list):
+        for item in node:
+            rescale_vertices(item, factor)
+    return node
@@ -0,0 +1,431 @@
+"""Clova OCR API 호출 보호 장치
+
+- 토큰 버킷 속도 제한: 모든 워커 프로세스가 하나의 버킷을 공유 (Redis를 설정하면 Redis, 아니면 SQLite 파일)
+- 재시도: 429/5xx/연결 오류는 지수 백오프 + full jitter로 재시도 (Retry-After 헤더가 있으면 우선)
+- 서킷 브레이커: 서버 오류가 연달아 나면 일정 시간 요청을 보내지 않고 즉시 실패
+- 각 단계의 카운터 (ocr_api_events_total 지표, 이 프로세스 값은 get_metrics()로 조회)
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from . import metrics
+
+try:
+    import redis
+except ImportError:  # Redis는 선택 사항 - 없으면 SQLite 파일로 버킷을 공유
+    redis = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class OCRAPIError(Exception):
+    """OCR API 호출 실패 - 메시지는 작업의 error_message로 저장됨
+
+    retryable이 True면 일시적인 실패(요청을 보내지 못했거나 재시도를 다 쓴 429/5xx/연결 오류)라
+    작업을 실패 처리하지 않고 대기열로 돌림
+    """
+    retryable = False
+
+
+class TransientAPIError(OCRAPIError):
+    """429/5xx/연결 오류 - 재시도를 다 써도 나중에 다시 처리하면 성공할 수 있음"""
+    retryable = True
+
+
+class CircuitOpenError(OCRAPIError):
+    """서킷 브레이커가 열려 있어 요청을 보내지 않음"""
+    retryable = True
+
+
+class RateLimitTimeout(OCRAPIError):
+    """속도 제한 토큰을 기다리다 최대 대기 시간을 넘김"""
+    retryable = True
+
+
+def incr(name, value=1):
+    metrics.inc('ocr_api_events_total', value, event=name)
+
+
+def get_metrics():
+    """이 프로세스의 OCR API 호출 카운터 스냅샷"""
+    return metrics.counter_values('ocr_api_events_total', 'event')
+
+
+class SQLiteTokenBucket:
+    """SQLite 파일 하나를 여러 프로세스가 함께 쓰는 토큰 버킷 (BEGIN IMMEDIATE로 갱신을 직렬화)"""
+
+    def __init__(self, path, rate, capacity, name='naver_ocr'):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 연결은 스레드/프로세스 간에 공유할 수 없으므로 스레드마다 새로 엶
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != pid:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS token_bucket '
+                '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def try_acquire(self, tokens=1):
+        """토큰을 꺼내면 0, 부족하면 토큰이 찰 때까지 기다려야 할 시간(초) 반환"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM token_bucket WHERE name = ?', (self.name,)
+            ).fetchone()
+            now = time.time()
+            available = self.capacity
+            if row is not None:
+                available = min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self.rate
+            conn.execute(
+                'INSERT OR REPLACE INTO token_bucket (name, tokens, updated) VALUES (?, ?, ?)',
+                (self.name, available, now),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+# 버킷 갱신을 Redis 안에서 원자적으로 수행 (시간도 Redis 서버 시계를 사용해 호스트 간 시계 차이를 피함)
+_REDIS_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """여러 서버의 워커가 함께 쓰는 Redis 토큰 버킷"""
+
+    def __init__(self, url, rate, capacity, name='naver_ocr'):
+        self.rate = rate
+        self.capacity = capacity
+        self.key = f'ocr:token_bucket:{name}'
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_BUCKET_SCRIPT)
+
+    def try_acquire(self, tokens=1):
+        """토큰을 꺼내면 0, 부족하면 토큰이 찰 때까지 기다려야 할 시간(초) 반환"""
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+
+
+class CircuitBreaker:
+    """연속 실패가 임계치를 넘으면 열리고, reset_timeout 뒤 한 건만 시험 삼아 보내 복구 여부를 확인"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """요청을 보내도 되는지 확인 (안 되면 CircuitOpenError)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    incr('circuit_rejections')
+                    raise CircuitOpenError('OCR API 장애로 요청을 잠시 중단했습니다.')
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    incr('circuit_rejections')
+                    raise CircuitOpenError('OCR API 복구 여부를 확인하는 중입니다.')
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """시험 호출이 결과 없이 끝난 경우(취소 등) 다음 호출이 다시 시험할 수 있게 함"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    incr('circuit_opened')
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def retry_after(self):
+        """열려 있으면 다시 시도할 수 있을 때까지 남은 시간(초), 아니면 0"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trial_in_flight:
+                # 시험 호출 결과를 기다리는 동안에는 작업을 선점해도 거절되므로 잠깐씩 쉼
+                return min(1.0, self.reset_timeout)
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+_rate_limiter = None
+_rate_limiter_pid = None
+_circuit_breaker = None
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """설정에 맞는 공유 토큰 버킷 (NAVER_OCR_RATE_LIMIT가 0이면 None - 제한 없음)"""
+    global _rate_limiter, _rate_limiter_pid
+
+    rate = settings.NAVER_OCR_RATE_LIMIT
+    if rate <= 0:
+        return None
+
+    pid = os.getpid()
+    if _rate_limiter is None or _rate_limiter_pid != pid:
+        with _registry_lock:
+            if _rate_limiter is None or _rate_limiter_pid != pid:
+                capacity = max(1.0, settings.NAVER_OCR_RATE_BURST)
+                if settings.OCR_REDIS_URL and redis is not None:
+                    _rate_limiter = RedisTokenBucket(settings.OCR_REDIS_URL, rate, capacity)
+                else:
+                    _rate_limiter = SQLiteTokenBucket(settings.OCR_RATE_LIMIT_DB, rate, capacity)
+                _rate_limiter_pid = pid
+    return _rate_limiter
+
+
+def get_circuit_breaker():
+    """프로세스 공용 서킷 브레이커"""
+    global _circuit_breaker
+
+    if _circuit_breaker is None:
+        with _registry_lock:
+            if _circuit_breaker is None:
+                _circuit_breaker = CircuitBreaker(
+                    settings.NAVER_OCR_CIRCUIT_FAILURES,
+                    settings.NAVER_OCR_CIRCUIT_RESET_TIMEOUT,
+                )
+    return _circuit_breaker
+
+
+def acquire_token(limiter, max_wait):
+    """토큰을 얻을 때까지 대기하고 대기한 시간을 반환 (max_wait를 넘기면 RateLimitTimeout)"""
+    waited = 0.0
+    while True:
+        wait = _next_token_wait(limiter.try_acquire(), waited, max_wait)
+        if wait is None:
+            return waited
+        time.sleep(wait)
+        waited += wait
+
+
+async def aacquire_token(limiter, max_wait):
+    """acquire_token의 비동기 버전 - 기다리는 동안 이벤트 루프를 막지 않음"""
+    waited = 0.0
+    while True:
+        # SQLite 버킷은 잠금을 기다릴 수 있으므로 스레드에서 갱신
+        wait = _next_token_wait(await asyncio.to_thread(limiter.try_acquire), waited, max_wait)
+        if wait is None:
+            return waited
+        await asyncio.sleep(wait)
+        waited += wait
+
+
+def _next_token_wait(wait, waited, max_wait):
+    """토큰을 얻었으면 None, 아니면 다시 시도하기 전 대기 시간"""
+    if wait <= 0:
+        if waited:
+            incr('rate_limit_waits')
+            incr('rate_limit_wait_seconds', waited)
+        return None
+    if waited + wait > max_wait:
+        incr('rate_limit_timeouts')
+        raise RateLimitTimeout('OCR API 요청 한도를 기다리다 시간이 초과되었습니다.')
+    # 여러 프로세스가 같은 순간에 깨어나 다시 부딪히지 않도록 약간 흩뜨림
+    return wait + random.uniform(0, wait * 0.1)
+
+
+def backoff_delay(attempt):
+    """attempt번째(0부터) 재시도 전 대기 시간 - 지수 백오프 상한 안에서 full jitter"""
+    ceiling = min(settings.NAVER_OCR_RETRY_MAX_BACKOFF, settings.NAVER_OCR_RETRY_BACKOFF * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    try:
+        return min(float(value), settings.NAVER_OCR_RETRY_MAX_BACKOFF) if value else None
+    except ValueError:
+        return None
+
+
+def _check_response(breaker, response, connection_error):
+    """한 번의 시도 결과를 서킷/카운터에 반영하고 (성공 응답, 오류, Retry-After) 반환
+
+    재시도하면 안 되는 4xx 응답이면 바로 OCRAPIError를 발생시킴
+    """
+    if connection_error is not None:
+        breaker.record_failure()
+        incr('connection_errors')
+        return None, TransientAPIError(f'OCR API 연결 오류: {connection_error}'), None
+
+    if response.status_code == 200:
+        breaker.record_success()
+        incr('successes')
+        return response, None, None
+
+    detail = response.text[:200]
+    message = f'OCR API 오류: {response.status_code} {detail}'
+    if response.status_code not in RETRY_STATUSES:
+        # 요청 자체가 잘못된 경우 - API는 정상이므로 서킷에 반영하지 않고 재시도도 하지 않음
+        breaker.record_success()
+        incr('client_errors')
+        raise OCRAPIError(message)
+
+    error = TransientAPIError(message)
+    if response.status_code == 429:
+        # 한도 초과는 장애도 복구 신호도 아니므로 서킷 상태는 그대로 두고 백오프만 함
+        # (반열림 상태의 시험 호출이었다면 다음 호출이 다시 시험할 수 있게 표시만 해제)
+        breaker.release_trial()
+        incr('rate_limited')
+    else:
+        breaker.record_failure()
+        incr('server_errors')
+    return None, error, _retry_after(response)
+
+
+def call_with_resilience(send):
+    """send()(requests.Response 반환)를 속도 제한/재시도/서킷 브레이커로 감싸 호출
+
+    200 응답을 반환하고, 끝내 실패하면 OCRAPIError를 발생시킴
+    (재시도를 다 쓴 429/5xx/연결 오류는 작업이 대기열로 돌아가도록 TransientAPIError)
+    """
+    breaker = get_circuit_breaker()
+    limiter = get_rate_limiter()
+    attempts = max(1, settings.NAVER_OCR_MAX_RETRIES + 1)
+
+    error = None
+    for attempt in range(attempts):
+        # 서킷이 열려 있으면 토큰을 쓰지 않고 바로 거절
+        breaker.before_call()
+        if limiter is not None:
+            try:
+                acquire_token(limiter, settings.NAVER_OCR_RATE_LIMIT_MAX_WAIT)
+            except BaseException:
+                # 요청을 보내지 못했으므로 반열림 상태의 시험 호출 표시를 해제
+                breaker.release_trial()
+                raise
+
+        incr('requests')
+        response = connection_error = None
+        try:
+            response = send()
+        except requests.RequestException as e:
+            connection_error = e
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # 인터럽트 - 결과를 알 수 없으므로 시험 호출 표시만 해제
+            breaker.release_trial()
+            raise
+        response, error, retry_after = _check_response(breaker, response, connection_error)
+        if response is not None:
+            return response
+
+        if attempt + 1 >= attempts:
+            break
+        incr('retries')
+        time.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+
+    raise error
+
+
+async def acall_with_resilience(send, connection_errors):
+    """call_with_resilience의 비동기 버전 - send는 응답(status_code/text/headers)을 돌려주는 코루틴 함수
+
+    connection_errors는 연결 오류로 보고 재시도할 예외 타입 (예: httpx.TransportError)
+    """
+    breaker = get_circuit_breaker()
+    limiter = get_rate_limiter()
+    attempts = max(1, settings.NAVER_OCR_MAX_RETRIES + 1)
+
+    error = None
+    for attempt in range(attempts):
+        breaker.before_call()
+        if limiter is not None:
+            try:
+                await aacquire_token(limiter, settings.NAVER_OCR_RATE_LIMIT_MAX_WAIT)
+            except BaseException:
+                breaker.release_trial()
+                raise
+
+        incr('requests')
+        response = connection_error = None
+        try:
+            response = await send()
+        except connection_errors as e:
+            connection_error = e
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # 요청 취소(asyncio.CancelledError) - 결과를 알 수 없으므로 시험 호출 표시만 해제
+            breaker.release_trial()
+            raise
+        response, error, retry_after = _check_response(breaker, response, connection_error)
+        if response is not None:
+            return response
+
+        if attempt + 1 >= attempts:
+            break
+        incr('retries')
+        await asyncio.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+
+    raise error
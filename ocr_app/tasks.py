@@ -0,0 +1,714 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .backends import get_ocr_backend
+from .blobstore import delete_raw_result
+from .events import publish_status
+from .metrics import flush as flush_metrics, inc, timed
+from .models import OCRResult
+from .resilience import OCRAPIError, get_circuit_breaker, get_metrics
+from .preprocess import (
+    submit_preprocess, rescale_vertices, is_multi_page_document, count_pages, submit_pages,
+)
+from .utils import upload_to_s3, save_ocr_result_to_file, compute_content_hash
+
+logger = logging.getLogger(__name__)
+
+
+def _is_reusable(ocr_result):
+    """중복 업로드 시 기존 결과를 그대로 돌려줘도 되는지 여부 (실패했거나 TTL이 지났으면 재처리)"""
+    if ocr_result.status == OCRResult.STATUS_FAILED:
+        return False
+    ttl = settings.OCR_DEDUP_TTL
+    if ttl and ocr_result.status == OCRResult.STATUS_DONE:
+        processed_at = ocr_result.finished_at or ocr_result.created_at
+        if timezone.now() - processed_at > timedelta(seconds=ttl):
+            return False
+    return True
+
+
+def requeue_result(ocr_result, image_file=None):
+    """기존 결과를 다시 OCR 하도록 대기열에 재등록 (이미 올라간 S3 객체는 그대로 재사용)"""
+    if image_file is not None and not ocr_result.s3_url and not ocr_result.image_file:
+        ocr_result.image_file.save(image_file.name, image_file, save=False)
+    ocr_result.status = OCRResult.STATUS_QUEUED
+    ocr_result.error_message = ''
+    ocr_result.started_at = None
+    ocr_result.finished_at = None
+    ocr_result.save(update_fields=['image_file', 'status', 'error_message', 'started_at', 'finished_at'])
+    publish_status(ocr_result)
+    return ocr_result
+
+
+def enqueue_upload(image_file, batch=None, batch_index=None, force=False):
+    """업로드 파일을 OCR 대기열에 등록
+
+    같은 내용의 파일이 이미 처리됐으면 S3 업로드와 OCR 호출 없이 기존 결과를 재사용함.
+    반환값은 (OCRResult, 기존 결과 재사용 여부)
+    """
+    with timed('upload_read'):
+        content_hash = compute_content_hash(image_file) if settings.OCR_DEDUP_ENABLED else None
+
+    if content_hash:
+        existing = OCRResult.objects.filter(content_hash=content_hash).first()
+        if existing is not None:
+            if not force and _is_reusable(existing):
+                return existing, True
+            if existing.status not in (OCRResult.STATUS_QUEUED, OCRResult.STATUS_RUNNING):
+                requeue_result(existing, image_file)
+            return existing, False
+
+    ocr_result = OCRResult(
+        batch=batch,
+        batch_index=batch_index,
+        content_hash=content_hash,
+        status=OCRResult.STATUS_QUEUED,
+    )
+    with timed('upload_store'):
+        ocr_result.image_file.save(image_file.name, image_file, save=False)
+    try:
+        with transaction.atomic():
+            ocr_result.save()
+    except IntegrityError:
+        # 같은 파일이 동시에 업로드된 경우 먼저 저장된 결과를 사용
+        ocr_result.image_file.delete(save=False)
+        return OCRResult.objects.get(content_hash=content_hash), True
+    publish_status(ocr_result)
+    return ocr_result, False
+
+
+def enqueue_uploads(files, batch=None, force=False):
+    """여러 업로드 파일을 한 번에 대기열에 등록 (일괄 업로드용)
+
+    중복 확인은 해시 목록으로 한 번에 조회하고, 새 작업은 bulk_create 한 번으로 저장해 파일 수만큼 커밋하지 않음.
+    반환값은 파일 순서대로 (OCRResult, 기존 결과 재사용 여부) 목록
+    """
+    with timed('upload_read'):
+        hashes = [compute_content_hash(f) if settings.OCR_DEDUP_ENABLED else None for f in files]
+    known = {}
+    if any(hashes):
+        known = {
+            result.content_hash: result
+            for result in OCRResult.objects.filter(content_hash__in={h for h in hashes if h}).defer(*OCRResult.LARGE_FIELDS)
+        }
+
+    results = []
+    new_results = []
+    seen = set()
+    for index, (image_file, content_hash) in enumerate(zip(files, hashes)):
+        existing = known.get(content_hash) if content_hash else None
+        if existing is not None:
+            if content_hash in seen or (not force and _is_reusable(existing)):
+                # 이미 처리된 파일이거나 같은 배치 안에서 반복된 파일
+                results.append((existing, True))
+                continue
+            seen.add(content_hash)
+            if existing.status not in (OCRResult.STATUS_QUEUED, OCRResult.STATUS_RUNNING):
+                requeue_result(existing, image_file)
+            results.append((existing, False))
+            continue
+
+        ocr_result = OCRResult(
+            batch=batch,
+            batch_index=index,
+            content_hash=content_hash,
+            status=OCRResult.STATUS_QUEUED,
+        )
+        with timed('upload_store'):
+            ocr_result.image_file.save(image_file.name, image_file, save=False)
+        new_results.append(ocr_result)
+        results.append((ocr_result, False))
+        if content_hash:
+            known[content_hash] = ocr_result
+            seen.add(content_hash)
+
+    if not new_results:
+        return results
+    try:
+        with transaction.atomic(), timed('db_write'):
+            if connection.features.can_return_rows_from_bulk_insert:
+                OCRResult.objects.bulk_create(new_results)
+            else:
+                for ocr_result in new_results:
+                    ocr_result.save()
+    except IntegrityError:
+        # 같은 파일이 동시에 업로드된 경우 - 저장한 파일을 지우고 한 장씩 다시 등록
+        for ocr_result in new_results:
+            ocr_result.image_file.delete(save=False)
+        return [
+            enqueue_upload(image_file, batch=batch, batch_index=index, force=force)
+            for index, image_file in enumerate(files)
+        ]
+    for ocr_result in new_results:
+        publish_status(ocr_result)
+    return results
+
+
+def claim_next_job():
+    """대기 중인 작업 하나를 원자적으로 선점 (여러 워커 프로세스가 동시에 호출해도 안전)"""
+    while True:
+        pk = (
+            OCRResult.objects.filter(status=OCRResult.STATUS_QUEUED)
+            .order_by('created_at', 'pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+
+        # 상태 조건부 UPDATE로 선점 - 다른 워커가 먼저 가져갔으면 0건이 갱신됨
+        claimed = OCRResult.objects.filter(pk=pk, status=OCRResult.STATUS_QUEUED).update(
+            status=OCRResult.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job = OCRResult.objects.get(pk=pk)
+            publish_status(job)
+            return job
+
+
+def claim_job(pk):
+    """특정 작업을 선점 (대기 중이 아니거나 다른 워커가 먼저 가져갔으면 None)"""
+    claimed = OCRResult.objects.filter(pk=pk, status=OCRResult.STATUS_QUEUED).update(
+        status=OCRResult.STATUS_RUNNING,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return None
+    job = OCRResult.objects.get(pk=pk)
+    publish_status(job)
+    return job
+
+
+def claim_jobs(limit):
+    """대기 중인 작업을 최대 limit개까지 선점"""
+    jobs = []
+    while len(jobs) < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        jobs.append(job)
+    return jobs
+
+
+def requeue_stale_jobs(timeout=None):
+    """워커가 죽어 처리 중 상태로 남은 작업을 다시 대기열로 돌림"""
+    timeout = timeout if timeout is not None else settings.OCR_JOB_STALE_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale_ids = list(OCRResult.objects.filter(
+        status=OCRResult.STATUS_RUNNING,
+        started_at__lt=cutoff,
+    ).values_list('pk', flat=True))
+    if not stale_ids:
+        return 0
+    # 처리 중에 워커를 계속 죽이는 작업은 시도 횟수를 넘으면 되돌리지 않고 실패 처리
+    OCRResult.objects.filter(
+        pk__in=stale_ids, status=OCRResult.STATUS_RUNNING, attempts__gte=settings.OCR_JOB_MAX_ATTEMPTS,
+    ).update(
+        status=OCRResult.STATUS_FAILED,
+        error_message='처리 중 워커가 여러 번 중단되어 작업을 실패 처리했습니다.',
+        finished_at=timezone.now(),
+    )
+    count = OCRResult.objects.filter(
+        pk__in=stale_ids, status=OCRResult.STATUS_RUNNING,
+    ).update(status=OCRResult.STATUS_QUEUED)
+    for job in OCRResult.objects.filter(pk__in=stale_ids).defer(*OCRResult.LARGE_FIELDS):
+        publish_status(job)
+    return count
+
+
+def _mark_failed(ocr_result, message):
+    ocr_result.status = OCRResult.STATUS_FAILED
+    ocr_result.error_message = message
+    ocr_result.finished_at = timezone.now()
+    ocr_result.save(update_fields=['s3_url', 'image_scale', 'status', 'error_message', 'finished_at'])
+    inc('ocr_jobs_total', status='failed')
+    publish_status(ocr_result)
+    logger.warning("OCR 작업 실패 (id=%s): %s", ocr_result.pk, message, extra={'job_id': ocr_result.pk})
+    return ocr_result
+
+
+def _requeue_job(ocr_result, reason=''):
+    """일시적인 API 실패(서킷 열림, 속도 제한 대기 초과, 재시도를 다 쓴 429/5xx/연결 오류)는 실패 처리하지 않고 대기열로 되돌림"""
+    if ocr_result.attempts >= settings.OCR_JOB_MAX_ATTEMPTS:
+        # 계속 거절되는 작업이 대기열을 끝없이 돌지 않도록 시도 횟수를 넘으면 실패 처리
+        return _mark_failed(ocr_result, f'OCR 요청을 {ocr_result.attempts}회 시도했지만 처리하지 못했습니다. {reason}'.strip())
+    ocr_result.status = OCRResult.STATUS_QUEUED
+    ocr_result.started_at = None
+    ocr_result.save(update_fields=['s3_url', 'image_scale', 'status', 'started_at'])
+    inc('ocr_jobs_total', status='requeued')
+    publish_status(ocr_result)
+    return ocr_result
+
+
+def _mark_done(ocr_result, ocr_response):
+    prepared = getattr(ocr_result, 'prepared_image', None)
+    # 이번에 전처리하지 않았어도 S3에 축소본이 올라가 있으면(재처리) 저장해 둔 비율을 다시 적용
+    scale = prepared['scale'] if prepared is not None else ocr_result.image_scale
+    if scale != 1.0:
+        # 축소한 이미지 기준 좌표를 원본 이미지 좌표로 되돌려 결과 화면의 바운딩 박스가 맞도록 함
+        rescale_vertices(ocr_response, 1 / scale)
+
+    previous_key = ocr_result.raw_result_key
+    with timed('raw_store'):
+        ocr_result.set_raw_result(ocr_response)
+    try:
+        with timed('table_parse'):
+            ocr_result.refresh_parsed_tables(save=False)
+        ocr_result.status = OCRResult.STATUS_DONE
+        ocr_result.error_message = ''
+        ocr_result.finished_at = timezone.now()
+        with timed('db_write'):
+            ocr_result.save(update_fields=[
+                's3_url', 'image_scale', 'ocr_result', 'raw_result_key', 'raw_result_bytes',
+                'status', 'error_message', 'finished_at', *OCRResult.PARSED_FIELDS,
+            ])
+    except Exception:
+        # 행을 저장하지 못했으므로 방금 쓴 원본 파일은 아무 행도 가리키지 않음
+        if ocr_result.raw_result_key != previous_key:
+            _delete_raw_result(ocr_result.raw_result_key)
+        ocr_result.raw_result_key = previous_key
+        raise
+    if previous_key and previous_key != ocr_result.raw_result_key:
+        # 다시 처리한 결과 - 새 포인터가 커밋된 뒤에 이전 원본 파일 삭제
+        transaction.on_commit(lambda: _delete_raw_result(previous_key))
+
+    def dump():
+        with timed('debug_dump'):
+            save_ocr_result_to_file(ocr_response, ocr_result.pk)
+    transaction.on_commit(dump)  # 디버그 덤프도 커밋된 결과만 남김
+    inc('ocr_jobs_total', status='done')
+    publish_status(ocr_result)
+    return ocr_result
+
+
+def _delete_raw_result(pointer):
+    """어떤 행도 가리키지 않게 된 원본 응답 파일 삭제 (실패해도 작업 처리에는 영향 없음)"""
+    if not pointer:
+        return
+    try:
+        delete_raw_result(pointer)
+    except Exception as e:
+        logger.warning("원본 OCR 결과 삭제 오류 (%s): %s", pointer, e)
+
+
+def _upload_job_image(ocr_result):
+    """작업 이미지를 S3에 업로드하고 URL 반환 (이미 업로드된 경우 기존 URL)"""
+    if ocr_result.s3_url:
+        return ocr_result.s3_url
+    if not ocr_result.image_file:
+        return None
+
+    prepared = getattr(ocr_result, 'prepared_image', None)
+    if prepared is not None:
+        # 전처리된 이미지를 올림 (확장자는 재압축한 형식에 맞춤)
+        stem = os.path.splitext(os.path.basename(ocr_result.image_file.name))[0]
+        s3_url = upload_to_s3(io.BytesIO(prepared['data']), f"{stem}.{prepared['format']}")
+        if s3_url:
+            ocr_result.image_scale = prepared['scale']
+        return s3_url
+
+    with ocr_result.image_file.open('rb') as f:
+        return upload_to_s3(f, os.path.basename(ocr_result.image_file.name))
+
+
+def _image_size(ocr_result):
+    prepared = getattr(ocr_result, 'prepared_image', None)
+    return prepared['size'] if prepared is not None else ocr_result.image_file.size
+
+
+def _use_inline_image(ocr_result):
+    """S3를 거치지 않고 이미지 바이트를 OCR 요청에 직접 담을지 여부 (작은 로컬 파일만)"""
+    return (
+        settings.NAVER_OCR_INLINE_IMAGES
+        and not ocr_result.s3_url
+        and bool(ocr_result.image_file)
+        and _image_size(ocr_result) <= settings.NAVER_OCR_INLINE_MAX_BYTES
+    )
+
+
+def _ocr_image(ocr_result):
+    """OCR 요청에 넣을 이미지 - 인라인 대상이면 파일 내용, 아니면 S3 URL"""
+    if ocr_result.s3_url:
+        return {'url': ocr_result.s3_url}
+    prepared = getattr(ocr_result, 'prepared_image', None)
+    if prepared is not None:
+        return {'data': prepared['data'], 'format': prepared['format']}
+    with ocr_result.image_file.open('rb') as f:
+        return {'data': f.read(), 'name': ocr_result.image_file.name}
+
+
+def _unit_image(ocr_result, page):
+    """OCR 요청 단위(작업, 페이지)에 넣을 이미지 - 분할한 페이지면 해당 페이지 바이트"""
+    if page is None:
+        return _ocr_image(ocr_result)
+    prepared = ocr_result.pages[page]
+    return {'data': prepared['data'], 'format': prepared['format']}
+
+
+def _call_ocr_for_units(group):
+    backend = get_ocr_backend()
+    images = [_unit_image(job, page) for job, page in group]
+    with timed('ocr_call', backend=type(backend).__name__):
+        return backend.recognize(images)
+
+
+def _is_whole_document(ocr_result):
+    """분할하지 못한 PDF/TIFF를 통째로 보내는 작업인지 (응답에 이미지가 여러 장 올 수 있음)"""
+    if getattr(ocr_result, 'pages', None) is not None:
+        return False
+    name = ocr_result.s3_url or (ocr_result.image_file.name if ocr_result.image_file else '')
+    return is_multi_page_document(name)
+
+
+def _submit_job_preprocess(job):
+    """S3에 아직 올라가지 않은 이미지면 전처리를 프로세스 풀에 제출하고 future 반환 (대상이 아니면 None)"""
+    if job.s3_url or not job.image_file or is_multi_page_document(job.image_file.name):
+        return None
+    try:
+        return submit_preprocess(job.image_file.path)
+    except (NotImplementedError, ValueError):
+        # 로컬 경로가 없는 저장소는 전처리하지 않음
+        return None
+
+
+def _preprocess_jobs(jobs):
+    """S3에 아직 올라가지 않은 이미지를 프로세스 풀에서 병렬 전처리 (실패하면 원본 그대로 사용)"""
+    futures = []
+    for job in jobs:
+        future = _submit_job_preprocess(job)
+        if future is not None:
+            futures.append((job, future))
+
+    for job, future in futures:
+        try:
+            with timed('preprocess'):
+                job.prepared_image = future.result()
+        except Exception as e:
+            logger.warning("이미지 전처리 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+            job.prepared_image = None
+
+
+def _split_documents(jobs):
+    """PDF/TIFF 문서를 프로세스 풀에서 페이지별로 병렬 분할해 job.pages에 담음
+
+    분할할 수 없는 문서(pypdf 미설치, S3에만 있는 파일 등)는 원본을 통째로 OCR 요청에 보냄
+    """
+    pending = []
+    for job in jobs:
+        job.pages = None
+        if job.s3_url or not job.image_file or not is_multi_page_document(job.image_file.name):
+            continue
+        try:
+            path = job.image_file.path
+        except NotImplementedError:
+            continue
+        page_count = count_pages(path)
+        if page_count:
+            pending.append((job, submit_pages(path, page_count)))
+
+    for job, futures in pending:
+        try:
+            with timed('page_split'):
+                pages = [future.result() for future in futures]
+        except Exception as e:
+            logger.warning("문서 페이지 분할 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+            continue
+        if all(pages):
+            job.pages = pages
+
+
+def _page_number(image, default):
+    # Clova가 문서를 직접 페이지로 나눈 경우 convertedImageInfo.pageIndex(0부터)를 사용
+    page_index = (image.get('convertedImageInfo') or {}).get('pageIndex')
+    return page_index + 1 if isinstance(page_index, int) else default
+
+
+def _stitch_pages(ocr_result, responses):
+    """페이지별 OCR 응답을 하나의 응답으로 합치고 각 이미지에 페이지 번호(1부터)를 기록"""
+    if ocr_result.pages is None:
+        ocr_response = responses[None]
+        for number, image in enumerate(ocr_response.get('images') or [], 1):
+            image['page'] = _page_number(image, number)
+        return ocr_response
+
+    images = []
+    for index, prepared in enumerate(ocr_result.pages):
+        ocr_response = responses[index]
+        if prepared['scale'] != 1.0:
+            rescale_vertices(ocr_response, 1 / prepared['scale'])
+        for image in (ocr_response.get('images') or []):
+            image['page'] = index + 1
+            images.append(image)
+    return {**responses[0], 'images': images}
+
+
+_executors = {}
+
+
+def _get_executor(name, max_workers):
+    """작업 간에 재사용하는 스레드 풀 - 스레드별 HTTP 세션의 keep-alive 연결이 유지되도록 함"""
+    key = (name, os.getpid())
+    executor = _executors.get(key)
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'ocr-{name}')
+        _executors[key] = executor
+    return executor
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def process_ocr_jobs(jobs):
+    """여러 작업을 동시에 S3 업로드하고, API 요청당 이미지 한도로 묶어 병렬로 OCR 호출
+
+    네트워크 I/O만 스레드에서 수행하고 DB 저장은 호출한 스레드에서 처리함
+    """
+    if not jobs:
+        return []
+
+    # 0) 이미지 전처리 - 여러 페이지 문서는 페이지별로 분할하고, 이미지는 방향 보정/축소/재압축으로 전송량을 줄임
+    _split_documents(jobs)
+    if settings.OCR_PREPROCESS_ENABLED:
+        _preprocess_jobs(jobs)
+
+    # 1) S3 업로드 - 동시 실행 (인라인으로 보낼 작은 이미지와 분할한 문서는 OCR 이후로 미룸)
+    inline_jobs = [job for job in jobs if job.pages is not None or _use_inline_image(job)]
+    inline_ids = {job.pk for job in inline_jobs}
+    upload_jobs = [job for job in jobs if job.pk not in inline_ids]
+
+    pool = _get_executor('upload', settings.OCR_UPLOAD_CONCURRENCY)
+    upload_futures = [pool.submit(_upload_job_image, job) for job in upload_jobs]
+
+    ready = list(inline_jobs)
+    for job, future in zip(upload_jobs, upload_futures):
+        try:
+            s3_url = future.result()
+        except Exception as e:
+            logger.error("S3 업로드 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+            s3_url = None
+
+        if not s3_url:
+            message = 'S3 업로드에 실패했습니다.' if job.image_file else '업로드된 파일이 없습니다.'
+            _mark_failed(job, message)
+            continue
+        job.s3_url = s3_url
+        ready.append(job)
+
+    if not ready:
+        return jobs
+
+    # 2) OCR 호출 - 작업을 (작업, 페이지) 단위로 펼쳐 요청당 이미지 한도로 묶은 뒤 제한된 동시성으로 fan-out
+    #    여러 페이지 문서도 페이지가 동시에 처리되므로 가장 느린 페이지만큼만 기다림
+    units = []
+    whole_documents = []
+    for job in ready:
+        if job.pages is not None:
+            units.extend((job, page) for page in range(len(job.pages)))
+        elif _is_whole_document(job):
+            whole_documents.append([(job, None)])
+        else:
+            units.append((job, None))
+    # 통째로 보내는 문서는 응답 이미지 수가 페이지 수만큼 늘어나므로 다른 이미지와 같은 요청에 섞지 않음
+    groups = list(_chunks(units, max(1, settings.NAVER_OCR_MAX_IMAGES_PER_REQUEST))) + whole_documents
+    pool = _get_executor('ocr', settings.OCR_REQUEST_CONCURRENCY)
+    ocr_futures = [pool.submit(_call_ocr_for_units, group) for group in groups]
+
+    page_responses = {job.pk: {} for job in ready}
+    errors = {}
+    retry_ids = set()
+    for group, future in zip(groups, ocr_futures):
+        try:
+            responses = future.result()
+        except OCRAPIError as e:
+            logger.error("OCR API 호출 오류: %s", e, extra={'job_ids': [job.pk for job, _ in group]})
+            responses = [None] * len(group)
+            for job, _ in group:
+                errors.setdefault(job.pk, str(e))
+                if e.retryable:
+                    retry_ids.add(job.pk)
+        except Exception:
+            logger.exception("OCR API 호출 오류", extra={'job_ids': [job.pk for job, _ in group]})
+            responses = [None] * len(group)
+        for (job, page), ocr_response in zip(group, responses):
+            page_responses[job.pk][page] = ocr_response
+
+    # 3) 페이지 응답을 작업별로 합쳐 저장 - 묶음 전체를 한 트랜잭션으로 커밋해 작업마다 쓰기 잠금/fsync를 반복하지 않음
+    #    (작업별 savepoint라 한 작업의 저장 오류가 다른 작업을 되돌리지 않음)
+    archive_jobs = []
+    stored_keys = []
+    try:
+        with transaction.atomic():
+            for job in ready:
+                responses = page_responses[job.pk]
+                failed_pages = [page for page, ocr_response in responses.items() if not ocr_response]
+                try:
+                    with transaction.atomic():
+                        if failed_pages:
+                            if job.pk in retry_ids:
+                                _requeue_job(job, errors.get(job.pk, ''))
+                                continue
+                            message = errors.get(job.pk, 'OCR API 호출에 실패했습니다.')
+                            if job.pages is not None:
+                                numbers = ', '.join(str(page + 1) for page in sorted(failed_pages))
+                                message = f'{message} (페이지 {numbers})'
+                            _mark_failed(job, message)
+                            continue
+                        _mark_done(job, _stitch_pages(job, responses))
+                        if job.raw_result_key:
+                            stored_keys.append(job.raw_result_key)
+                    if job.pk in inline_ids:
+                        archive_jobs.append(job)
+                except Exception as e:
+                    if stored_keys and stored_keys[-1] == job.raw_result_key:
+                        _delete_raw_result(stored_keys.pop())  # savepoint가 되돌려진 작업의 원본 파일
+                    logger.exception("OCR 결과 저장 오류 (id=%s)", job.pk, extra={'job_id': job.pk})
+                    _mark_failed(job, f'OCR 처리 중 오류가 발생했습니다: {e}')
+    except Exception:
+        # 묶음 트랜잭션이 되돌려지면 이번에 쓴 원본 파일을 가리키는 행이 없음
+        for key in stored_keys:
+            _delete_raw_result(key)
+        raise
+
+    # 4) 인라인으로 처리한 이미지의 S3 보관 - 결과가 이미 저장된 뒤라 사용자 대기 시간에 포함되지 않음
+    if archive_jobs and settings.OCR_ARCHIVE_TO_S3:
+        _archive_inline_images(archive_jobs)
+
+    return jobs
+
+
+def _archive_inline_images(jobs):
+    """인라인 OCR을 마친 이미지를 S3에 보관하고 URL만 갱신 (실패해도 결과에는 영향 없음)"""
+    pool = _get_executor('upload', settings.OCR_UPLOAD_CONCURRENCY)
+    futures = [pool.submit(_upload_job_image, job) for job in jobs]
+    for job, future in zip(jobs, futures):
+        try:
+            s3_url = future.result()
+        except Exception as e:
+            logger.warning("S3 보관 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+            continue
+        if s3_url:
+            job.s3_url = s3_url
+            OCRResult.objects.filter(pk=job.pk).update(s3_url=s3_url, image_scale=job.image_scale)
+
+
+def process_ocr_job(ocr_result):
+    """업로드된 이미지를 S3에 올리고 OCR API를 호출해 결과를 저장"""
+    process_ocr_jobs([ocr_result])
+    return ocr_result
+
+
+async def aprocess_ocr_job(ocr_result):
+    """작업 하나를 이벤트 루프에서 처리 (ASGI 뷰용)
+
+    OCR 호출은 backend.arecognize로 기다리므로 응답 대기 중에는 스레드를 점유하지 않고,
+    전처리는 프로세스 풀, S3 업로드와 파일 읽기는 스레드, DB 저장은 sync_to_async로 처리함.
+    여러 페이지 문서는 페이지 분할/병렬 처리가 필요하므로 동기 경로(process_ocr_jobs)를 스레드에서 실행함
+    """
+    job = ocr_result
+    if job.image_file and is_multi_page_document(job.image_file.name):
+        await sync_to_async(process_ocr_jobs)([job])
+        return job
+
+    job.pages = None
+    job.prepared_image = None
+    if settings.OCR_PREPROCESS_ENABLED:
+        future = _submit_job_preprocess(job)
+        if future is not None:
+            try:
+                with timed('preprocess'):
+                    job.prepared_image = await asyncio.wrap_future(future)
+            except Exception as e:
+                logger.warning("이미지 전처리 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+
+    inline = await asyncio.to_thread(_use_inline_image, job)
+    if not inline:
+        try:
+            s3_url = await asyncio.to_thread(_upload_job_image, job)
+        except Exception as e:
+            logger.error("S3 업로드 오류 (id=%s): %s", job.pk, e, extra={'job_id': job.pk})
+            s3_url = None
+        if not s3_url:
+            message = 'S3 업로드에 실패했습니다.' if job.image_file else '업로드된 파일이 없습니다.'
+            return await sync_to_async(_mark_failed)(job, message)
+        job.s3_url = s3_url
+
+    backend = get_ocr_backend()
+    try:
+        image = await asyncio.to_thread(_ocr_image, job)
+        with timed('ocr_call', backend=type(backend).__name__):
+            responses = await backend.arecognize([image])
+    except OCRAPIError as e:
+        logger.error("OCR API 호출 오류: %s", e, extra={'job_id': job.pk})
+        if e.retryable:
+            return await sync_to_async(_requeue_job)(job, str(e))
+        return await sync_to_async(_mark_failed)(job, str(e))
+    except Exception:
+        logger.exception("OCR API 호출 오류", extra={'job_id': job.pk})
+        return await sync_to_async(_mark_failed)(job, 'OCR API 호출에 실패했습니다.')
+
+    if not responses or not responses[0]:
+        return await sync_to_async(_mark_failed)(job, 'OCR API 호출에 실패했습니다.')
+
+    try:
+        await sync_to_async(_mark_done)(job, _stitch_pages(job, {None: responses[0]}))
+    except Exception as e:
+        logger.exception("OCR 결과 저장 오류 (id=%s)", job.pk, extra={'job_id': job.pk})
+        return await sync_to_async(_mark_failed)(job, f'OCR 처리 중 오류가 발생했습니다: {e}')
+
+    # 인라인으로 처리한 이미지의 S3 보관 - 결과는 이미 저장됐으므로 실패해도 영향 없음
+    if inline and settings.OCR_ARCHIVE_TO_S3:
+        await sync_to_async(_archive_inline_images)([job])
+    return job
+
+
+def run_worker(poll_interval=None, once=False):
+    """대기열이 빌 때까지 작업을 처리하고, 비면 poll_interval 만큼 쉬었다가 다시 확인"""
+    poll_interval = poll_interval if poll_interval is not None else settings.OCR_WORKER_POLL_INTERVAL
+    reported_metrics = {}
+
+    while True:
+        # CONN_MAX_AGE가 지났거나 끊어진 DB 연결은 정리하고 다시 연결 (요청 주기가 없는 워커용)
+        close_old_connections()
+
+        # OCR API 장애로 서킷이 열려 있으면 작업을 선점하지 않고 복구 시험 시점까지 대기
+        pause = get_circuit_breaker().retry_after()
+        if pause:
+            if once:
+                return
+            time.sleep(pause)
+            continue
+
+        jobs = claim_jobs(settings.OCR_WORKER_BATCH_SIZE)
+        if jobs:
+            process_ocr_jobs(jobs)
+            continue
+
+        # 쉬는 동안 지표 스냅샷을 남기고 이 프로세스의 OCR API 호출 통계를 기록 (바뀐 경우만)
+        flush_metrics()
+        api_metrics = get_metrics()
+        if api_metrics != reported_metrics:
+            logger.info("OCR API 통계 (pid=%s): %s", os.getpid(), api_metrics, extra={'api_metrics': api_metrics})
+            reported_metrics = api_metrics
+
+        if once:
+            return
+        # 대기열이 비었을 때만 멈춘 작업을 회수 (바쁠 때 불필요한 UPDATE 방지)
+        if requeue_stale_jobs():
+            continue
+        time.sleep(poll_interval)
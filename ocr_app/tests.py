@@ -1,3 +1,1600 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+import requests
+
+from . import backends, blobstore, events, exportcache, metrics, resilience, tasks
+from .models import OCRBatch, OCRResult
+from .parsing import extract_table, extract_tables
+from .preprocess import count_pages, preprocess_image, rescale_vertices
+from .utils import compute_content_hash, ocr_image_payload
+
+
+def _cell(row, col, text, row_span=1, col_span=1, confidence=1.0):
+    return {
+        'rowIndex': row,
+        'columnIndex': col,
+        'rowSpan': row_span,
+        'columnSpan': col_span,
+        'inferConfidence': confidence,
+        'cellTextLines': [{'inferConfidence': confidence, 'cellWords': [{'inferText': text}] if text else []}],
+        'boundingPoly': {'vertices': [{'x': 0, 'y': 0}, {'x': 10, 'y': 0}, {'x': 10, 'y': 10}, {'x': 0, 'y': 10}]},
+    }
+
+
+def _clova_response(*pages):
+    """페이지마다 (행 목록) 테이블 하나가 있는 Clova V2 형식 응답"""
+    images = []
+    for page, rows in enumerate(pages, 1):
+        cells = [_cell(r, c, text) for r, row in enumerate(rows) for c, text in enumerate(row)]
+        images.append({'page': page, 'tables': [{'cells': cells}]})
+    return {'images': images}
+
+
+def _done_result(response, **fields):
+    ocr_result = OCRResult.objects.create(status=OCRResult.STATUS_DONE, finished_at=timezone.now(), **fields)
+    ocr_result.set_raw_result(response)
+    ocr_result.refresh_parsed_tables(save=False)
+    ocr_result.save()
+    return ocr_result
+
+
+def _body(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def _png(seed=0, size=(40, 30)):
+    """seed마다 내용이 다른 작은 PNG (중복 업로드 재사용에 걸리지 않도록)"""
+    image = Image.new('RGB', size, 'white')
+    image.putpixel((seed % size[0], seed // size[0] % size[1]), (0, 0, 0))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def _jpeg(size=(200, 100)):
+    image = Image.new('RGB', size, 'white')
+    output = io.BytesIO()
+    image.save(output, format='JPEG')
+    return output.getvalue()
+
+
+def _upload(content, name='scan.png', content_type='image/png'):
+    return SimpleUploadedFile(name, content, content_type=content_type)
+
+
+def _zip(entries):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in entries:
+            zf.writestr(name, content)
+    return _upload(output.getvalue(), 'scans.zip', 'application/zip')
+
+
+class OCRTestCase(TestCase):
+    """파일/이벤트/지표를 임시 디렉토리나 프로세스 안에서만 쓰도록 설정을 바꾼 테스트 기반 클래스"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='ocr-test-')
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            OCR_RAW_STORAGE='db',
+            OCR_RAW_STORAGE_DIR=os.path.join(cls.media_root, 'raw'),
+            OCR_EXPORT_CACHE='off',
+            OCR_EVENTS_LOG='',
+            OCR_METRICS_DIR='',
+            OCR_DEBUG_DUMP_DIR='',
+            OCR_DEDUP_ENABLED=True,
+            OCR_DEDUP_TTL=0,
+            NAVER_OCR_RATE_LIMIT=0,
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+class JobQueueTests(OCRTestCase):
+    def test_claim_next_job_takes_oldest_queued_job(self):
+        first = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        second = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        OCRResult.objects.create(status=OCRResult.STATUS_DONE)
+
+        job = tasks.claim_next_job()
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual(job.status, OCRResult.STATUS_RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.started_at)
+
+        self.assertEqual(tasks.claim_next_job().pk, second.pk)
+        self.assertIsNone(tasks.claim_next_job())
+
+    def test_claim_next_job_skips_job_taken_by_another_worker(self):
+        taken = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        free = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        real_filter = OCRResult.objects.filter
+        calls = []
+
+        def racing_filter(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                # 후보를 고른 직후 다른 워커가 먼저 선점한 상황
+                real_filter(pk=taken.pk).update(status=OCRResult.STATUS_RUNNING)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(OCRResult.objects, 'filter', side_effect=racing_filter):
+            job = tasks.claim_next_job()
+
+        self.assertEqual(job.pk, free.pk)
+        taken.refresh_from_db()
+        self.assertEqual(taken.attempts, 0)
+
+    def test_requeue_stale_jobs(self):
+        old = timezone.now() - timedelta(seconds=600)
+        stale = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, started_at=old, attempts=1)
+        fresh = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(tasks.requeue_stale_jobs(timeout=300), 1)
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, OCRResult.STATUS_QUEUED)
+        self.assertEqual(fresh.status, OCRResult.STATUS_RUNNING)
+
+    def test_requeue_stale_jobs_fails_exhausted_job(self):
+        old = timezone.now() - timedelta(seconds=600)
+        exhausted = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, started_at=old, attempts=3)
+
+        with self.settings(OCR_JOB_MAX_ATTEMPTS=3):
+            self.assertEqual(tasks.requeue_stale_jobs(timeout=300), 0)
+
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, OCRResult.STATUS_FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+
+    def test_requeue_job_gives_up_after_max_attempts(self):
+        job = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, attempts=2)
+        with self.settings(OCR_JOB_MAX_ATTEMPTS=3):
+            tasks._requeue_job(job)
+            self.assertEqual(job.status, OCRResult.STATUS_QUEUED)
+
+            job.attempts = 3
+            tasks._requeue_job(job, '서킷 열림')
+        job.refresh_from_db()
+        self.assertEqual(job.status, OCRResult.STATUS_FAILED)
+        self.assertIn('서킷 열림', job.error_message)
+
+
+class BatchUploadTests(OCRTestCase):
+    def post(self, **data):
+        return self.client.post(reverse('api_batch_upload'), data)
+
+    def test_images_are_queued_in_order(self):
+        response = self.post(images=[_upload(_png(1), 'a.png'), _upload(_png(2), 'b.png')])
+
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(payload['total'], 2)
+        batch = OCRBatch.objects.get(pk=payload['batch_id'])
+        jobs = list(batch.results.order_by('batch_index'))
+        self.assertEqual([job.pk for job in jobs], payload['results'])
+        self.assertEqual({job.status for job in jobs}, {OCRResult.STATUS_QUEUED})
+
+    def test_archive_skips_folders_and_other_files(self):
+        archive = _zip([
+            ('scans/', b''),
+            ('scans/1.png', _png(1)),
+            ('scans/2.png', _png(2)),
+            ('scans/readme.txt', b'not an image'),
+            ('__MACOSX/.hidden.png', b''),
+        ])
+        response = self.post(archive=archive)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total'], 2)
+
+    def test_archive_with_too_many_images_is_rejected(self):
+        archive = _zip([(f'{i}.png', _png(i)) for i in range(4)])
+        with self.settings(OCR_BATCH_MAX_FILES=3):
+            response = self.post(archive=archive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OCRResult.objects.exists())
+
+    def test_archive_with_too_many_members_is_rejected(self):
+        archive = _zip([(f'{i}.txt', b'') for i in range(5)] + [('1.png', _png(1))])
+        with self.settings(OCR_BATCH_MAX_ARCHIVE_MEMBERS=5):
+            response = self.post(archive=archive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('항목', response.json()['errors']['archive'][0])
+
+    def test_archive_expanding_past_limit_is_rejected(self):
+        # 압축하면 작아지지만 풀면 한도를 넘는 항목 (압축 폭탄)
+        archive = _zip([('1.png', _png(1)), ('padding.txt', b'\0' * 200_000)])
+        self.assertLess(archive.size, 10_000)
+        with self.settings(OCR_BATCH_MAX_UNCOMPRESSED_SIZE=100_000):
+            response = self.post(archive=archive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('푼 전체 크기', response.json()['errors']['archive'][0])
+        self.assertFalse(OCRResult.objects.exists())
+
+    def test_oversized_archive_is_rejected(self):
+        archive = _zip([('1.png', _png(1))])
+        with self.settings(OCR_BATCH_MAX_ARCHIVE_SIZE=archive.size - 1):
+            response = self.post(archive=archive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ZIP 파일 크기', response.json()['errors']['archive'][0])
+
+    def test_non_zip_archive_is_rejected(self):
+        response = self.post(archive=_upload(b'plain text', 'scans.zip', 'application/zip'))
+
+        self.assertEqual(response.status_code, 400)
+
+
+def _stale_dedup_lookup():
+    """첫 번째 filter() 조회(중복 확인)만 빈 결과를 돌려줌 - 다른 요청이 같은 파일을 막 저장한 경쟁 상황 재현"""
+    real_filter = OCRResult.objects.filter
+    calls = []
+
+    def lookup(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return OCRResult.objects.none()
+        return real_filter(*args, **kwargs)
+
+    return mock.patch.object(OCRResult.objects, 'filter', side_effect=lookup)
+
+
+class EnqueueDedupTests(OCRTestCase):
+    def test_enqueue_upload_reuses_finished_result(self):
+        ocr_result, reused = tasks.enqueue_upload(_upload(b'same image'))
+        self.assertFalse(reused)
+        OCRResult.objects.filter(pk=ocr_result.pk).update(status=OCRResult.STATUS_DONE)
+
+        again, reused = tasks.enqueue_upload(_upload(b'same image', 'copy.png'))
+        self.assertTrue(reused)
+        self.assertEqual(again.pk, ocr_result.pk)
+        self.assertEqual(OCRResult.objects.count(), 1)
+
+    def test_enqueue_upload_force_requeues_existing_result(self):
+        ocr_result, _ = tasks.enqueue_upload(_upload(b'same image'))
+        OCRResult.objects.filter(pk=ocr_result.pk).update(status=OCRResult.STATUS_DONE)
+
+        again, reused = tasks.enqueue_upload(_upload(b'same image'), force=True)
+        self.assertFalse(reused)
+        self.assertEqual(again.pk, ocr_result.pk)
+        self.assertEqual(again.status, OCRResult.STATUS_QUEUED)
+
+    def test_enqueue_upload_retries_failed_result(self):
+        ocr_result, _ = tasks.enqueue_upload(_upload(b'same image'))
+        OCRResult.objects.filter(pk=ocr_result.pk).update(status=OCRResult.STATUS_FAILED, error_message='오류')
+
+        again, reused = tasks.enqueue_upload(_upload(b'same image'))
+        self.assertFalse(reused)
+        self.assertEqual(again.pk, ocr_result.pk)
+        again.refresh_from_db()
+        self.assertEqual(again.status, OCRResult.STATUS_QUEUED)
+        self.assertEqual(again.error_message, '')
+
+    def test_enqueue_upload_without_dedup_creates_new_job(self):
+        tasks.enqueue_upload(_upload(b'same image'))
+        with self.settings(OCR_DEDUP_ENABLED=False):
+            _, reused = tasks.enqueue_upload(_upload(b'same image'))
+
+        self.assertFalse(reused)
+        self.assertEqual(OCRResult.objects.count(), 2)
+
+    def test_enqueue_upload_integrity_error_returns_concurrent_result(self):
+        upload = _upload(b'raced image')
+        winner = OCRResult.objects.create(content_hash=compute_content_hash(upload), status=OCRResult.STATUS_QUEUED)
+
+        with _stale_dedup_lookup():
+            ocr_result, reused = tasks.enqueue_upload(upload)
+
+        self.assertTrue(reused)
+        self.assertEqual(ocr_result.pk, winner.pk)
+        self.assertEqual(OCRResult.objects.count(), 1)
+
+
+class ExtractTableTests(TestCase):
+    def test_drops_empty_rows_from_every_matrix(self):
+        table = {'cells': [
+            _cell(0, 0, '헤더', col_span=2),
+            _cell(1, 0, '', col_span=2),
+            _cell(2, 0, 'a', confidence=0.5),
+            _cell(2, 1, 'b'),
+            _cell(3, 0, 'c', col_span=2),
+        ]}
+        boxes = []
+        parsed = extract_table(table, boxes, page=2)
+
+        self.assertEqual(parsed['data'], [['헤더', ''], ['a', 'b'], ['c', '']])
+        self.assertEqual(parsed['confidence'][1], [0.5, 1.0])
+        # 빈 행의 병합 정보는 빠지고, 아래 행의 병합 정보는 당겨진 행 번호를 가리킴
+        self.assertEqual(parsed['spans'], [[0, 0, 1, 2], [2, 0, 1, 2]])
+        self.assertEqual(parsed['page'], 2)
+        self.assertEqual(len(boxes), 5)
+        self.assertEqual({box['page'] for box in boxes}, {2})
+
+    def test_span_extends_table_size(self):
+        parsed = extract_table({'cells': [_cell(0, 0, '합계', row_span=2, col_span=3)]})
+
+        self.assertEqual(parsed['data'], [['합계', '', '']])
+        self.assertEqual(parsed['spans'], [[0, 0, 2, 3]])
+
+    def test_keeps_one_row_when_every_row_is_empty(self):
+        parsed = extract_table({'cells': [_cell(0, 0, ''), _cell(1, 0, '')]})
+
+        self.assertEqual(parsed['data'], [['']])
+
+    def test_table_without_cells(self):
+        self.assertIsNone(extract_table({'cells': []}))
+
+    def test_extract_tables_keeps_page_numbers(self):
+        response = {'images': [
+            {'tables': [{'cells': [_cell(0, 0, '첫 장')]}]},
+            {'page': 2, 'tables': [{'cells': [_cell(0, 0, '둘째 장')]}, {'cells': []}]},
+        ]}
+        parsed = extract_tables(response)
+
+        self.assertEqual([table['page'] for table in parsed['tables']], [1, 2])
+        self.assertEqual([box['page'] for box in parsed['boxes']], [1, 2])
+        self.assertEqual(extract_tables(None), {'tables': [], 'boxes': [], 'pages': {}})
+
+
+class ExcelExportTests(OCRTestCase):
+    def test_each_table_becomes_a_sheet(self):
+        ocr_result = _done_result(_clova_response([['이름', '금액'], ['사과', '1,000']], [['합계']]))
+
+        response = self.client.get(reverse('download_excel', kwargs={'pk': ocr_result.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'ocr_table_result_{ocr_result.pk}', response['Content-Disposition'])
+        workbook = load_workbook(io.BytesIO(_body(response)))
+        self.assertEqual(workbook.sheetnames, ['P1_Table_1', 'P2_Table_2'])
+        sheet = workbook['P1_Table_1']
+        self.assertEqual([[cell.value for cell in row] for row in sheet.iter_rows()], [['이름', '금액'], ['사과', '1,000']])
+        self.assertTrue(sheet['A1'].font.bold)
+        self.assertFalse(sheet['A2'].font.bold)
+
+    def test_result_without_tables_redirects(self):
+        ocr_result = _done_result({'images': [{'tables': []}]})
+
+        response = self.client.get(reverse('download_excel', kwargs={'pk': ocr_result.pk}))
+
+        self.assertRedirects(response, reverse('ocr_result', kwargs={'pk': ocr_result.pk}), fetch_redirect_response=False)
+
+
+class TableExportTests(OCRTestCase):
+    def setUp(self):
+        self.ocr_result = _done_result(_clova_response([['이름', '금액'], ['사과', '1,000']], [['합계', '1', '비고']]))
+
+    def export(self, fmt):
+        response = self.client.get(reverse('download_export', kwargs={'pk': self.ocr_result.pk, 'fmt': fmt}))
+        self.assertEqual(response.status_code, 200)
+        return _body(response)
+
+    def test_csv_has_one_column_per_cell(self):
+        lines = self.export('csv').decode('utf-8').splitlines()
+        pk = str(self.ocr_result.pk)
+
+        self.assertEqual(list(csv.reader(lines)), [
+            ['result_id', 'page', 'table_index', 'row_index', 'col_1', 'col_2'],
+            [pk, '1', '1', '1', '이름', '금액'],
+            [pk, '1', '1', '2', '사과', '1,000'],
+            [],
+            ['result_id', 'page', 'table_index', 'row_index', 'col_1', 'col_2', 'col_3'],
+            [pk, '2', '2', '1', '합계', '1', '비고'],
+        ])
+
+    def test_jsonl(self):
+        rows = [json.loads(line) for line in self.export('jsonl').decode('utf-8').splitlines()]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], {
+            'result_id': self.ocr_result.pk, 'page': 1, 'table_index': 1, 'row_index': 1, 'cells': ['이름', '금액'],
+        })
+        self.assertEqual(rows[2]['page'], 2)
+
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.export('parquet')))
+
+        self.assertEqual(table.column_names, ['result_id', 'page', 'table_index', 'row_index', 'cells'])
+        self.assertEqual(table.column('cells').to_pylist(), [['이름', '금액'], ['사과', '1,000'], ['합계', '1', '비고']])
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('download_export', kwargs={'pk': self.ocr_result.pk, 'fmt': 'xml'}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_export_filters_by_date(self):
+        old = _done_result(_clova_response([['작년']]))
+        OCRResult.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        start = (timezone.localdate() - timedelta(days=1)).isoformat()
+
+        response = self.client.get(reverse('download_bulk_export', kwargs={'fmt': 'jsonl'}), {'start': start})
+
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in _body(response).decode('utf-8').splitlines()]
+        self.assertEqual({row['result_id'] for row in rows}, {self.ocr_result.pk})
+
+    def test_bulk_export_rejects_bad_date(self):
+        response = self.client.get(reverse('download_bulk_export', kwargs={'fmt': 'csv'}), {'start': '2024-13-01'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class _FakeS3:
+    """테스트에서 쓰는 객체 조회/업로드/삭제만 흉내 내는 메모리 S3 클라이언트"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self.objects[Key] = Fileobj.read()
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {'ContentLength': len(self.objects[Key])}
+
+    def list_objects_v2(self, Bucket, Prefix):
+        return {'Contents': [{'Key': key} for key in sorted(self.objects) if key.startswith(Prefix)]}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self.objects.pop(item['Key'], None)
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        return f"https://s3.example/{Params['Key']}?expires={ExpiresIn}"
+
+
+class RawResultStoreTests(OCRTestCase):
+    payload = {'images': [{'inferText': '한글 텍스트', 'fields': list(range(100))}]}
+
+    def test_round_trip_for_each_codec(self):
+        for compression, codec in (('zstd', 'zst'), ('gzip', 'gz')):
+            if compression == 'zstd' and blobstore.zstandard is None:
+                continue
+            with self.subTest(compression=compression), self.settings(OCR_RAW_COMPRESSION=compression):
+                pointer, size = blobstore.save_raw_result('1234-abcd', self.payload)
+
+                self.assertEqual(pointer, f'local:000001/1234-abcd.json.{codec}')
+                self.assertEqual(size, os.path.getsize(blobstore._local_path(pointer.split(':', 1)[1])))
+                self.assertEqual(blobstore.load_raw_result(pointer), self.payload)
+
+                blobstore.delete_raw_result(pointer)
+                blobstore.delete_raw_result(pointer)  # 이미 없어도 오류 없음
+                with self.assertRaises(FileNotFoundError):
+                    blobstore.load_raw_result(pointer)
+
+    def test_s3_backend(self):
+        s3 = _FakeS3()
+        with self.settings(OCR_RAW_STORAGE='s3', OCR_RAW_S3_PREFIX='raw/'), \
+                mock.patch.object(blobstore, 'get_s3_client', return_value=s3):
+            pointer, _ = blobstore.save_raw_result('7', self.payload)
+            self.assertTrue(pointer.startswith('s3:000000/7.json.'))
+            self.assertEqual(list(s3.objects), [f"raw/{pointer.split(':', 1)[1]}"])
+            self.assertEqual(blobstore.load_raw_result(pointer), self.payload)
+
+            blobstore.delete_raw_result(pointer)
+        self.assertEqual(s3.objects, {})
+
+    def test_row_keeps_only_pointer_and_file_is_removed_with_row(self):
+        with self.settings(OCR_RAW_STORAGE='local'):
+            ocr_result = _done_result(_clova_response([['값']]))
+            pointer = ocr_result.raw_result_key
+
+            fresh = OCRResult.objects.get(pk=ocr_result.pk)
+            self.assertEqual(fresh.ocr_result, {})
+            self.assertGreater(fresh.raw_result_bytes, 0)
+            self.assertEqual(fresh.raw_result, _clova_response([['값']]))
+
+            ocr_result.delete()
+        with self.assertRaises(FileNotFoundError):
+            blobstore.load_raw_result(pointer)
+
+
+class ResultListCursorTests(OCRTestCase):
+    def test_cursor_walks_every_result_once(self):
+        created_at = timezone.now()
+        results = [OCRResult.objects.create(status=OCRResult.STATUS_QUEUED) for _ in range(5)]
+        # 같은 시각에 만든 결과도 id로 순서가 정해져야 함
+        OCRResult.objects.filter(pk__in=[r.pk for r in results[1:4]]).update(created_at=created_at)
+
+        seen = []
+        cursor = None
+        for _ in range(len(results)):
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            payload = self.client.get(reverse('api_results'), params).json()
+            seen.extend(item['id'] for item in payload['results'])
+            cursor = payload['next_cursor']
+            if not cursor:
+                break
+
+        expected = list(
+            OCRResult.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('api_results'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit_is_clamped_and_validated(self):
+        for _ in range(3):
+            OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+
+        payload = self.client.get(reverse('api_results'), {'limit': 0}).json()
+        self.assertEqual(len(payload['results']), 1)
+        self.assertIsNotNone(payload['next_cursor'])
+
+        payload = self.client.get(reverse('api_results'), {'limit': 1000}).json()
+        self.assertEqual(len(payload['results']), 3)
+        self.assertIsNone(payload['next_cursor'])
+
+        self.assertEqual(self.client.get(reverse('api_results'), {'limit': 'x'}).status_code, 400)
+
+
+@override_settings(OCR_DIRECT_UPLOAD=True)
+class DirectUploadTests(OCRTestCase):
+    def setUp(self):
+        patcher = mock.patch('ocr_app.views.create_presigned_upload', return_value={'url': 'https://s3', 'fields': {}})
+        self.create_presigned_upload = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _presign(self, filename='scan.png', size=1024):
+        return self.client.post(reverse('api_presign_upload'), {'filename': filename, 'size': size})
+
+    def test_presign_issues_key_and_token(self):
+        response = self._presign()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['key'].startswith('ocr-images/direct/'))
+        self.assertTrue(data['key'].endswith('.png'))
+        self.assertTrue(data['token'])
+        self.create_presigned_upload.assert_called_once()
+
+    def test_presign_rejects_bad_file(self):
+        self.assertEqual(self._presign(filename='scan.exe').status_code, 400)
+        self.assertEqual(self._presign(size=20 * 1024 * 1024).status_code, 400)
+        self.create_presigned_upload.assert_not_called()
+
+    @override_settings(OCR_DIRECT_UPLOAD=False)
+    def test_disabled(self):
+        self.assertEqual(self._presign().status_code, 404)
+        self.assertEqual(self.client.post(reverse('api_complete_upload')).status_code, 404)
+
+    def test_complete_queues_one_job_per_key(self):
+        data = self._presign().json()
+        with mock.patch('ocr_app.views.get_s3_object_size', return_value=1024):
+            first = self.client.post(reverse('api_complete_upload'), {'token': data['token']})
+            again = self.client.post(reverse('api_complete_upload'), {'token': data['token']})
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['id'], again.json()['id'])
+        job = OCRResult.objects.get()
+        self.assertEqual(job.status, OCRResult.STATUS_QUEUED)
+        self.assertTrue(job.s3_url.endswith(data['key']))
+
+    def test_complete_rejects_key_not_issued_by_server(self):
+        with mock.patch('ocr_app.views.get_s3_object_size', return_value=1024) as get_size:
+            bare_key = self.client.post(reverse('api_complete_upload'), {'key': 'ocr-images/direct/other.png'})
+            forged = self.client.post(reverse('api_complete_upload'), {'token': 'ocr-images/direct/other.png:forged'})
+
+        self.assertEqual(bare_key.status_code, 400)
+        self.assertEqual(forged.status_code, 400)
+        get_size.assert_not_called()
+        self.assertFalse(OCRResult.objects.exists())
+
+    def test_complete_rejects_expired_token(self):
+        token = self._presign().json()['token']
+        # 서명 시각으로부터 유효 시간의 두 배가 지난 뒤의 완료 통보
+        with mock.patch('django.core.signing.time.time', return_value=9e9):
+            response = self.client.post(reverse('api_complete_upload'), {'token': token})
+        self.assertEqual(response.status_code, 400)
+
+    def test_complete_requires_uploaded_object(self):
+        token = self._presign().json()['token']
+        with mock.patch('ocr_app.views.get_s3_object_size', return_value=None):
+            response = self.client.post(reverse('api_complete_upload'), {'token': token})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OCRResult.objects.exists())
+
+
+class _RecordingBackend:
+    """받은 이미지를 기록하고 고정 응답을 돌려주는 OCR 백엔드"""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def recognize(self, images):
+        self.calls.append(images)
+        return [json.loads(json.dumps(self.response)) for _ in images]
+
+    async def arecognize(self, images):
+        return self.recognize(images)
+
+
+def _done_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _inline_preprocess(path):
+    # 프로세스 풀 대신 현재 프로세스에서 바로 전처리
+    return _done_future(preprocess_image(path, 100))
+
+
+class PreprocessTests(OCRTestCase):
+    def _write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_large_image_is_downscaled(self):
+        prepared = preprocess_image(self._write('large.jpg', _jpeg((200, 100))), 100)
+        self.assertEqual(prepared['scale'], 0.5)
+        self.assertEqual(prepared['format'], 'jpg')
+        self.assertEqual(prepared['size'], len(prepared['data']))
+        with Image.open(io.BytesIO(prepared['data'])) as image:
+            self.assertEqual(image.size, (100, 50))
+
+    def test_grayscale(self):
+        prepared = preprocess_image(self._write('color.jpg', _jpeg((200, 100))), 100, grayscale=True)
+        with Image.open(io.BytesIO(prepared['data'])) as image:
+            self.assertEqual(image.mode, 'L')
+
+    def test_non_image_returns_none(self):
+        with self.assertLogs('ocr_app.preprocess', 'WARNING'):
+            self.assertIsNone(preprocess_image(self._write('broken.jpg', b'not an image'), 100))
+
+    def test_rescale_vertices(self):
+        response = _clova_response([['a']])
+        rescale_vertices(response, 2)
+        vertices = response['images'][0]['tables'][0]['cells'][0]['boundingPoly']['vertices']
+        self.assertEqual(vertices[2], {'x': 20, 'y': 20})
+
+    @override_settings(OCR_PREPROCESS_ENABLED=True, NAVER_OCR_INLINE_IMAGES=False)
+    def test_reprocessing_uploaded_copy_keeps_original_coordinates(self):
+        job = OCRResult.objects.create(image_file=_upload(_jpeg((200, 100)), 'photo.jpg', 'image/jpeg'))
+        backend = _RecordingBackend(_clova_response([['a']]))
+        s3_url = 'https://bucket/ocr-images/photo.jpg'
+
+        with mock.patch.object(tasks, 'get_ocr_backend', return_value=backend), \
+                mock.patch.object(tasks, 'submit_preprocess', side_effect=_inline_preprocess) as submit, \
+                mock.patch.object(tasks, 'upload_to_s3', return_value=s3_url) as upload:
+            tasks.process_ocr_job(job)
+            job.refresh_from_db()
+            self.assertEqual(job.status, OCRResult.STATUS_DONE)
+            self.assertEqual((job.s3_url, job.image_scale), (s3_url, 0.5))
+            self.assertEqual(job.get_box_rects(), [[0, 0, 20, 20, 1000]])
+
+            # 다시 처리하면 S3의 축소본을 그대로 OCR 하지만 좌표는 원본 기준
+            tasks.requeue_result(job)
+            tasks.process_ocr_job(OCRResult.objects.get(pk=job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, OCRResult.STATUS_DONE)
+        self.assertEqual(backend.calls[-1], [{'url': s3_url}])
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(upload.call_count, 1)
+        self.assertEqual(job.get_box_rects(), [[0, 0, 20, 20, 1000]])
+
+
+class _InlineExecutor:
+    """프로세스 풀 대신 제출 즉시 현재 프로세스에서 실행하는 실행기"""
+
+    def submit(self, fn, *args, **kwargs):
+        return _done_future(fn(*args, **kwargs))
+
+
+def _tiff(*sizes):
+    frames = [Image.new('RGB', size, 'white') for size in sizes]
+    output = io.BytesIO()
+    frames[0].save(output, format='TIFF', save_all=True, append_images=frames[1:])
+    return output.getvalue()
+
+
+def _pdf(*sizes):
+    """페이지마다 스캔 이미지가 하나씩 들어 있는 PDF"""
+    pages = [Image.new('RGB', size, 'white') for size in sizes]
+    output = io.BytesIO()
+    pages[0].save(output, format='PDF', save_all=True, append_images=pages[1:])
+    return output.getvalue()
+
+
+@override_settings(OCR_PREPROCESS_ENABLED=True, OCR_PREPROCESS_MAX_LONG_EDGE=1000, OCR_ARCHIVE_TO_S3=False)
+class DocumentPageTests(OCRTestCase):
+    def setUp(self):
+        patcher = mock.patch('ocr_app.preprocess.get_preprocess_pool', return_value=_InlineExecutor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_pages(self):
+        tiff = OCRResult.objects.create(image_file=_upload(_tiff((40, 30), (40, 30), (40, 30)), 'scan.tif', 'image/tiff'))
+        pdf = OCRResult.objects.create(image_file=_upload(_pdf((40, 30), (40, 30)), 'scan.pdf', 'application/pdf'))
+        broken = OCRResult.objects.create(image_file=_upload(b'not a pdf', 'broken.pdf', 'application/pdf'))
+
+        self.assertEqual(count_pages(tiff.image_file.path), 3)
+        self.assertEqual(count_pages(pdf.image_file.path), 2)
+        with self.assertLogs('ocr_app.preprocess', 'WARNING'):
+            self.assertIsNone(count_pages(broken.image_file.path))
+
+    def test_tiff_pages_are_recognized_separately_and_stitched(self):
+        job = OCRResult.objects.create(image_file=_upload(_tiff((40, 30), (50, 20)), 'scan.tif', 'image/tiff'))
+        backend = _RecordingBackend(_clova_response([['a', 'b']]))
+
+        with mock.patch.object(tasks, 'get_ocr_backend', return_value=backend), \
+                mock.patch.object(tasks, 'upload_to_s3') as upload:
+            tasks.process_ocr_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, OCRResult.STATUS_DONE)
+        images = [image for call in backend.calls for image in call]
+        self.assertEqual(len(images), 2)
+        self.assertTrue(all(image['format'] == 'jpg' for image in images))
+        upload.assert_not_called()
+        self.assertEqual([page for page, _ in job.get_table_data(with_pages=True)], [1, 2])
+        self.assertEqual(job.get_page_count(), 2)
+
+    def test_stitch_split_pages_rescales_each_page(self):
+        job = OCRResult(pk=1)
+        job.pages = [{'scale': 0.5}, {'scale': 1.0}]
+        stitched = tasks._stitch_pages(job, {0: _clova_response([['a']]), 1: _clova_response([['b']])})
+
+        self.assertEqual([image['page'] for image in stitched['images']], [1, 2])
+        vertices = [image['tables'][0]['cells'][0]['boundingPoly']['vertices'][2] for image in stitched['images']]
+        self.assertEqual(vertices, [{'x': 20, 'y': 20}, {'x': 10, 'y': 10}])
+
+    def test_stitch_whole_document_uses_converted_page_index(self):
+        job = OCRResult(pk=1)
+        job.pages = None
+        response = {'images': [
+            {'convertedImageInfo': {'pageIndex': 2}},
+            {},
+        ]}
+        stitched = tasks._stitch_pages(job, {None: response})
+        self.assertEqual([image['page'] for image in stitched['images']], [3, 2])
+
+    def test_result_page_previews_each_document_page(self):
+        response = _clova_response([['a']], [['b'], ['c']])
+        ocr_result = _done_result(response, image_file=_upload(_tiff((40, 30), (50, 20)), 'scan.tif', 'image/tiff'))
+
+        page = self.client.get(reverse('ocr_result', args=[ocr_result.pk]))
+        self.assertContains(page, 'id="pageSelect"')
+        self.assertContains(page, reverse('result_page_image', args=[ocr_result.pk, 2]))
+        self.assertNotContains(page, ocr_result.image_file.url)
+
+        preview = self.client.get(reverse('result_page_image', args=[ocr_result.pk, 2]))
+        self.assertEqual(preview['Content-Type'], 'image/png')
+        with Image.open(io.BytesIO(preview.content)) as image:
+            self.assertEqual(image.size, (50, 20))
+        self.assertEqual(self.client.get(reverse('result_page_image', args=[ocr_result.pk, 3])).status_code, 404)
+
+        boxes = self.client.get(reverse('api_result_boxes', args=[ocr_result.pk]), {'page': 2}).json()
+        self.assertEqual(boxes['page'], 2)
+        self.assertEqual(len(boxes['boxes']), 2)
+        self.assertIsNone(boxes['size'])
+
+    def test_pdf_preview_and_converted_page_size(self):
+        response = _clova_response([['a']])
+        response['images'][0]['convertedImageInfo'] = {'width': 1240, 'height': 1754, 'pageIndex': 0}
+        ocr_result = _done_result(response, image_file=_upload(_pdf((60, 80)), 'scan.pdf', 'application/pdf'))
+
+        preview = self.client.get(reverse('result_page_image', args=[ocr_result.pk, 1]))
+        self.assertEqual(preview.status_code, 200)
+        with Image.open(io.BytesIO(preview.content)) as image:
+            self.assertEqual(image.format, 'PNG')
+
+        boxes = self.client.get(reverse('api_result_boxes', args=[ocr_result.pk]), {'page': 1}).json()
+        self.assertEqual(boxes['size'], [1240, 1754])
+
+    def test_image_result_has_no_page_preview(self):
+        ocr_result = _done_result(_clova_response([['a']]), image_file=_upload(_png()))
+
+        page = self.client.get(reverse('ocr_result', args=[ocr_result.pk]))
+        self.assertContains(page, ocr_result.image_file.url)
+        self.assertNotContains(page, 'id="pageSelect"')
+        self.assertEqual(self.client.get(reverse('result_page_image', args=[ocr_result.pk, 1])).status_code, 404)
+
+
+def _api_response(status, body='{}', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode('utf-8')
+    response.headers.update(headers or {})
+    return response
+
+
+class CircuitBreakerTests(TestCase):
+    def _open_breaker(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        return breaker
+
+    def _half_open_breaker(self):
+        breaker = self._open_breaker()
+        breaker.opened_at -= breaker.reset_timeout  # 대기 시간이 지난 것으로 만듦
+        return breaker
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertGreater(breaker.retry_after(), 0)
+        with self.assertRaises(resilience.CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_failure_count(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_half_open_allows_single_trial(self):
+        breaker = self._half_open_breaker()
+        breaker.before_call()
+
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(resilience.CircuitOpenError):
+            breaker.before_call()
+        self.assertGreater(breaker.retry_after(), 0)
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        breaker.before_call()
+
+    def test_failed_trial_reopens(self):
+        breaker = self._half_open_breaker()
+        breaker.before_call()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertGreater(breaker.retry_after(), 0)
+
+    def _call(self, breaker, send, limiter=None, retries=0):
+        with mock.patch.object(resilience, 'get_circuit_breaker', return_value=breaker), \
+                mock.patch.object(resilience, 'get_rate_limiter', return_value=limiter), \
+                mock.patch.object(resilience.time, 'sleep'), \
+                self.settings(NAVER_OCR_MAX_RETRIES=retries):
+            return resilience.call_with_resilience(send)
+
+    def test_unexpected_error_in_trial_reopens(self):
+        breaker = self._half_open_breaker()
+
+        with self.assertRaises(ValueError):
+            self._call(breaker, mock.Mock(side_effect=ValueError('bad payload')))
+
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertGreater(breaker.retry_after(), 0)
+
+    def test_open_circuit_does_not_take_rate_limit_token(self):
+        breaker = self._open_breaker()
+        limiter = mock.Mock()
+        send = mock.Mock()
+
+        with self.assertRaises(resilience.CircuitOpenError):
+            self._call(breaker, send, limiter=limiter)
+
+        limiter.try_acquire.assert_not_called()
+        send.assert_not_called()
+
+    def test_rate_limit_timeout_does_not_hold_trial(self):
+        breaker = self._half_open_breaker()
+
+        with mock.patch.object(resilience, 'acquire_token', side_effect=resilience.RateLimitTimeout('대기 초과')):
+            with self.assertRaises(resilience.RateLimitTimeout):
+                self._call(breaker, mock.Mock(), limiter=object())
+
+        breaker.before_call()  # 시험 호출이 남아 있지 않으므로 통과
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+
+    def test_rate_limited_response_is_not_a_breaker_success(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+
+        with self.assertRaises(resilience.OCRAPIError):
+            self._call(breaker, mock.Mock(return_value=_api_response(429)))
+        self.assertEqual(breaker.failures, 1)
+
+        half_open = self._half_open_breaker()
+        with self.assertRaises(resilience.OCRAPIError):
+            self._call(half_open, mock.Mock(return_value=_api_response(429)))
+        self.assertEqual(half_open.state, half_open.HALF_OPEN)
+        half_open.before_call()  # 429를 받은 시험 호출은 해제되어 다음 호출이 다시 시험함
+
+    def test_exhausted_retries_raise_retryable_error(self):
+        for status in (429, 503):
+            send = mock.Mock(return_value=_api_response(status))
+            with self.assertRaises(resilience.OCRAPIError) as raised:
+                self._call(resilience.CircuitBreaker(10, 60), send, retries=2)
+            self.assertTrue(raised.exception.retryable)
+            self.assertEqual(send.call_count, 3)
+
+    def test_client_error_is_not_retried(self):
+        send = mock.Mock(return_value=_api_response(400, '{"code": "0011"}'))
+        with self.assertRaises(resilience.OCRAPIError) as raised:
+            self._call(resilience.CircuitBreaker(10, 60), send, retries=2)
+        self.assertFalse(raised.exception.retryable)
+        self.assertEqual(send.call_count, 1)
+
+    def test_retry_after_then_success(self):
+        send = mock.Mock(side_effect=[_api_response(429, headers={'Retry-After': '1'}), _api_response(200)])
+        with mock.patch.object(resilience.time, 'sleep') as sleep:
+            with mock.patch.object(resilience, 'get_circuit_breaker', return_value=resilience.CircuitBreaker(10, 60)), \
+                    mock.patch.object(resilience, 'get_rate_limiter', return_value=None), \
+                    self.settings(NAVER_OCR_MAX_RETRIES=2):
+                response = resilience.call_with_resilience(send)
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(1.0)
+
+    def test_cancelled_trial_is_released(self):
+        breaker = self._half_open_breaker()
+
+        async def send():
+            raise asyncio.CancelledError
+
+        async def call():
+            with mock.patch.object(resilience, 'get_circuit_breaker', return_value=breaker), \
+                    mock.patch.object(resilience, 'get_rate_limiter', return_value=None):
+                await resilience.acall_with_resilience(send, (OSError,))
+
+        with self.settings(NAVER_OCR_MAX_RETRIES=0), self.assertRaises(asyncio.CancelledError):
+            asyncio.run(call())
+
+        breaker.before_call()
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+
+
+class _FailingBackend:
+    def __init__(self, error):
+        self.error = error
+
+    def recognize(self, images):
+        raise self.error
+
+    async def arecognize(self, images):
+        raise self.error
+
+
+class APIFailureRequeueTests(OCRTestCase):
+    def _process(self, error):
+        job = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, attempts=1, s3_url='https://bucket/scan.png')
+        with mock.patch.object(tasks, 'get_ocr_backend', return_value=_FailingBackend(error)):
+            tasks.process_ocr_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_retryable_error_requeues_job(self):
+        job = self._process(resilience.TransientAPIError('OCR API 오류: 429'))
+        self.assertEqual(job.status, OCRResult.STATUS_QUEUED)
+        self.assertEqual(job.error_message, '')
+
+    def test_client_error_fails_job(self):
+        job = self._process(resilience.OCRAPIError('OCR API 오류: 400'))
+        self.assertEqual(job.status, OCRResult.STATUS_FAILED)
+        self.assertIn('400', job.error_message)
+
+
+@override_settings(
+    OCR_FAKE_LATENCY=0, OCR_FAKE_ERROR_RATE=0, OCR_FAKE_TABLE_SIZE='4x3', OCR_FAKE_TABLES=2, NAVER_OCR_MAX_RETRIES=0,
+)
+class OCRBackendTests(OCRTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(resilience, 'get_circuit_breaker', return_value=resilience.CircuitBreaker(10, 60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_image_payload(self):
+        self.assertEqual(
+            ocr_image_payload('https://bucket/scan.PNG', 0),
+            {'format': 'png', 'name': 'billing_0', 'url': 'https://bucket/scan.PNG'},
+        )
+        self.assertEqual(
+            ocr_image_payload({'data': b'abc', 'format': 'jpg'}, 2),
+            {'format': 'jpg', 'name': 'billing_2', 'data': base64.b64encode(b'abc').decode('ascii')},
+        )
+
+    def test_fixture_backend_replays_same_response_for_same_image(self):
+        fixture_dir = os.path.join(self.media_root, 'fixtures')
+        os.makedirs(fixture_dir, exist_ok=True)
+        with open(os.path.join(fixture_dir, 'a.json'), 'w', encoding='utf-8') as f:
+            json.dump(_clova_response([['a']]), f)
+        with gzip.open(os.path.join(fixture_dir, 'b.json.gz'), 'wt', encoding='utf-8') as f:
+            json.dump(_clova_response([['b']]), f)
+
+        backend = backends.FixtureBackend(fixture_dir)
+        first, second = backend.recognize([{'data': b'scan'}, {'data': b'scan'}])
+        self.assertEqual(first, second)
+        self.assertIn(first, [_clova_response([['a']]), _clova_response([['b']])])
+
+        # 호출한 쪽이 응답을 고쳐도 다음 재생에는 영향이 없음
+        first['images'] = []
+        self.assertEqual(backend.recognize(['https://bucket/other.png'])[0]['images'][0]['page'], 1)
+        self.assertEqual(backend.recognize([{'data': b'scan'}])[0], second)
+
+    def test_fixture_backend_requires_fixtures(self):
+        with self.assertRaises(ImproperlyConfigured):
+            backends.FixtureBackend(os.path.join(self.media_root, 'empty'))
+
+    def test_fake_backend_returns_one_response_per_image(self):
+        responses = backends.FakeBackend().recognize([{'data': b'scan', 'format': 'png'}, 'https://bucket/a.png'])
+
+        self.assertEqual(len(responses), 2)
+        for response in responses:
+            (image,) = response['images']
+            self.assertEqual(len(image['tables']), 2)
+            columns = {cell['columnIndex'] for cell in image['tables'][0]['cells']}
+            self.assertEqual(columns, {0, 1, 2})
+
+    def test_fake_backend_async(self):
+        responses = asyncio.run(backends.FakeBackend().arecognize(['https://bucket/a.png']))
+        self.assertEqual(len(responses[0]['images'][0]['tables']), 2)
+
+    @override_settings(OCR_FAKE_ERROR_RATE=1)
+    def test_fake_backend_errors_are_retryable(self):
+        with self.assertRaises(resilience.OCRAPIError) as raised:
+            backends.FakeBackend().recognize(['https://bucket/a.png'])
+        self.assertTrue(raised.exception.retryable)
+
+    def test_get_ocr_backend_by_name_or_class_path(self):
+        with mock.patch.object(backends, '_backend', None), mock.patch.object(backends, '_backend_name', None):
+            with self.settings(OCR_BACKEND='fake'):
+                backend = backends.get_ocr_backend()
+                self.assertIsInstance(backend, backends.FakeBackend)
+                self.assertIs(backends.get_ocr_backend(), backend)
+            with self.settings(OCR_BACKEND='ocr_app.backends.ClovaBackend'):
+                self.assertIsInstance(backends.get_ocr_backend(), backends.ClovaBackend)
+
+
+class MetricsTests(OCRTestCase):
+    def _write_snapshot(self, directory, pid, value, age=0):
+        path = os.path.join(directory, f'{pid}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'counters': [['ocr_jobs_total', [['status', 'snapshot-test']], value]], 'histograms': []}, f)
+        if age:
+            past = os.path.getmtime(path) - age
+            os.utime(path, (past, past))
+        return path
+
+    def test_counters_and_histograms_render_as_prometheus(self):
+        metrics.inc('ocr_jobs_total', status='render-test')
+        metrics.inc('ocr_jobs_total', 2, status='render-test')
+        with metrics.timed('render_test_stage'):
+            pass
+
+        text = metrics.render_prometheus()
+        self.assertIn('# TYPE ocr_jobs_total counter', text)
+        self.assertIn('ocr_jobs_total{status="render-test"} 3', text)
+        self.assertIn('ocr_stage_duration_seconds_bucket{stage="render_test_stage",status="ok",le="+Inf"}', text)
+        self.assertIn('ocr_stage_duration_seconds_count{stage="render_test_stage",status="ok"}', text)
+
+    def test_timed_records_errors(self):
+        with self.assertRaises(ValueError):
+            with metrics.timed('error_test_stage'):
+                raise ValueError
+        self.assertIn('stage="error_test_stage",status="error"', metrics.render_prometheus())
+
+    def test_snapshots_of_other_processes_are_merged(self):
+        directory = tempfile.mkdtemp(dir=self.media_root)
+        live_pid, dead_pid = 1001, 1002
+        self._write_snapshot(directory, live_pid, 5, age=3600)  # 한가해서 오래 갱신되지 않은 살아 있는 프로세스
+        dead_path = self._write_snapshot(directory, dead_pid, 7)
+
+        with self.settings(OCR_METRICS_DIR=directory), \
+                mock.patch.object(metrics, '_pid_alive', side_effect=lambda pid: pid == live_pid):
+            total = metrics.collect()
+
+        key = ('ocr_jobs_total', (('status', 'snapshot-test'),))
+        self.assertEqual(total['counters'][key], 5)
+        self.assertTrue(os.path.exists(os.path.join(directory, f'{live_pid}.json')))
+        self.assertFalse(os.path.exists(dead_path))
+
+    def test_flush_writes_own_snapshot(self):
+        directory = tempfile.mkdtemp(dir=self.media_root)
+        metrics.inc('ocr_jobs_total', status='flush-test')
+        with self.settings(OCR_METRICS_DIR=directory):
+            metrics.flush()
+            # 자기 스냅샷은 메모리 값과 중복 집계하지 않음
+            key = ('ocr_jobs_total', (('status', 'flush-test'),))
+            self.assertEqual(metrics.collect()['counters'][key], metrics.counter_values('ocr_jobs_total', 'status')['flush-test'])
+
+        with open(os.path.join(directory, f'{os.getpid()}.json'), encoding='utf-8') as f:
+            self.assertIn(['ocr_jobs_total', [['status', 'flush-test']], 1], json.load(f)['counters'])
+
+    @override_settings(OCR_METRICS_TOKEN='secret')
+    def test_metrics_view_requires_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class ResultPageTests(OCRTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unfinished_job_shows_pending_page(self):
+        job = OCRResult.objects.create(status=OCRResult.STATUS_RUNNING)
+        response = self.client.get(reverse('ocr_result', args=[job.pk]))
+        self.assertTemplateUsed(response, 'ocr_app/pending.html')
+
+    def test_reparse_with_same_shape_refreshes_cached_tables(self):
+        ocr_result = _done_result(_clova_response([['이전 값']]))
+        self.assertContains(self.client.get(reverse('ocr_result', args=[ocr_result.pk])), '이전 값')
+
+        # 처리 완료 시각과 테이블 모양은 그대로이고 셀 내용만 바뀐 재파싱
+        ocr_result.set_raw_result(_clova_response([['새 값']]))
+        ocr_result.refresh_parsed_tables(save=False)
+        ocr_result.save()
+
+        response = self.client.get(reverse('ocr_result', args=[ocr_result.pk]))
+        self.assertContains(response, '새 값')
+        self.assertNotContains(response, '이전 값')
+
+    def test_box_overlay_api(self):
+        ocr_result = _done_result(_clova_response([['a', 'b']], [['c']]))
+        url = reverse('api_result_boxes', args=[ocr_result.pk])
+
+        self.assertEqual(self.client.get(url).json()['boxes'], [[0, 0, 10, 10, 1000], [0, 0, 10, 10, 1000]])
+        self.assertEqual(self.client.get(url, {'page': 2, 'text': 1}).json(), {'page': 2, 'texts': ['c']})
+        self.assertEqual(self.client.get(url, {'page': 'x'}).status_code, 400)
+
+        pending = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        self.assertEqual(self.client.get(reverse('api_result_boxes', args=[pending.pk])).status_code, 404)
+
+
+class ResultConditionalRequestTests(OCRTestCase):
+    def setUp(self):
+        self.ocr_result = _done_result(_clova_response([['값']]))
+        self.url = reverse('api_result_raw', kwargs={'pk': self.ocr_result.pk})
+
+    def test_matching_etag_returns_304_without_running_view(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn(self.ocr_result.version_token, etag)
+
+        # ETag 조회 한 번으로 끝나야 함 (원본 응답을 읽지 않음)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_result_returns_200(self):
+        etag = self.client.get(self.url)['ETag']
+        self.ocr_result.set_raw_result(_clova_response([['바뀐 값']]))
+        self.ocr_result.refresh_parsed_tables()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unfinished_result_has_no_etag(self):
+        OCRResult.objects.filter(pk=self.ocr_result.pk).update(status=OCRResult.STATUS_RUNNING)
+
+        response = self.client.get(self.url)
+        self.assertNotIn(self.ocr_result.version_token, response.get('ETag', ''))
+
+    def test_current_version_token_is_cached_as_immutable(self):
+        response = self.client.get(self.url, {'v': self.ocr_result.version_token})
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('no-cache', self.client.get(self.url, {'v': 'old'})['Cache-Control'])
+
+
+class ExportCacheTests(OCRTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(dir=self.media_root)
+        self.ocr_result = _done_result(_clova_response([['값']]))
+        self.url = reverse('download_export', args=[self.ocr_result.pk, 'csv'])
+
+    def _reprocess(self, text):
+        self.ocr_result.set_raw_result(_clova_response([[text]]))
+        self.ocr_result.refresh_parsed_tables()
+
+    def _cached_files(self):
+        return sorted(name for _, _, names in os.walk(self.cache_dir) for name in names)
+
+    def test_local_cache_serves_stored_file(self):
+        with self.settings(OCR_EXPORT_CACHE='local', OCR_EXPORT_CACHE_DIR=self.cache_dir):
+            first = _body(self.client.get(self.url))
+            with mock.patch('ocr_app.views.iter_table_rows') as iter_rows:
+                second = _body(self.client.get(self.url))
+
+        iter_rows.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertIn('값'.encode('utf-8'), first)
+        self.assertEqual(len(self._cached_files()), 1)
+
+    def test_storing_new_digest_removes_older_exports(self):
+        with self.settings(OCR_EXPORT_CACHE='local', OCR_EXPORT_CACHE_DIR=self.cache_dir):
+            self.client.get(self.url)
+            self.client.get(reverse('download_excel', args=[self.ocr_result.pk]))
+            self.assertEqual(len(self._cached_files()), 2)
+            old_files = self._cached_files()
+
+            # 다른 요청이 쓰고 있는 임시 파일은 남겨 둠
+            directory = os.path.dirname(exportcache.get_cached_export(self.ocr_result, 'csv')[1])
+            in_flight = os.path.join(directory, 'csv-in-flight.csv.abc' + exportcache.TMP_SUFFIX)
+            open(in_flight, 'wb').close()
+
+            self._reprocess('새 값')
+            body = _body(self.client.get(self.url))
+
+        self.assertIn('새 값'.encode('utf-8'), body)
+        files = self._cached_files()
+        self.assertEqual(len(files), 2)
+        self.assertTrue(os.path.exists(in_flight))
+        self.assertFalse(set(old_files) & set(files))
+
+    def test_store_leaves_no_temp_file(self):
+        with self.settings(OCR_EXPORT_CACHE='local', OCR_EXPORT_CACHE_DIR=self.cache_dir):
+            backend, path = exportcache.store_export(self.ocr_result, 'csv', ['a,', b'b'], 'text/csv')
+            with self.assertRaises(ValueError):
+                exportcache.store_export(self.ocr_result, 'jsonl', _failing_chunks(), 'application/jsonl')
+
+        self.assertEqual(backend, 'local')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'a,b')
+        self.assertEqual(self._cached_files(), [os.path.basename(path)])
+
+    def test_s3_cache_redirects_and_removes_older_exports(self):
+        s3 = _FakeS3()
+        with self.settings(OCR_EXPORT_CACHE='s3', OCR_EXPORT_CACHE_S3_PREFIX='exports/'), \
+                mock.patch.object(exportcache, 'get_s3_client', return_value=s3):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response['Location'].startswith('https://s3.example/exports/'))
+            old_keys = set(s3.objects)
+
+            self._reprocess('새 값')
+            self.client.get(self.url)
+
+        self.assertEqual(len(s3.objects), 1)
+        self.assertFalse(old_keys & set(s3.objects))
+
+    def test_delete_removes_cached_exports(self):
+        with self.settings(OCR_EXPORT_CACHE='local', OCR_EXPORT_CACHE_DIR=self.cache_dir):
+            self.client.get(self.url)
+            self.ocr_result.delete()
+        self.assertEqual(self._cached_files(), [])
+
+
+def _failing_chunks():
+    yield b'partial'
+    raise ValueError('build failed')
+
+
+@override_settings(OCR_PREPROCESS_ENABLED=False, NAVER_OCR_INLINE_IMAGES=True, OCR_ARCHIVE_TO_S3=False)
+class OCRNowTests(OCRTestCase):
+    async def _post(self, backend, content=None, name='scan.png'):
+        upload = _upload(content if content is not None else _png(), name)
+        with mock.patch.object(tasks, 'get_ocr_backend', return_value=backend):
+            return await self.async_client.post(reverse('api_ocr'), {'image_file': upload})
+
+    async def test_recognizes_upload_in_request(self):
+        backend = _RecordingBackend(_clova_response([['a']]))
+        response = await self._post(backend)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], OCRResult.STATUS_DONE)
+        self.assertFalse(data['reused'])
+        self.assertEqual(data['status_url'], reverse('api_result_status', args=[data['id']]))
+        self.assertEqual(len(backend.calls), 1)
+        self.assertIn('data', backend.calls[0][0])  # S3 없이 요청 본문에 이미지를 담음
+
+    async def test_same_file_reuses_finished_result(self):
+        backend = _RecordingBackend(_clova_response([['a']]))
+        first = (await self._post(backend)).json()
+        second = await self._post(backend)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.json()['reused'])
+        self.assertEqual(second.json()['id'], first['id'])
+        self.assertEqual(len(backend.calls), 1)
+
+    async def test_transient_api_error_requeues(self):
+        response = await self._post(_FailingBackend(resilience.TransientAPIError('OCR API 오류: 503')))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], OCRResult.STATUS_QUEUED)
+
+    async def test_api_error_fails(self):
+        response = await self._post(_FailingBackend(resilience.OCRAPIError('OCR API 오류: 400')))
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json()['status'], OCRResult.STATUS_FAILED)
+        self.assertIn('400', response.json()['error'])
+
+    async def test_rejects_bad_request(self):
+        response = await self._post(_RecordingBackend({}), b'MZ', 'tool.exe')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.get(reverse('api_ocr'))).status_code, 405)
+
+
+class EventBrokerTests(TestCase):
+    def test_returns_events_after_last_seen_id(self):
+        broker = events.EventBroker(10)
+        for result_id in (1, 2, 3):
+            broker.publish({'result_id': result_id})
+
+        received, reset = asyncio.run(broker.await_events(1, 0))
+        self.assertFalse(reset)
+        self.assertEqual([event['result_id'] for event in received], [2, 3])
+        self.assertEqual([event['id'] for event in received], [2, 3])
+
+    def test_resets_when_events_were_evicted_or_id_is_unknown(self):
+        broker = events.EventBroker(2)
+        for result_id in (1, 2, 3):
+            broker.publish({'result_id': result_id})
+
+        self.assertEqual(asyncio.run(broker.await_events(0, 0)), ([], True))  # 1번이 버퍼에서 밀려남
+        self.assertEqual(asyncio.run(broker.await_events(99, 0)), ([], True))  # 다른 프로세스의 ID
+        self.assertEqual(asyncio.run(broker.await_events(3, 0)), ([], False))
+
+    def test_publish_from_another_thread_wakes_waiter(self):
+        broker = events.EventBroker(10)
+
+        async def wait():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, lambda: threading.Thread(target=broker.publish, args=({'result_id': 7},)).start())
+            started = loop.time()
+            received, reset = await broker.await_events(0, 5)
+            return received, reset, loop.time() - started
+
+        received, reset, elapsed = asyncio.run(wait())
+        self.assertFalse(reset)
+        self.assertEqual([event['result_id'] for event in received], [7])
+        self.assertLess(elapsed, 1)
+
+
+class EventLogRelayTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='ocr-events-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'events.log')
+        self.broker = events.EventBroker(10)
+        self.relay = events.EventLogRelay(self.path, self.broker, interval=0)
+
+    def _append(self, *payloads):
+        for payload in payloads:
+            events._append_to_log(self.path, payload)
+
+    def _received(self):
+        received, _ = asyncio.run(self.broker.await_events(0, 0))
+        return [event['result_id'] for event in received]
+
+    def test_skips_existing_lines_and_relays_new_ones(self):
+        self._append({'result_id': 1})
+        self.relay._poll()
+        self._append({'result_id': 2}, {'result_id': 3})
+        self.relay._poll()
+
+        self.assertEqual(self._received(), [2, 3])
+
+    def test_waits_for_partial_line(self):
+        self.relay._poll()  # 파일이 아직 없으면 이후 생기는 파일을 처음부터 읽음
+        with open(self.path, 'wb') as f:
+            f.write(b'{"result_id":1}\n{"result_id"')
+        self.relay._poll()
+        self.assertEqual(self._received(), [1])
+
+        with open(self.path, 'ab') as f:
+            f.write(b':2}\n')
+        self.relay._poll()
+        self.assertEqual(self._received(), [1, 2])
+
+    def test_follows_rotated_log_with_increasing_ids(self):
+        self.relay._poll()
+        self._append({'result_id': 1})
+        self.relay._poll()
+        self._append({'result_id': 2})
+        os.replace(self.path, f'{self.path}.1')  # 로그 교체 직전에 쓰인 줄도 이전 파일에서 마저 읽어야 함
+        self._append({'result_id': 3})
+        self.relay._poll()
+        self.relay._poll()
+
+        self.assertEqual(self._received(), [1, 2, 3])
+        ids = [event['id'] for event in asyncio.run(self.broker.await_events(0, 0))[0]]
+        self.assertEqual(ids, sorted(set(ids)))
+
+
+@override_settings(OCR_EVENTS_LOG='', OCR_EVENTS_STREAM_MAX_AGE=5)
+class EventSubscriptionTests(OCRTestCase):
+    def _publish(self, result_id):
+        broker = events.get_broker()
+        broker.publish({'result_id': result_id, 'batch_id': None, 'status': OCRResult.STATUS_DONE})
+        return broker.last_id
+
+    def test_sse_is_refused_under_wsgi(self):
+        response = self.client.get(reverse('api_events'))
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json()['poll_url'], reverse('api_events_poll'))
+
+    async def test_sse_is_served_under_asgi(self):
+        last_id = self._publish(1)
+        response = await self.async_client.get(reverse('api_events'), {'last_event_id': last_id - 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        self.assertIn(f'id: {last_id}\n'.encode(), await anext(chunks))
+        await chunks.aclose()
+
+    def test_pages_render_polling_transport_under_wsgi(self):
+        self.assertEqual(self.client.get(reverse('index')).context['events_transport'], 'poll')
+
+        pending = OCRResult.objects.create(status=OCRResult.STATUS_QUEUED)
+        response = self.client.get(reverse('ocr_result', args=[pending.pk]))
+        self.assertTemplateUsed(response, 'ocr_app/pending.html')
+        self.assertEqual(response.context['events_transport'], 'poll')
+
+    def test_poll_returns_matching_events_after_id(self):
+        after = events.get_broker().last_id
+        self._publish(1)
+        last_id = self._publish(2)
+
+        data = self.client.get(reverse('api_events_poll'), {'last_event_id': after, 'result': 2, 'timeout': 0}).json()
+        self.assertEqual([event['result_id'] for event in data['events']], [2])
+        self.assertEqual(data['last_event_id'], last_id)
+        self.assertFalse(data['reset'])
+
+    def test_poll_without_id_starts_from_latest_event(self):
+        last_id = self._publish(1)
+        data = self.client.get(reverse('api_events_poll'), {'timeout': 0}).json()
+        self.assertEqual(data, {'events': [], 'last_event_id': last_id, 'reset': False})
+
+    def test_poll_resets_unknown_id(self):
+        last_id = self._publish(1)
+        data = self.client.get(reverse('api_events_poll'), {'last_event_id': last_id + 100, 'timeout': 0}).json()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['last_event_id'], last_id)
+
+    def test_poll_rejects_bad_filter(self):
+        response = self.client.get(reverse('api_events_poll'), {'result': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(OCR_RAW_STORAGE='local')
+class BatchWriteTests(OCRTestCase):
+    def test_enqueue_uploads_inserts_batch_with_constant_queries(self):
+        with CaptureQueriesContext(connection) as two:
+            tasks.enqueue_uploads([_upload(_png(1)), _upload(_png(2))])
+        with CaptureQueriesContext(connection) as five:
+            tasks.enqueue_uploads([_upload(_png(seed)) for seed in range(3, 8)])
+
+        self.assertEqual(len(five), len(two))
+        self.assertEqual(OCRResult.objects.count(), 7)
+
+    def test_enqueue_uploads_dedups_within_batch(self):
+        results = tasks.enqueue_uploads([_upload(b'a'), _upload(b'b'), _upload(b'a', 'again.png')])
+
+        self.assertEqual([reused for _, reused in results], [False, False, True])
+        self.assertEqual(results[0][0].pk, results[2][0].pk)
+        self.assertEqual(OCRResult.objects.count(), 2)
+
+    def test_enqueue_uploads_integrity_error_falls_back_to_single_uploads(self):
+        first = _upload(b'raced image')
+        winner = OCRResult.objects.create(content_hash=compute_content_hash(first), status=OCRResult.STATUS_DONE)
+
+        with _stale_dedup_lookup():
+            results = tasks.enqueue_uploads([first, _upload(b'new image')])
+
+        self.assertEqual(results[0][0].pk, winner.pk)
+        self.assertTrue(results[0][1])
+        self.assertFalse(results[1][1])
+        self.assertEqual(OCRResult.objects.count(), 2)
+
+    def test_each_raw_write_gets_a_new_pointer(self):
+        ocr_result = _done_result(_clova_response([['값']]))
+        first = ocr_result.raw_result_key
+        ocr_result.set_raw_result(_clova_response([['새 값']]))
+
+        self.assertNotEqual(ocr_result.raw_result_key, first)
+        self.assertEqual(blobstore.load_raw_result(first), _clova_response([['값']]))
+
+    def _raw_files(self):
+        root = settings.OCR_RAW_STORAGE_DIR
+        return {
+            os.path.relpath(os.path.join(directory, name), root)
+            for directory, _, names in os.walk(root) for name in names
+        }
+
+    def _process(self, jobs, broken):
+        real_save = OCRResult.save
+
+        def save(result, *args, **kwargs):
+            if result.pk == broken.pk and result.status == OCRResult.STATUS_DONE:
+                raise DatabaseError('disk I/O error')
+            return real_save(result, *args, **kwargs)
+
+        with mock.patch.object(tasks, 'get_ocr_backend', return_value=_RecordingBackend(_clova_response([['a']]))), \
+                mock.patch.object(OCRResult, 'save', save), self.assertLogs('ocr_app.tasks', 'ERROR'):
+            tasks.process_ocr_jobs(jobs)
+
+    def _jobs(self):
+        return [
+            OCRResult.objects.create(status=OCRResult.STATUS_RUNNING, attempts=1, s3_url=f'https://bucket/{i}.png')
+            for i in range(2)
+        ]
+
+    def test_failed_job_save_does_not_roll_back_other_jobs(self):
+        good, broken = self._jobs()
+        before = self._raw_files()
+        self._process([good, broken], broken)
+
+        good.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(good.status, OCRResult.STATUS_DONE)
+        self.assertEqual(broken.status, OCRResult.STATUS_FAILED)
+        self.assertIn('disk I/O error', broken.error_message)
+        # 저장하지 못한 작업의 원본 파일은 지워지고 완료된 작업의 파일만 남음
+        self.assertEqual(self._raw_files() - before, {good.raw_result_key.split(':', 1)[1]})
+
+    def test_rolled_back_batch_removes_written_raw_files(self):
+        good, broken = self._jobs()
+        before = self._raw_files()
+
+        with mock.patch.object(tasks, '_mark_failed', side_effect=DatabaseError('database is locked')), \
+                self.assertRaises(DatabaseError):
+            self._process([good, broken], broken)
+
+        self.assertEqual(self._raw_files(), before)
+        good.refresh_from_db()
+        self.assertEqual(good.status, OCRResult.STATUS_RUNNING)
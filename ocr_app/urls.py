@@ -4,6 +4,20 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('result/<int:pk>/', views.ocr_result, name='ocr_result'),
+    path('result/<int:pk>/pages/<int:page>.png', views.result_page_image, name='result_page_image'),
+    path('api/ocr/', views.ocr_now, name='api_ocr'),
     path('api/results/', views.get_ocr_results, name='api_results'),
+    path('api/results/<int:pk>/status/', views.get_ocr_status, name='api_result_status'),
+    path('api/results/<int:pk>/boxes/', views.get_result_boxes, name='api_result_boxes'),
+    path('api/results/<int:pk>/raw/', views.get_result_raw, name='api_result_raw'),
+    path('api/events/', views.event_stream, name='api_events'),
+    path('api/events/poll/', views.poll_events, name='api_events_poll'),
+    path('api/uploads/presign/', views.presign_upload, name='api_presign_upload'),
+    path('api/uploads/complete/', views.complete_upload, name='api_complete_upload'),
+    path('api/batch/', views.batch_upload, name='api_batch_upload'),
+    path('api/batch/<int:pk>/', views.get_batch_status, name='api_batch_status'),
     path('download/<int:pk>/', views.download_excel, name='download_excel'),
+    path('download/<int:pk>.<str:fmt>', views.download_export, name='download_export'),
+    path('download/bulk.<str:fmt>', views.download_bulk_export, name='download_bulk_export'),
+    path('metrics', views.metrics, name='metrics'),
 ]
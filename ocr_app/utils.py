@@ -1,87 +1,405 @@
 import boto3
 import requests
+import base64
 import json
 import time
+import hashlib
+import mimetypes
+import threading
+import logging
+import gzip
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from requests.adapters import HTTPAdapter
 import os
+import asyncio
+import weakref
 
-def upload_to_s3(file_obj, filename):
-    """파일을 S3에 업로드하고 URL 반환"""
-    try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
+from .metrics import inc, timed
+from .resilience import OCRAPIError, acall_with_resilience, call_with_resilience
+
+try:
+    import httpx
+except ImportError:  # 비동기 OCR 호출은 선택 사항 - 없으면 스레드에서 requests로 호출
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# 프로세스 단위로 재사용하는 클라이언트 레지스트리
+# - boto3 클라이언트는 스레드 안전하므로 프로세스당 하나를 공유
+# - requests.Session은 스레드 안전이 보장되지 않으므로 스레드마다 하나씩 유지
+# fork된 자식 프로세스가 부모의 소켓을 물려받지 않도록 pid가 바뀌면 새로 생성함
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+_http_local = threading.local()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_s3_client():
+    """연결 풀이 설정된 프로세스 공용 S3 클라이언트 반환"""
+    global _s3_client, _s3_client_pid
+
+    pid = os.getpid()
+    if _s3_client is None or _s3_client_pid != pid:
+        with _s3_client_lock:
+            if _s3_client is None or _s3_client_pid != pid:
+                # boto3.client()는 기본 세션을 공유하므로 스레드 경합을 피하려 세션을 새로 만듦
+                session = boto3.session.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME
+                )
+                _s3_client = session.client(
+                    's3',
+                    config=Config(
+                        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+                        connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+                        read_timeout=settings.AWS_S3_READ_TIMEOUT,
+                        retries={'max_attempts': settings.AWS_S3_MAX_ATTEMPTS, 'mode': 'standard'},
+                        tcp_keepalive=True,
+                    )
+                )
+                _s3_client_pid = pid
+    return _s3_client
+
+
+def get_http_session():
+    """keep-alive 연결 풀이 설정된 스레드별 requests.Session 반환
+
+    재시도는 resilience.call_with_resilience에서 속도 제한/서킷 브레이커와 함께 처리하므로
+    어댑터 단계에서는 재시도하지 않음 (이중 재시도 방지)
+    """
+    pid = os.getpid()
+    session = getattr(_http_local, 'session', None)
+    if session is None or getattr(_http_local, 'pid', None) != pid:
+        adapter = HTTPAdapter(
+            pool_connections=settings.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            max_retries=0,
         )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _http_local.session = session
+        _http_local.pid = pid
+    return session
+
+
+def get_async_http_client():
+    """이벤트 루프별 httpx.AsyncClient - 한 루프 안의 모든 코루틴이 keep-alive 연결 풀을 공유
+
+    클라이언트는 만든 이벤트 루프에서만 쓸 수 있으므로 루프마다 하나씩 유지함
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OCR_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OCR_ASYNC_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.NAVER_OCR_READ_TIMEOUT, connect=settings.NAVER_OCR_CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def reset_clients():
+    """캐시된 클라이언트를 모두 폐기 (설정 변경 후나 테스트에서 사용)"""
+    global _s3_client, _s3_client_pid
+
+    with _s3_client_lock:
+        _s3_client = None
+        _s3_client_pid = None
+    session = getattr(_http_local, 'session', None)
+    if session is not None:
+        session.close()
+        _http_local.session = None
+    # 비동기 클라이언트는 각자의 이벤트 루프에서만 닫을 수 있으므로 참조만 버림
+    _async_clients.clear()
+
+
+def compute_content_hash(file_obj):
+    """파일 내용의 SHA-256 해시 계산 (청크 단위로 읽어 전체를 메모리에 올리지 않음)"""
+    sha256 = hashlib.sha256()
+    if hasattr(file_obj, 'chunks'):
+        for chunk in file_obj.chunks():
+            sha256.update(chunk)
+    else:
+        for chunk in iter(lambda: file_obj.read(64 * 1024), b''):
+            sha256.update(chunk)
+    file_obj.seek(0)
+    return sha256.hexdigest()
+
+
+# 파일 앞부분 시그니처로 판별하는 이미지/문서 형식
+_MAGIC_CONTENT_TYPES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'%PDF-', 'application/pdf'),
+]
+
+
+def detect_content_type(file_obj, filename=''):
+    """파일 시그니처로 Content-Type 판별 (판별 불가 시 확장자 기준)"""
+    try:
+        position = file_obj.tell()
+        head = file_obj.read(16)
+        file_obj.seek(position)
+    except (AttributeError, OSError):
+        head = b''
+
+    for signature, content_type in _MAGIC_CONTENT_TYPES:
+        if head.startswith(signature):
+            return content_type
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def get_transfer_config():
+    """큰 파일은 여러 파트로 나눠 병렬 업로드하도록 설정한 TransferConfig"""
+    return TransferConfig(
+        multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.AWS_S3_MAX_CONCURRENCY,
+        use_threads=settings.AWS_S3_MAX_CONCURRENCY > 1,
+    )
+
+
+def upload_to_s3(file_obj, filename, content_type=None):
+    """파일을 S3에 업로드하고 URL 반환
+
+    file_obj는 메모리로 읽지 않고 그대로 스트리밍하며, 큰 파일은 멀티파트로 병렬 전송함
+    """
+    try:
+        s3_client = get_s3_client()
         
         # S3에 파일 업로드
         s3_key = f"ocr-images/{filename}"
-        s3_client.upload_fileobj(
-            file_obj,
-            settings.AWS_STORAGE_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={'ContentType': 'image/jpeg'}
-        )
+        with timed('s3_put'):
+            s3_client.upload_fileobj(
+                file_obj,
+                settings.AWS_STORAGE_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={'ContentType': content_type or detect_content_type(file_obj, filename)},
+                Config=get_transfer_config()
+            )
         
         # 공개 URL 생성
-        s3_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}"
-        return s3_url
+        return build_s3_url(s3_key)
         
     except ClientError as e:
-        print(f"S3 업로드 오류: {e}")
+        logger.error("S3 업로드 오류: %s", e)
         return None
 
-def call_naver_ocr_api(image_url):
-    """네이버 OCR API 호출"""
+def build_s3_url(s3_key):
+    """S3 객체의 공개 URL"""
+    return f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.{settings.AWS_S3_REGION_NAME}.amazonaws.com/{s3_key}"
+
+def create_presigned_upload(s3_key, content_type, max_size):
+    """브라우저가 S3에 직접 업로드할 수 있는 presigned POST 정보 생성 (url, fields)"""
+    return get_s3_client().generate_presigned_post(
+        settings.AWS_STORAGE_BUCKET_NAME,
+        s3_key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, max_size],
+        ],
+        ExpiresIn=settings.OCR_DIRECT_UPLOAD_EXPIRES
+    )
+
+def get_s3_object_size(s3_key):
+    """S3 객체 크기 반환 (객체가 없으면 None)"""
     try:
-        headers = {
-            'X-OCR-SECRET': settings.NAVER_OCR_SECRET,
-            'Content-Type': 'application/json'
-        }
-        
-        # 현재 타임스탬프 생성
-        timestamp = str(int(time.time() * 1000))
-        
-        payload = {
-            "version": "V2",
-            "requestId": "1234",
-            "timestamp": timestamp,
-            "lang": "ko",
-            "images": [
-                {
-                    "format": "jpg",
-                    "name": "billing",
-                    "url": image_url
-                }
-            ],
-            "enableTableDetection": True
-        }
-        
-        response = requests.post(
+        response = get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
+    except ClientError as e:
+        logger.warning("S3 객체 조회 오류: %s", e)
+        return None
+    return response['ContentLength']
+
+# Clova OCR V2가 받는 이미지 형식 (확장자 → format 값)
+_OCR_IMAGE_FORMATS = {
+    'jpg': 'jpg', 'jpeg': 'jpg', 'png': 'png', 'tif': 'tiff', 'tiff': 'tiff', 'pdf': 'pdf',
+}
+
+
+def guess_image_format(filename):
+    """파일명/URL 확장자로 OCR API의 format 값 결정 (알 수 없으면 jpg)"""
+    extension = os.path.splitext(filename.split('?', 1)[0])[1].lower().lstrip('.')
+    return _OCR_IMAGE_FORMATS.get(extension, 'jpg')
+
+
+def ocr_image_payload(image, index):
+    """OCR 요청의 images 항목 생성 (Clova 요청과 가짜 엔진이 함께 사용)
+
+    image는 URL 문자열, {'url': ...} 또는 {'data': bytes, 'format': ...} (S3 없이 본문에 직접 포함)
+    """
+    if isinstance(image, str):
+        image = {'url': image}
+
+    entry = {
+        "format": image.get('format') or guess_image_format(image.get('url') or image.get('name') or ''),
+        "name": f"billing_{index}",
+    }
+    if image.get('data') is not None:
+        entry["data"] = base64.b64encode(image['data']).decode('ascii')
+    else:
+        entry["url"] = image['url']
+    return entry
+
+
+def call_naver_ocr_api(image_url=None, image_data=None, image_format=None):
+    """네이버 OCR API 호출 (image_data를 주면 URL 대신 이미지 바이트를 요청 본문에 직접 포함)"""
+    if image_data is not None:
+        image = {'data': image_data, 'format': image_format}
+    else:
+        image = {'url': image_url, 'format': image_format}
+    responses = call_naver_ocr_api_batch([image])
+    return responses[0]
+
+def _build_ocr_request(images):
+    """OCR API 요청 (헤더, JSON 본문) 생성"""
+    headers = {
+        'X-OCR-SECRET': settings.NAVER_OCR_SECRET,
+        'Content-Type': 'application/json'
+    }
+
+    # 현재 타임스탬프 생성
+    timestamp = str(int(time.time() * 1000))
+
+    payload = {
+        "version": "V2",
+        "requestId": "1234",
+        "timestamp": timestamp,
+        "lang": "ko",
+        "images": [ocr_image_payload(image, i) for i, image in enumerate(images)],
+        "enableTableDetection": True
+    }
+    return headers, json.dumps(payload)
+
+
+def _parse_ocr_response(response, count):
+    with timed('ocr_json_parse'):
+        try:
+            ocr_response = response.json()
+        except ValueError:
+            raise OCRAPIError('OCR API 응답을 해석할 수 없습니다.')
+        return split_ocr_response(ocr_response, count)
+
+
+def call_naver_ocr_api_batch(images):
+    """여러 이미지를 한 번의 요청으로 OCR API에 보내고, 이미지별 응답 목록을 반환 (인식에 실패한 이미지는 None)
+
+    요청은 속도 제한/재시도/서킷 브레이커를 거치며, 끝내 실패하면 OCRAPIError를 발생시킴
+    """
+    headers, body = _build_ocr_request(images)
+
+    def send():
+        return get_http_session().post(
             settings.NAVER_OCR_API_URL,
             headers=headers,
-            data=json.dumps(payload)
+            data=body,
+            timeout=(settings.NAVER_OCR_CONNECT_TIMEOUT, settings.NAVER_OCR_READ_TIMEOUT)
         )
-        
-        if response.status_code == 200:
-            return response.json()
+
+    response = call_with_resilience(send)
+    return _parse_ocr_response(response, len(images))
+
+
+async def acall_naver_ocr_api_batch(images):
+    """call_naver_ocr_api_batch의 비동기 버전 (httpx 필요) - 응답을 기다리는 동안 스레드를 점유하지 않음"""
+    headers, body = _build_ocr_request(images)
+    client = get_async_http_client()
+
+    async def send():
+        return await client.post(settings.NAVER_OCR_API_URL, headers=headers, content=body)
+
+    response = await acall_with_resilience(send, connection_errors=(httpx.TransportError,))
+    return _parse_ocr_response(response, len(images))
+
+
+def is_async_http_available():
+    """비동기 OCR 호출에 필요한 httpx 설치 여부"""
+    return httpx is not None
+
+def split_ocr_response(ocr_response, count):
+    """여러 이미지에 대한 OCR 응답을 이미지 한 장짜리 응답 여러 개로 분리"""
+    images = ocr_response.get("images") or []
+    if count == 1:
+        return [ocr_response]
+
+    results = []
+    for i in range(count):
+        if i < len(images) and images[i].get("inferResult", "SUCCESS") != "ERROR":
+            results.append({**ocr_response, "images": [images[i]]})
         else:
-            print(f"OCR API 오류: {response.status_code}, {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"OCR API 호출 오류: {e}")
-        return None
+            results.append(None)
+    return results
+
+_dump_executor = None
+_dump_executor_pid = None
+_dump_slots = None
+_dump_lock = threading.Lock()
+
 
-def save_ocr_result_to_file(ocr_result, filename="ocr_table.json"):
-    """OCR 결과를 JSON 파일로 저장"""
+def _get_dump_executor():
+    """디버그 덤프 전용 백그라운드 스레드 (대기 중인 덤프 수는 OCR_DEBUG_DUMP_MAX_PENDING으로 제한)"""
+    global _dump_executor, _dump_executor_pid, _dump_slots
+    pid = os.getpid()
+    if _dump_executor is None or _dump_executor_pid != pid:
+        with _dump_lock:
+            if _dump_executor is None or _dump_executor_pid != pid:
+                _dump_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ocr-debug-dump')
+                _dump_slots = threading.BoundedSemaphore(max(1, settings.OCR_DEBUG_DUMP_MAX_PENDING))
+                _dump_executor_pid = pid
+    return _dump_executor, _dump_slots
+
+
+def _write_debug_dump(path, ocr_result):
     try:
-        file_path = os.path.join(settings.BASE_DIR, filename)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(ocr_result, f, ensure_ascii=False, indent=2)
-        return file_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            json.dump(ocr_result, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        inc('ocr_debug_dumps_total', status='written')
     except Exception as e:
-        print(f"파일 저장 오류: {e}")
+        inc('ocr_debug_dumps_total', status='error')
+        logger.warning("파일 저장 오류 (%s): %s", path, e)
+
+
+def save_ocr_result_to_file(ocr_result, result_id=None):
+    """디버그용으로 OCR 응답을 OCR_DEBUG_DUMP_DIR에 결과별 gzip 파일로 저장 (백그라운드)
+
+    OCR_DEBUG_DUMP_DIR이 비어 있으면(기본) 아무것도 하지 않음. 응답은 이미 DB/원본 저장소에 있으므로
+    저장이 밀리면 기다리지 않고 버림. 저장될 파일 경로(버리면 None)를 반환
+    """
+    directory = settings.OCR_DEBUG_DUMP_DIR
+    if not directory:
         return None
+
+    executor, slots = _get_dump_executor()
+    if not slots.acquire(blocking=False):
+        inc('ocr_debug_dumps_total', status='dropped')
+        return None
+
+    # 같은 결과를 여러 번 처리하거나 여러 워커가 동시에 써도 겹치지 않도록 결과 ID + 시각 + 임의값으로 이름을 지음
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    name = f"ocr_{result_id if result_id is not None else 'na'}_{stamp}_{uuid.uuid4().hex[:8]}.json.gz"
+    path = os.path.join(directory, time.strftime('%Y%m%d'), name)
+
+    def write():
+        try:
+            _write_debug_dump(path, ocr_result)
+        finally:
+            slots.release()
+
+    executor.submit(write)
+    return path
@@ -1,14 +1,40 @@
 from django.shortcuts import render, redirect
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from .forms import ImageUploadForm
-from .models import OCRResult
-from .utils import upload_to_s3, call_naver_ocr_api, save_ocr_result_to_file
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, FileResponse, StreamingHttpResponse
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models import Q
+from django.views.decorators.http import condition, require_POST
+from django.utils.cache import patch_cache_control
+from .forms import ImageUploadForm, BatchUploadForm, DirectUploadForm, MAX_UPLOAD_SIZE
+from . import exportcache
+from .events import aiter_sse, get_broker, matches, parse_event_id, publish_status
+from .metrics import render_prometheus, timed
+from .models import OCRResult, OCRBatch
+from .preprocess import count_pages, is_multi_page_document, render_page_preview
+from .tasks import aprocess_ocr_job, claim_job, enqueue_upload, enqueue_uploads
+from .utils import build_s3_url, create_presigned_upload, get_s3_object_size
+from .exports import (
+    build_excel_file, iter_table_rows, is_parquet_available,
+    XLSX_CONTENT_TYPE, EXPORT_CONTENT_TYPES, EXPORT_WRITERS,
+)
+from asgiref.sync import sync_to_async
+from datetime import datetime, time, timedelta
+import asyncio
+import base64
+import binascii
 import json
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-import io
+import mimetypes
+import os
+import uuid
 
 def index(request):
     if request.method == 'POST':
@@ -19,171 +45,698 @@ def index(request):
                 messages.error(request, '파일이 없습니다.')
                 return redirect('index')
 
-            # 업로드 스트림 → 메모리 복사(한 번만 read)
-            blob = up.read()
-            buf = BytesIO(blob)
+            # 파일은 로컬 저장소에 저장하고 S3 업로드/OCR은 워커가 비동기로 처리
+            force = bool(request.POST.get('force'))
+            ocr_result, reused = enqueue_upload(up, force=force)
 
-            # S3 업로드 (file-like 사용)
-            buf.seek(0)
-            s3_url = upload_to_s3(buf, up.name)
-            if not s3_url:
-                messages.error(request, 'S3 업로드에 실패했습니다.')
-                return redirect('index')
+            if reused:
+                messages.info(request, '같은 파일의 기존 OCR 결과를 불러왔습니다.')
+            else:
+                messages.success(request, 'OCR 작업이 등록되었습니다. 처리가 끝나면 결과가 표시됩니다.')
+            return redirect('ocr_result', pk=ocr_result.pk)
+    else:
+        form = ImageUploadForm()
+    return render(request, 'ocr_app/index.html', {
+        'form': form,
+        'direct_upload': settings.OCR_DIRECT_UPLOAD,
+        'events_transport': _events_transport(request),
+        'events_poll_interval': int(settings.OCR_EVENTS_CLIENT_POLL_INTERVAL * 1000),
+    })
 
-            # 모델 저장 (image_file은 비워둠)
-            ocr_result = form.save(commit=False)
-            ocr_result.image_file = None
-            ocr_result.s3_url = s3_url
 
-            # OCR 호출
-            ocr_response = call_naver_ocr_api(s3_url)
-            if not ocr_response:
-                messages.error(request, 'OCR API 호출에 실패했습니다.')
-                return redirect('index')
+DIRECT_UPLOAD_PREFIX = 'ocr-images/direct/'
+DIRECT_UPLOAD_SALT = 'ocr_app.direct_upload'
 
-            ocr_result.ocr_result = ocr_response
-            ocr_result.save()
 
-            save_ocr_result_to_file(ocr_response)
-            messages.success(request, 'OCR 처리가 완료되었습니다.')
-            return redirect('ocr_result', pk=ocr_result.pk)
+@require_POST
+def presign_upload(request):
+    """브라우저가 이미지를 S3에 직접 올릴 수 있도록 presigned POST 발급 (Django는 이미지 바이트를 받지 않음)"""
+    if not settings.OCR_DIRECT_UPLOAD:
+        return JsonResponse({'error': '직접 업로드가 비활성화되어 있습니다.'}, status=404)
+
+    form = DirectUploadForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    filename = form.cleaned_data['filename']
+    extension = os.path.splitext(filename)[1].lower()
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    s3_key = f'{DIRECT_UPLOAD_PREFIX}{uuid.uuid4().hex}{extension}'
+
+    presigned = create_presigned_upload(s3_key, content_type, MAX_UPLOAD_SIZE)
+    return JsonResponse({
+        'key': s3_key,
+        # 완료 통보는 이 서버가 발급한 키만 받도록 서명한 토큰으로 함
+        'token': signing.dumps(s3_key, salt=DIRECT_UPLOAD_SALT),
+        'url': presigned['url'],
+        'fields': presigned['fields'],
+    })
+
+
+@require_POST
+def complete_upload(request):
+    """S3 직접 업로드 완료 통보 - 객체를 확인한 뒤 OCR 작업을 대기열에 등록"""
+    if not settings.OCR_DIRECT_UPLOAD:
+        return JsonResponse({'error': '직접 업로드가 비활성화되어 있습니다.'}, status=404)
+
+    # presigned POST 만료 직전에 시작한 업로드도 끝낼 수 있도록 유효 시간의 두 배까지 허용
+    try:
+        s3_key = signing.loads(
+            request.POST.get('token', ''),
+            salt=DIRECT_UPLOAD_SALT,
+            max_age=settings.OCR_DIRECT_UPLOAD_EXPIRES * 2,
+        )
+    except signing.BadSignature:
+        return JsonResponse({'error': '올바르지 않거나 만료된 업로드 토큰입니다.'}, status=400)
+    if not isinstance(s3_key, str) or not s3_key.startswith(DIRECT_UPLOAD_PREFIX) or '..' in s3_key:
+        return JsonResponse({'error': '올바르지 않은 업로드 키입니다.'}, status=400)
+
+    size = get_s3_object_size(s3_key)
+    if size is None:
+        return JsonResponse({'error': '업로드된 파일을 찾을 수 없습니다.'}, status=400)
+
+    # 이미 S3에 있으므로 워커는 업로드 단계를 건너뛰고 바로 OCR을 호출함
+    # (같은 키로 완료 통보가 중복돼도 작업은 하나만 만듦)
+    ocr_result, created = OCRResult.objects.get_or_create(
+        s3_url=build_s3_url(s3_key),
+        defaults={'status': OCRResult.STATUS_QUEUED},
+    )
+    if created:
+        publish_status(ocr_result)
+    return JsonResponse({
+        'id': ocr_result.id,
+        'status_url': reverse('api_result_status', kwargs={'pk': ocr_result.pk}),
+        'result_url': reverse('ocr_result', kwargs={'pk': ocr_result.pk}),
+    }, status=201)
+
+# 결과별 ETag/Last-Modified 계산에 필요한 작은 컬럼
+ETAG_FIELDS = (
+    'id', 'status', 'created_at', 'finished_at', 'parsed_version', 'parsed_digest', 'table_count', 'cell_count',
+)
+# ?v=<내용 토큰>이 현재 결과와 같으면 그 URL의 내용은 바뀌지 않으므로 오래 캐시
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _etag_result(request, pk):
+    # condition()이 ETag와 Last-Modified 함수를 따로 호출하므로 요청당 한 번만 조회
+    if not hasattr(request, '_ocr_etag_result'):
+        request._ocr_etag_result = (
+            OCRResult.objects.only(*ETAG_FIELDS).filter(pk=pk, status=OCRResult.STATUS_DONE).first()
+        )
+    return request._ocr_etag_result
+
+
+def _result_condition(kind):
+    """완료된 결과에서 파생되는 응답에 ETag/Last-Modified를 붙이고 조건부 요청이면 뷰를 실행하지 않고 304 반환
+
+    kind(request, **뷰 인자)는 같은 결과의 응답 종류를 구분하는 문자열 (URL마다 다른 ETag)
+    """
+    def etag(request, pk, **kwargs):
+        ocr_result = _etag_result(request, pk)
+        return ocr_result.get_etag(kind(request, **kwargs)) if ocr_result else None
+
+    def last_modified(request, pk, **kwargs):
+        ocr_result = _etag_result(request, pk)
+        return (ocr_result.finished_at or ocr_result.created_at) if ocr_result else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _set_result_cache_headers(request, response, ocr_result):
+    """?v=가 현재 내용 토큰이면 immutable로 오래 캐시, 아니면 매번 ETag로 재검증하도록 설정"""
+    if response.status_code != 200:
+        return response
+    if request.GET.get('v') == ocr_result.version_token:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
     else:
-        form = ImageUploadForm()
-    return render(request, 'ocr_app/index.html', {'form': form})
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _build_processed_tables(ocr_result):
+    """템플릿에서 사용하기 쉽도록 테이블 데이터 전처리"""
+    processed_tables = []
+    for table_info in ocr_result.get_table_data_with_confidence():
+        table_data_matrix = table_info['data']
+        confidence_matrix = table_info['confidence']
+
+        processed_rows = []
+        for i, row in enumerate(table_data_matrix):
+            processed_cells = []
+            for j, cell in enumerate(row):
+                confidence = confidence_matrix[i][j] if i < len(confidence_matrix) and j < len(confidence_matrix[i]) else 1.0
+                processed_cells.append({
+                    'text': cell,
+                    'confidence': confidence,
+                    'is_low_confidence': confidence < 0.98
+                })
+            processed_rows.append(processed_cells)
+
+        processed_tables.append({
+            'page': table_info.get('page', 1),
+            'rows': processed_rows,
+            'row_count': len(table_data_matrix),
+            'col_count': len(table_data_matrix[0]) if table_data_matrix else 0
+        })
+    return processed_tables
+
+
+def _render_result_tables(ocr_result):
+    """결과 화면의 테이블 영역 HTML (결과별 캐시 - 결과가 바뀌면 키가 바뀜)"""
+    key = ocr_result.cache_key('tables')
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    table_data = ocr_result.get_table_data()
+    with timed('template_render', template='result_tables'):
+        html = render_to_string('ocr_app/result_tables.html', {
+            'table_data': table_data,
+            'processed_tables': _build_processed_tables(ocr_result),
+            'page_count': ocr_result.get_page_count(),
+        })
+    cached = {'html': html, 'has_tables': bool(table_data)}
+    cache.set(key, cached, settings.OCR_RESULT_CACHE_TIMEOUT)
+    return cached
+
 
 def ocr_result(request, pk):
     """OCR 결과 페이지"""
     try:
-        ocr_result = OCRResult.objects.get(pk=pk)
-        table_data = ocr_result.get_table_data()
-        table_data_with_confidence = ocr_result.get_table_data_with_confidence()
-        bounding_boxes = ocr_result.get_bounding_boxes()
-        
-        # 템플릿에서 사용하기 쉽도록 테이블 데이터 전처리
-        processed_tables = []
-        for table_info in table_data_with_confidence:
-            table_data_matrix = table_info['data']
-            confidence_matrix = table_info['confidence']
-            
-            processed_rows = []
-            for i, row in enumerate(table_data_matrix):
-                processed_cells = []
-                for j, cell in enumerate(row):
-                    confidence = confidence_matrix[i][j] if i < len(confidence_matrix) and j < len(confidence_matrix[i]) else 1.0
-                    processed_cells.append({
-                        'text': cell,
-                        'confidence': confidence,
-                        'is_low_confidence': confidence < 0.98
-                    })
-                processed_rows.append(processed_cells)
-            
-            processed_tables.append({
-                'rows': processed_rows,
-                'row_count': len(table_data_matrix),
-                'col_count': len(table_data_matrix[0]) if table_data_matrix else 0
+        # 테이블 영역이 캐시되어 있으면 큰 JSON 컬럼은 읽지 않음 (캐시가 없을 때만 필요한 시점에 불러옴)
+        ocr_result = OCRResult.objects.defer(*OCRResult.LARGE_FIELDS).get(pk=pk)
+        if ocr_result.status != OCRResult.STATUS_DONE:
+            # 아직 처리 중이거나 실패한 작업은 상태 확인 페이지를 보여줌
+            return render(request, 'ocr_app/pending.html', {
+                'ocr_result': ocr_result,
+                'events_transport': _events_transport(request),
             })
-        
+
+        tables = _render_result_tables(ocr_result)
+        # 바운딩 박스와 원본 JSON은 페이지를 연 뒤 별도 API로 불러옴
         context = {
             'ocr_result': ocr_result,
-            'table_data': table_data,
-            'processed_tables': processed_tables,
-            'bounding_boxes': json.dumps(bounding_boxes),
-            'image_url': ocr_result.image_file.url if ocr_result.image_file else ocr_result.s3_url
+            'tables_html': mark_safe(tables['html']),
+            'has_tables': tables['has_tables'],
+            'image_url': ocr_result.image_file.url if ocr_result.image_file else ocr_result.s3_url,
+            'document_pages': _document_pages(ocr_result),
+            'is_document': is_multi_page_document(ocr_result.image_file.name if ocr_result.image_file else ocr_result.s3_url),
         }
+        if context['document_pages']:
+            # PDF/TIFF는 <img>로 보여줄 수 없으므로 페이지별 PNG 미리보기를 보여줌
+            context['image_url'] = _page_image_url(ocr_result, 1)
         
-        return render(request, 'ocr_app/result.html', context)
+        with timed('template_render', template='result'):
+            response = render(request, 'ocr_app/result.html', context)
+        # 내용 기반 ETag는 ConditionalGetMiddleware가 붙이고, 브라우저는 매번 재검증
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     
     except OCRResult.DoesNotExist:
         messages.error(request, '결과를 찾을 수 없습니다.')
         return redirect('index')
 
+
+def _local_document_path(ocr_result):
+    """미리보기를 만들 수 있는 로컬 PDF/TIFF 파일 경로 (문서가 아니거나 로컬 파일이 없으면 None)"""
+    if not ocr_result.image_file or not is_multi_page_document(ocr_result.image_file.name):
+        return None
+    try:
+        return ocr_result.image_file.path
+    except NotImplementedError:
+        return None
+
+
+def _document_pages(ocr_result):
+    """결과 화면 페이지 선택기에 보여줄 문서 페이지 번호 목록 (미리보기를 만들 수 없으면 빈 목록)"""
+    path = _local_document_path(ocr_result)
+    if path is None:
+        return []
+    page_count = count_pages(path) or ocr_result.get_page_count()
+    return list(range(1, page_count + 1))
+
+
+def _page_image_url(ocr_result, page):
+    url = reverse('result_page_image', kwargs={'pk': ocr_result.pk, 'page': page})
+    return f'{url}?v={ocr_result.version_token}'
+
+
+def result_page_image(request, pk, page):
+    """PDF/TIFF 문서 한 페이지의 PNG 미리보기 (결과 화면의 바운딩 박스 오버레이용)"""
+    try:
+        ocr_result = OCRResult.objects.defer(*OCRResult.LARGE_FIELDS).get(pk=pk)
+    except OCRResult.DoesNotExist:
+        return JsonResponse({'error': '결과를 찾을 수 없습니다.'}, status=404)
+
+    path = _local_document_path(ocr_result)
+    if path is None or page < 1:
+        return JsonResponse({'error': '페이지 미리보기를 만들 수 없습니다.'}, status=404)
+    with timed('page_preview'):
+        data = render_page_preview(path, page - 1)
+    if data is None:
+        return JsonResponse({'error': '페이지 미리보기를 만들 수 없습니다.'}, status=404)
+    return _set_result_cache_headers(request, HttpResponse(data, content_type='image/png'), ocr_result)
+
+
+def _boxes_kind(request):
+    return f"boxes-{request.GET.get('page', 1)}-{'text' if request.GET.get('text') == '1' else 'rect'}"
+
+
+@_result_condition(_boxes_kind)
+def get_result_boxes(request, pk):
+    """결과 화면 오버레이용 바운딩 박스 API
+
+    ?page=N(기본 1)의 박스를 [x, y, 너비, 높이, 신뢰도(천분율)] 정수 배열로 반환하고
+    (size는 좌표 기준 크기 [너비, 높이], 모르면 null - 이미지 원본 크기 기준),
+    ?text=1이면 같은 순서의 셀 텍스트 목록만 반환 (툴팁을 처음 띄울 때 불러옴)
+    """
+    try:
+        ocr_result = OCRResult.objects.defer(*OCRResult.LARGE_FIELDS).get(pk=pk, status=OCRResult.STATUS_DONE)
+    except OCRResult.DoesNotExist:
+        return JsonResponse({'error': '결과를 찾을 수 없습니다.'}, status=404)
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        return JsonResponse({'error': 'page는 정수여야 합니다.'}, status=400)
+
+    with_text = request.GET.get('text') == '1'
+    key = ocr_result.cache_key(f"box_{'texts' if with_text else 'rects'}_{page}")
+    body = cache.get(key)
+    if body is None:
+        if with_text:
+            payload = {'page': page, 'texts': ocr_result.get_box_texts(page)}
+        else:
+            payload = {'page': page, 'size': ocr_result.get_page_size(page), 'boxes': ocr_result.get_box_rects(page)}
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        cache.set(key, body, settings.OCR_RESULT_CACHE_TIMEOUT)
+    return _set_result_cache_headers(request, HttpResponse(body, content_type='application/json'), ocr_result)
+
+
+@_result_condition(lambda request: 'raw')
+def get_result_raw(request, pk):
+    """원본 OCR 응답 JSON (결과 화면에서 펼칠 때만 불러옴)"""
+    try:
+        ocr_result = OCRResult.objects.defer('parsed_tables').get(pk=pk)
+    except OCRResult.DoesNotExist:
+        return JsonResponse({'error': '결과를 찾을 수 없습니다.'}, status=404)
+    return _set_result_cache_headers(
+        request, JsonResponse(ocr_result.raw_result, json_dumps_params={'ensure_ascii': False}), ocr_result,
+    )
+
+RESULTS_PAGE_SIZE = 10
+RESULTS_MAX_PAGE_SIZE = 100
+
+
+def _encode_cursor(result):
+    raw = f'{result.created_at.isoformat()}|{result.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    parsed = parse_datetime(created_at)
+    if parsed is None:
+        raise ValueError(cursor)
+    return parsed, int(pk)
+
+
 def get_ocr_results(request):
-    """OCR 결과 목록 API"""
-    results = OCRResult.objects.all().order_by('-created_at')[:10]
+    """OCR 결과 목록 API (?cursor=다음 페이지 커서&limit=개수)
+
+    (created_at, id) 인덱스를 타는 커서 방식이라 테이블이 커져도 페이지 조회 비용이 일정함
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', RESULTS_PAGE_SIZE)), 1), RESULTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'limit 값이 올바르지 않습니다.'}, status=400)
+
+    results = OCRResult.objects.only(
+        'id', 'created_at', 'image_file', 's3_url', 'status', 'has_result', 'table_count', 'cell_count',
+    ).order_by('-created_at', '-id')
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            created_at, pk = _decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return JsonResponse({'error': '커서 값이 올바르지 않습니다.'}, status=400)
+        results = results.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # 다음 페이지 존재 여부 확인용으로 1건 더 조회
+    page = list(results[:limit + 1])
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
     data = []
     
-    for result in results:
+    for result in page[:limit]:
         data.append({
             'id': result.id,
             'created_at': result.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'image_url': result.image_file.url if result.image_file else result.s3_url,
-            'has_result': bool(result.ocr_result)
+            'status': result.status,
+            'has_result': result.status == OCRResult.STATUS_DONE and result.has_result,
+            'table_count': result.table_count,
+            'cell_count': result.cell_count,
         })
     
-    return JsonResponse({'results': data})
+    # 목록은 계속 바뀌므로 매번 재검증 (내용이 같으면 ConditionalGetMiddleware가 304 반환)
+    response = JsonResponse({'results': data, 'next_cursor': next_cursor})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _status_payload(result):
+    return {
+        'id': result.id,
+        'status': result.status,
+        'is_finished': result.is_finished,
+        'error': result.error_message,
+        'result_url': reverse('ocr_result', kwargs={'pk': result.pk}),
+    }
+
+
+async def get_ocr_status(request, pk):
+    """OCR 작업 상태 조회 API (브라우저 폴링용 - ASGI에서는 스레드를 점유하지 않음)"""
+    try:
+        result = await OCRResult.objects.only('id', 'status', 'error_message').aget(pk=pk)
+    except OCRResult.DoesNotExist:
+        return JsonResponse({'error': '결과를 찾을 수 없습니다.'}, status=404)
+
+    return JsonResponse(_status_payload(result))
+
+
+async def ocr_now(request):
+    """이미지를 업로드하고 워커를 거치지 않고 바로 OCR해 결과 상태를 반환하는 API (ASGI용)
+
+    OCR 응답을 기다리는 동안 이벤트 루프가 다른 요청을 처리하므로 적은 프로세스로 많은 동시 요청을 받을 수 있다.
+    다른 워커가 먼저 가져간 작업이나 재시도 대기로 돌아간 작업은 202와 함께 상태 조회 URL을 돌려준다.
+    """
+    # Django 4.2의 require_POST는 비동기 뷰를 감싸지 못하므로 직접 확인
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    form = ImageUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    up = request.FILES.get('image_file')
+    if not up:
+        return JsonResponse({'error': '파일이 없습니다.'}, status=400)
+
+    force = bool(request.POST.get('force'))
+    ocr_result, reused = await sync_to_async(enqueue_upload)(up, force=force)
+    if not reused:
+        job = await sync_to_async(claim_job)(ocr_result.pk)
+        if job is not None:
+            ocr_result = await aprocess_ocr_job(job)
+
+    payload = _status_payload(ocr_result)
+    payload['reused'] = reused
+    payload['status_url'] = reverse('api_result_status', kwargs={'pk': ocr_result.pk})
+    if ocr_result.status == OCRResult.STATUS_DONE:
+        status = 200
+    elif ocr_result.status == OCRResult.STATUS_FAILED:
+        status = 502
+    else:
+        status = 202
+    return JsonResponse(payload, status=status)
+
+
+def _event_subscription(request):
+    """구독 조건(?result=, ?batch=)과 이어 받을 위치(Last-Event-ID 헤더 또는 ?last_event_id=)"""
+    filters = {}
+    for name, key in (('result', 'result_id'), ('batch', 'batch_id')):
+        value = request.GET.get(name)
+        if value:
+            try:
+                filters[key] = int(value)
+            except ValueError:
+                raise ValueError(f'{name} 값이 올바르지 않습니다.')
+
+    broker = get_broker()
+    after = parse_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    return broker, filters, broker.last_id if after is None else after
+
+
+def _events_transport(request):
+    """화면이 작업 상태를 받는 방식 - ASGI면 'sse', WSGI면 연결마다 스레드를 점유하지 않도록 'poll'"""
+    return 'sse' if isinstance(request, ASGIRequest) else 'poll'
+
+
+def event_stream(request):
+    """작업 상태 변경 SSE 스트림 - 목록/대기 화면이 폴링 대신 구독 (?result=<id>, ?batch=<id>로 좁힘)
+
+    구독자는 이벤트 루프에서 기다리므로 ASGI에서만 제공함 (WSGI에서는 /api/events/poll/ 사용)
+    """
+    if _events_transport(request) != 'sse':
+        return JsonResponse({
+            'error': 'SSE는 ASGI 서버에서만 제공합니다.',
+            'poll_url': reverse('api_events_poll'),
+        }, status=501)
+    try:
+        broker, filters, after = _event_subscription(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    content = aiter_sse(broker, after, filters)
+    response = StreamingHttpResponse(content, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx가 이벤트를 모아 보내지 않도록 함
+    return response
+
+
+async def poll_events(request):
+    """작업 상태 변경 롱폴링 API - 이벤트가 생기거나 ?timeout=초(최대 OCR_EVENTS_LONGPOLL_TIMEOUT)가 지나면 응답
+
+    응답의 last_event_id를 다음 요청의 ?last_event_id=로 넘기고, reset이 true면 목록을 새로 읽어야 함
+    """
+    try:
+        broker, filters, after = _event_subscription(request)
+        timeout = float(request.GET.get('timeout', settings.OCR_EVENTS_LONGPOLL_TIMEOUT))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(timeout, 0), settings.OCR_EVENTS_LONGPOLL_TIMEOUT)
+    events, reset = [], False
+    while True:
+        received, reset = await broker.await_events(after, max(0, deadline - loop.time()))
+        if reset:
+            after = broker.last_id
+            break
+        if received:
+            after = received[-1]['id']
+            events = [event for event in received if matches(event, **filters)]
+        if events or loop.time() >= deadline:
+            break
+
+    response = JsonResponse({'events': events, 'last_event_id': after, 'reset': reset})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_POST
+def batch_upload(request):
+    """여러 장 일괄 업로드 API - 페이지마다 OCRResult를 대기열에 등록하고 배치 레코드를 반환"""
+    form = BatchUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    files = form.cleaned_data['files']
+    force = bool(request.POST.get('force'))
+    with transaction.atomic():
+        batch = OCRBatch.objects.create()
+        result_ids = []
+        duplicates = []
+        for i, (result, reused) in enumerate(enqueue_uploads(files, batch=batch, force=force)):
+            result_ids.append(result.id)
+            if reused or result.batch_id != batch.id:
+                # 이미 처리된(또는 처리 중인) 같은 파일 - 새 작업을 만들지 않음
+                duplicates.append({'page': i + 1, 'id': result.id, 'reused': reused})
+        batch.total_count = len(files) - len(duplicates)
+        batch.save(update_fields=['total_count'])
+
+    return JsonResponse({
+        'batch_id': batch.id,
+        'total': batch.total_count,
+        'results': result_ids,
+        'duplicates': duplicates,
+        'status_url': reverse('api_batch_status', kwargs={'pk': batch.pk}),
+    }, status=201)
+
+
+def get_batch_status(request, pk):
+    """일괄 업로드 진행률 조회 API"""
+    try:
+        batch = OCRBatch.objects.get(pk=pk)
+    except OCRBatch.DoesNotExist:
+        return JsonResponse({'error': '배치를 찾을 수 없습니다.'}, status=404)
+
+    results = batch.results.order_by('batch_index').values('id', 'batch_index', 'status', 'error_message')
+    return JsonResponse({
+        'batch_id': batch.id,
+        'created_at': batch.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        **batch.get_progress(),
+        'results': [
+            {
+                'id': r['id'],
+                'page': r['batch_index'] + 1 if r['batch_index'] is not None else None,
+                'status': r['status'],
+                'error': r['error_message'],
+                'result_url': reverse('ocr_result', kwargs={'pk': r['id']}),
+            }
+            for r in results
+        ],
+    })
+
+
+def _export_filename(pk, fmt):
+    return f'ocr_table_result_{pk}.{fmt}'
+
+
+def _iter_file_chunks(f, chunk_size=64 * 1024):
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _cached_export_response(request, ocr_result, fmt, content_type, build):
+    """캐시된 내보내기 파일 응답 - 캐시에 없으면 build()가 만든 조각을 저장한 뒤 내려줌 (캐시를 끄면 None)"""
+    if not exportcache.is_enabled():
+        return None
+
+    location = exportcache.get_cached_export(ocr_result, fmt)
+    if location is None:
+        with timed('export_build', format=fmt):
+            location = exportcache.store_export(ocr_result, fmt, build(), content_type)
+
+    filename = _export_filename(ocr_result.pk, fmt)
+    backend, path = location
+    if backend == 's3':
+        # presigned URL은 만료되므로 리다이렉트 응답 자체는 캐시하지 않음
+        response = redirect(exportcache.presigned_export_url(path, filename, content_type))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return _set_result_cache_headers(
+        request, FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type),
+        ocr_result,
+    )
 
 
+@_result_condition(lambda request: f'xlsx-e{exportcache.EXPORT_CACHE_VERSION}')
 def download_excel(request, pk):
     """OCR 결과를 엑셀 파일로 다운로드"""
     try:
-        ocr_result = OCRResult.objects.get(pk=pk)
-        table_data = ocr_result.get_table_data()
+        # 캐시된 파일을 내려줄 때는 큰 JSON 컬럼을 읽지 않음
+        ocr_result = OCRResult.objects.defer(*OCRResult.LARGE_FIELDS).get(pk=pk)
         
-        if not table_data:
+        if not ocr_result.table_count and not ocr_result.get_table_data():
             messages.error(request, '다운로드할 테이블 데이터가 없습니다.')
             return redirect('ocr_result', pk=pk)
-        
-        # 엑셀 워크북 생성
-        wb = Workbook()
-        
-        # 기본 시트 제거
-        wb.remove(wb.active)
-        
-        # 각 테이블을 별도 시트로 생성
-        for i, table in enumerate(table_data):
-            sheet_name = f'Table_{i+1}'
-            ws = wb.create_sheet(title=sheet_name)
-            
-            # 스타일 정의
-            header_font = Font(bold=True)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            center_alignment = Alignment(horizontal='center', vertical='center')
-            
-            # 테이블 데이터 입력
-            for row_idx, row in enumerate(table, 1):
-                for col_idx, cell_value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=cell_value)
-                    cell.border = border
-                    cell.alignment = center_alignment
-                    
-                    # 첫 번째 행은 헤더로 처리
-                    if row_idx == 1:
-                        cell.font = header_font
-            
-            # 열 너비 자동 조정
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # 메모리에서 엑셀 파일 생성
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        # HTTP 응답 생성
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+        # 임시 파일에 write-only 워크북을 만들고 청크 단위로 스트리밍
+        def build():
+            # 여러 페이지 문서는 시트 이름에 페이지 번호를 붙임
+            pages = None
+            if ocr_result.get_page_count() > 1:
+                pages = [page for page, _ in ocr_result.get_table_data(with_pages=True)]
+            with timed('excel_build'):
+                return build_excel_file(ocr_result.get_table_data(), pages)
+
+        # 한 번 만든 워크북은 캐시 파일을 그대로 내려줌
+        response = _cached_export_response(
+            request, ocr_result, 'xlsx', XLSX_CONTENT_TYPE, lambda: _iter_file_chunks(build()),
         )
-        response['Content-Disposition'] = f'attachment; filename="ocr_table_result_{pk}.xlsx"'
-        
-        return response
+        if response is not None:
+            return response
+        return _set_result_cache_headers(request, FileResponse(
+            build(),
+            as_attachment=True,
+            filename=_export_filename(pk, 'xlsx'),
+            content_type=XLSX_CONTENT_TYPE
+        ), ocr_result)
         
     except OCRResult.DoesNotExist:
         messages.error(request, '결과를 찾을 수 없습니다.')
         return redirect('index')
 
 
+def _export_error(fmt):
+    """지원하지 않거나 사용할 수 없는 내보내기 형식이면 오류 응답"""
+    if fmt not in EXPORT_WRITERS:
+        return JsonResponse({'error': f'지원하지 않는 형식입니다: {fmt}'}, status=404)
+    if fmt == 'parquet' and not is_parquet_available():
+        return JsonResponse({'error': 'Parquet 내보내기에는 pyarrow 패키지가 필요합니다.'}, status=501)
+    return None
+
+
+def _export_response(fmt, ocr_results, filename):
+    """테이블 행을 지정한 형식으로 스트리밍하는 응답 생성"""
+    error = _export_error(fmt)
+    if error is not None:
+        return error
+
+    rows = iter_table_rows(ocr_results)
+    response = StreamingHttpResponse(EXPORT_WRITERS[fmt](rows), content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+@_result_condition(lambda request, fmt: f'{fmt}-e{exportcache.EXPORT_CACHE_VERSION}')
+def download_export(request, pk, fmt):
+    """OCR 결과 테이블을 CSV/JSONL/Parquet로 다운로드 (캐시하지 않으면 스트리밍)"""
+    try:
+        ocr_result = OCRResult.objects.defer(*OCRResult.LARGE_FIELDS).get(pk=pk, status=OCRResult.STATUS_DONE)
+    except OCRResult.DoesNotExist:
+        return JsonResponse({'error': '결과를 찾을 수 없습니다.'}, status=404)
+
+    error = _export_error(fmt)
+    if error is not None:
+        return error
+
+    response = _cached_export_response(
+        request, ocr_result, fmt, EXPORT_CONTENT_TYPES[fmt],
+        lambda: EXPORT_WRITERS[fmt](iter_table_rows([ocr_result])),
+    )
+    if response is not None:
+        return response
+    return _set_result_cache_headers(
+        request, _export_response(fmt, [ocr_result], f'ocr_table_result_{pk}'), ocr_result,
+    )
+
+
+def _parse_date_param(value):
+    parsed = parse_date(value) if value else None
+    if value and parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def download_bulk_export(request, fmt):
+    """기간 내 완료된 모든 OCR 결과 테이블을 한 파일로 스트리밍 (?start=YYYY-MM-DD&end=YYYY-MM-DD, 양 끝 포함)"""
+    try:
+        start = _parse_date_param(request.GET.get('start'))
+        end = _parse_date_param(request.GET.get('end'))
+    except ValueError as e:
+        return JsonResponse({'error': f'날짜 형식이 올바르지 않습니다: {e}'}, status=400)
+
+    queryset = OCRResult.objects.filter(status=OCRResult.STATUS_DONE).defer('ocr_result')
+    # created_at 인덱스를 탈 수 있도록 날짜를 시각 범위로 변환
+    if start:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+
+    ocr_results = queryset.order_by('created_at', 'pk').iterator(chunk_size=200)
+    filename = f'ocr_tables_{start or "all"}_{end or "all"}'
+    return _export_response(fmt, ocr_results, filename)
+
+
+def metrics(request):
+    """Prometheus 수집용 지표 (OCR_METRICS_TOKEN을 설정하면 Bearer 토큰 필요)"""
+    token = settings.OCR_METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain; charset=utf-8')
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')